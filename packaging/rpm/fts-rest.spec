@@ -284,6 +284,7 @@ EOF
 %doc docs/README.md
 %doc docs/install.md
 %doc docs/api.md
+%doc src/fts3rest/schema
 
 %if %{?rhel}%{!?rhel:0} >= 7
 %files firewalld
@@ -16,6 +16,8 @@
 #   limitations under the License.
 
 from banning import Banning
+from configexporter import ConfigExporter
+from configimporter import ConfigImporter
 from delegator import Delegator
 from jobcanceller import JobCanceller
 from joblister import JobLister
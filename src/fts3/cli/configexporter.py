@@ -0,0 +1,52 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+try:
+    import simplejson as json
+except:
+    import json
+
+from base import Base
+from fts3.rest.client import Configuration
+
+
+class ConfigExporter(Base):
+
+    def __init__(self):
+        super(ConfigExporter, self).__init__(
+            description="""
+            Export the link, storage, operation limits, shares and activity shares configuration of the server.
+            The output can be modified and loaded back with fts-rest-config-import.
+            """,
+            example="""
+            $ %(prog)s -s https://fts3-devel.cern.ch:8446 -f config.json
+            """
+        )
+
+        self.opt_parser.add_option('-f', '--file', dest='file', default=None,
+                                   help='write the configuration into this file instead of the standard output')
+
+    def run(self):
+        context = self._create_context()
+        document = Configuration(context).export_config()
+        serialized = json.dumps(document, indent=2, sort_keys=True)
+        if self.options.file:
+            with open(self.options.file, 'w') as output:
+                output.write(serialized)
+                output.write('\n')
+            self.logger.info("Configuration written into %s" % self.options.file)
+        else:
+            print serialized
+        return 0
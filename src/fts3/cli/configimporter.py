@@ -0,0 +1,74 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+try:
+    import simplejson as json
+except:
+    import json
+import sys
+
+from base import Base
+from fts3.rest.client import Configuration
+
+
+class ConfigImporter(Base):
+
+    def __init__(self):
+        super(ConfigImporter, self).__init__(
+            extra_args='FILE',
+            description="""
+            Load a configuration document, as written by fts-rest-config-export, into the server.
+            All the changes are applied in a single transaction. Sections not present in the document
+            are left untouched.
+            """,
+            example="""
+            $ %(prog)s -s https://fts3-devel.cern.ch:8446 config.json
+            links: 2 inserted, 1 updated, 0 deleted, 120 unchanged
+            se: 0 inserted, 0 updated, 0 deleted, 45 unchanged
+            """
+        )
+
+        self.opt_parser.add_option('--replace', dest='replace', default=False, action='store_true',
+                                   help='remove the entries not in the document, for the sections present in it')
+        self.opt_parser.add_option('--dry-run', dest='dry_run', default=False, action='store_true',
+                                   help='show the changes, but do not apply them')
+
+    def validate(self):
+        if len(self.args) != 1:
+            self.opt_parser.print_help()
+            sys.exit(1)
+
+    def run(self):
+        try:
+            document = json.load(open(self.args[0]))
+        except ValueError, e:
+            self.logger.critical("Could not parse %s: %s" % (self.args[0], str(e)))
+            return 1
+
+        context = self._create_context()
+        summary = Configuration(context).import_config(
+            document, replace=self.options.replace, dry_run=self.options.dry_run
+        )
+
+        if self.options.json:
+            print json.dumps(summary, indent=2)
+        else:
+            if self.options.dry_run:
+                self.logger.info("Dry run, nothing has been changed")
+            for section, counts in sorted(summary.iteritems()):
+                self.logger.info("%s: %d inserted, %d updated, %d deleted, %d unchanged" % (
+                    section, counts['inserted'], counts['updated'], counts['deleted'], counts['unchanged']
+                ))
+        return 0
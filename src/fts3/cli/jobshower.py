@@ -39,6 +39,9 @@ class JobShower(Base):
             VO Name: dteam
             """
         )
+        # Specific options
+        self.opt_parser.add_option('--summary', dest='summary', default=False, action='store_true',
+                                   help='show how many files are in each state, instead of listing them')
 
     def validate(self):
         if len(self.args) == 0:
@@ -50,9 +53,15 @@ class JobShower(Base):
         context = self._create_context()
 
         inquirer = Inquirer(context)
-        job      = inquirer.get_job_status(job_id, list_files=self.options.json)
+        if self.options.summary:
+            job = inquirer.get_job_status(job_id)
+            job['summary'] = inquirer.get_job_summary(job_id)
+        else:
+            job = inquirer.get_job_status(job_id, list_files=self.options.json)
 
         if not self.options.json:
             self.logger.info(job_human_readable(job))
+            if self.options.summary:
+                self.logger.info(job_summary_human_readable(job['summary']))
         else:
             self.logger.info(job_as_json(job))
@@ -22,9 +22,9 @@ except:
     import json
 import logging
 import sys
-import time
 
 from base import Base
+from utils import wait_for_job
 from fts3.rest.client import Submitter, Delegator, Inquirer
 
 DEFAULT_CHECKSUM = 'ADLER32' 
@@ -89,7 +89,7 @@ class JobSubmitter(Base):
         self.opt_parser.add_option('-b', '--blocking', dest='blocking', default=False, action='store_true',
                                    help='blocking mode. Wait until the operation completes.')
         self.opt_parser.add_option('-i', '--interval', dest='poll_interval', type='int', default=30,
-                                   help='interval between two poll operations in blocking mode.')
+                                   help='interval between two poll operations in blocking mode, for servers without long polling.')
         self.opt_parser.add_option('-e', '--expire', dest='proxy_lifetime', type='int', default=420,
                                    help='expiration time of the delegation in minutes.')
         self.opt_parser.add_option('--delegate-when-lifetime-lt', type=int, default=120,
@@ -235,11 +235,9 @@ class JobSubmitter(Base):
             self.logger.info("Job id: %s" % job_id)
         if job_id and self.options.blocking:
             inquirer = Inquirer(context)
-            job = inquirer.get_job_status(job_id)
-            while job['job_state'] in ['SUBMITTED', 'READY', 'STAGING', 'ACTIVE']:
-                self.logger.info("Job in state %s" % job['job_state'])
-                time.sleep(self.options.poll_interval)
-                job = inquirer.get_job_status(job_id)
+            job = wait_for_job(
+                inquirer, job_id, ['SUBMITTED', 'READY', 'STAGING', 'ACTIVE'], self.options.poll_interval, self.logger
+            )
 
             self.logger.info("Job finished with state %s" % job['job_state'])
             if job['reason']:
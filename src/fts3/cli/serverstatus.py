@@ -32,10 +32,16 @@ class ServerStatus(Base):
                                    default=False, action='store_true',
                                    help='the tool will return < 0 on error, 0 if nothing is active, '
                                         '1 if there are active transfers, 2 if there are active staging, 3 if there are both ')
+        self.opt_parser.add_option('--fresh', dest='fresh', default=False, action='store_true',
+                                   help='ask the server to recompute the activity instead of using its snapshot. '
+                                        'Only allowed to the server itself')
 
     def run(self):
         context = self._create_context()
-        host_activity = json.loads(context.get('/status/hosts'))
+        if self.options.fresh:
+            host_activity = json.loads(context.get('/status/hosts?fresh=true'))
+        else:
+            host_activity = json.loads(context.get('/status/hosts'))
         hosts = [self.options.host] if self.options.host else host_activity.keys()
         total_count = dict(active=0, staging=0)
         for host in hosts:
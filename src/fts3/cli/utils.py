@@ -19,6 +19,9 @@ try:
     import simplejson as json
 except:
     import json 
+import time
+
+from fts3.rest.client import TryAgain
 
 
 def job_human_readable(job):
@@ -55,8 +58,60 @@ def job_list_as_json(job_list):
     return json.dumps(job_list, indent=2)
 
 
+def job_summary_human_readable(summary):
+    """
+    Generates a human readable string for the given job summary.
+    """
+    s = "Files: %d\n" % summary['total_files']
+    for state in sorted(summary['files'].keys()):
+        s += "    %s: %d\n" % (state, summary['files'][state])
+    for state in sorted(summary['dm'].keys()):
+        s += "Data management %s: %d\n" % (state, summary['dm'][state])
+    s += "Bytes done: %d/%d\n" % (summary['bytes_done'], summary['bytes_total'])
+    if summary['throughput'] is not None:
+        s += "Average throughput: %.2f\n" % summary['throughput']
+    return s
+
+
 def job_as_json(job):
     """
     Serializes a job into JSON
     """
     return json.dumps(job, indent=2)
+
+
+def _wait_for_change(inquirer, job_id, etag, poll_interval, logger):
+    """
+    Asks the server to hold the request until the job changes. If the server is
+    already holding too many, waits poll_interval seconds and polls instead.
+    """
+    try:
+        return inquirer.wait_for_job_change(job_id, etag)
+    except TryAgain:
+        logger.debug("The server is busy, polling again in %d seconds" % poll_interval)
+        time.sleep(poll_interval)
+        return inquirer.get_job_status(job_id)
+
+
+def wait_for_job(inquirer, job_id, active_states, poll_interval, logger):
+    """
+    Waits until the job leaves the active states, and returns its last status.
+    The server is asked to hold each request until the job changes, so changes are
+    reported as soon as they happen. If the server does not support it, falls back to
+    polling every poll_interval seconds.
+    """
+    job = _wait_for_change(inquirer, job_id, None, poll_interval, logger)
+    etag = job.get('etag', None)
+    while job['job_state'] in active_states:
+        logger.info("Job in state %s" % job['job_state'])
+        if etag is None:
+            time.sleep(poll_interval)
+            job = inquirer.get_job_status(job_id)
+        else:
+            job = _wait_for_change(inquirer, job_id, etag, poll_interval, logger)
+            # Same etag means the server timed out without changes
+            while job.get('etag', None) == etag:
+                job = _wait_for_change(inquirer, job_id, etag, poll_interval, logger)
+            # A polled job has no etag, keep the last one to hold the next request
+            etag = job.get('etag', etag)
+    return job
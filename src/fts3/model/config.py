@@ -38,6 +38,17 @@ class  ConfigAudit(Base):
         return "%s %s: %s" % (self.datetime, self.action, self.config)
 
 
+class ConfigVersion(Base):
+    __tablename__ = 't_config_version'
+
+    # Single row, changed by the REST API every time it modifies the configuration
+    id      = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False)
+
+    def __str__(self):
+        return str(self.version)
+
+
 class LinkConfig(Base):
     __tablename__ = 't_link_config'
 
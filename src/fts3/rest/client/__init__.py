@@ -16,6 +16,8 @@
 #   limitations under the License.
 
 from ban import Ban
+from columnar import ColumnarFiles
+from configuration import Configuration
 from context import Context
 from delegator import Delegator
 from inquirer import Inquirer
@@ -0,0 +1,82 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Decoding of the files sent in columnar format (see files_format in /jobs/<id>)
+"""
+
+
+class ColumnarFiles(object):
+    """
+    Read only sequence over files received as {"columns": [...], "rows": [[...], ...]},
+    optionally with "dictionaries": {column: [values]}.
+    Rows are decoded only when accessed, as dictionaries (iterating, or by index),
+    or as lists in the order of columns (rows())
+    """
+
+    def __init__(self, document):
+        self.columns = document['columns']
+        self._rows = document['rows']
+        dictionaries = document.get('dictionaries', None) or {}
+        self._decoders = [
+            (position, dictionaries[column])
+            for position, column in enumerate(self.columns) if column in dictionaries
+        ]
+
+    def _decode(self, row):
+        if not self._decoders:
+            return row
+        row = list(row)
+        for position, values in self._decoders:
+            row[position] = values[row[position]]
+        return row
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [dict(zip(self.columns, self._decode(row))) for row in self._rows[index]]
+        return dict(zip(self.columns, self._decode(self._rows[index])))
+
+    def __iter__(self):
+        for row in self._rows:
+            yield dict(zip(self.columns, self._decode(row)))
+
+    def rows(self):
+        """
+        Generator over the rows, as lists of values in the order of columns
+        """
+        for row in self._rows:
+            yield self._decode(row)
+
+    def column(self, name):
+        """
+        List with all the values of the column name
+        """
+        position = self.columns.index(name)
+        for decoder_position, values in self._decoders:
+            if decoder_position == position:
+                return [values[row[position]] for row in self._rows]
+        return [row[position] for row in self._rows]
+
+
+def decode_files(document):
+    """
+    Returns a ColumnarFiles if document is in columnar format, document otherwise
+    """
+    if isinstance(document, dict) and 'columns' in document and 'rows' in document:
+        return ColumnarFiles(document)
+    return document
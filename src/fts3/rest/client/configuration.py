@@ -0,0 +1,39 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+try:
+    import simplejson as json
+except:
+    import json
+
+
+class Configuration(object):
+
+    def __init__(self, context):
+        self.context = context
+
+    def export_config(self):
+        return json.loads(self.context.get('/config/export'))
+
+    def import_config(self, document, replace=False, dry_run=False):
+        args = []
+        if replace:
+            args.append('replace=true')
+        if dry_run:
+            args.append('dry_run=true')
+        path = '/config/bulk'
+        if args:
+            path += '?' + '&'.join(args)
+        return json.loads(self.context.post_json(path, document))
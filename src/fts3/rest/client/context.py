@@ -21,6 +21,7 @@ try:
     from M2Crypto.ASN1 import UTC
 except:
     from pytz import utc as UTC
+import copy
 import getpass
 try:
     import simplejson as json
@@ -148,6 +149,7 @@ class Context(object):
     def __init__(self, endpoint, ucert=None, ukey=None, verify=True, access_token=None, no_creds=False, capath=None,
                  request_class=PycurlRequest, connectTimeout=30, timeout=30):
         self.passwd = None
+        self.timeout = timeout
 
         self._set_endpoint(endpoint)
         if no_creds:
@@ -160,15 +162,31 @@ class Context(object):
             else:
                 self._set_x509(ucert, ukey)
                 
-        self._requester = request_class(
-        self.ucert, self.ukey, passwd=self.passwd, verify=verify, access_token=self.access_token, capath=capath,
-            connectTimeout=connectTimeout, timeout=timeout)
+        self._request_class = request_class
+        self._request_kwargs = dict(
+            passwd=self.passwd, verify=verify, access_token=self.access_token, capath=capath,
+            connectTimeout=connectTimeout, timeout=timeout
+        )
+        self._requester = self._new_requester()
 
         self.endpoint_info = self._validate_endpoint()
         # Log obtained information
         log.debug("Using endpoint: %s" % self.endpoint_info['url'])
         log.debug("REST API version: %(major)d.%(minor)d.%(patch)d" % self.endpoint_info['api'])
 
+    def _new_requester(self):
+        return self._request_class(self.ucert, self.ukey, **self._request_kwargs)
+
+    def clone(self):
+        """
+        Returns a new context bound to the same endpoint and credentials, but with its own
+        connection, so it can be used concurrently from a different thread.
+        The endpoint is not validated again.
+        """
+        cloned = copy.copy(self)
+        cloned._requester = self._new_requester()
+        return cloned
+
     def get_endpoint_info(self):
         return self.endpoint_info
 
@@ -179,6 +197,26 @@ class Context(object):
         return self._requester.method('GET',
                                       "%s/%s" % (self.endpoint, path))
 
+    def get_ndjson(self, path, args=None):
+        """
+        Generator over the objects of the list returned by path, parsed one by one as they arrive,
+        so the memory used does not depend on the size of the list.
+        Servers that do not support newline delimited json return a json list, which is parsed at once.
+        """
+        if args:
+            query = '&'.join(map(lambda (k, v): "%s=%s" % (k, urllib.quote(v)), args.iteritems()))
+            path += '?' + query
+        content_type, lines = self._requester.stream('GET',
+                                                     "%s/%s" % (self.endpoint, path),
+                                                     headers={'Accept': 'application/x-ndjson, application/json;q=0.9'})
+        if not content_type.startswith('application/x-ndjson'):
+            for item in json.loads('\n'.join(lines)):
+                yield item
+            return
+        for line in lines:
+            if line:
+                yield json.loads(line)
+
     def put(self, path, body):
         return self._requester.method('PUT',
                                       "%s/%s" % (self.endpoint, path),
@@ -14,6 +14,7 @@
 #   limitations under the License.
 
 from ban import *
+from bulk import *
 from delegate import *
 from state import *
 from submission import *
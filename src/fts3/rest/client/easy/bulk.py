@@ -0,0 +1,261 @@
+#   Copyright notice:
+#   Copyright CERN, 2014.
+#
+#   See www.eu-emi.eu for details on the copyright holders
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from Queue import Queue, Empty
+
+from fts3.rest.client import Inquirer, Submitter
+from fts3.rest.client import ClientError, MultiStatus, NotFound, TryAgain
+from delegate import delegate
+
+log = logging.getLogger(__name__)
+
+# Keep in sync with fts3.model.JobTerminalStates. Not imported from there
+# so the client does not depend on the model (and sqlalchemy)
+_JOB_TERMINAL_STATES = ['FINISHED', 'FAILED', 'FINISHEDDIRTY', 'CANCELED']
+
+
+def _with_retries(func, retries, backoff):
+    """
+    Calls func, retrying when the server asks to (503), waiting backoff * 2^attempt seconds
+    """
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except TryAgain:
+            if attempt >= retries:
+                raise
+            wait = backoff * (2 ** attempt)
+            log.debug("Server asked to try again, retrying in %.1f seconds" % wait)
+            time.sleep(wait)
+            attempt += 1
+
+
+def _run_concurrently(context, func, items, concurrency, retries, backoff):
+    """
+    Runs func(worker_context, item) for each item using, at most, concurrency threads.
+    Each thread gets its own clone of the context, so connections are reused within a thread
+    but never shared between them.
+
+    Returns:
+        A tuple (results, errors), both being dictionaries indexed by the position of the item
+    """
+    results = {}
+    errors = {}
+    queue = Queue()
+    for index, item in enumerate(items):
+        queue.put((index, item))
+
+    def worker(worker_context):
+        while True:
+            try:
+                index, item = queue.get_nowait()
+            except Empty:
+                return
+            try:
+                results[index] = _with_retries(lambda: func(worker_context, item), retries, backoff)
+            except Exception, e:
+                errors[index] = e
+
+    n_threads = max(1, min(concurrency, len(items)))
+    if n_threads == 1:
+        worker(context)
+        return results, errors
+
+    threads = []
+    for i in range(n_threads):
+        t = threading.Thread(target=worker, args=(context.clone(),))
+        t.daemon = True
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def _chunks(items, chunk_size):
+    for i in range(0, len(items), chunk_size):
+        yield items[i:i + chunk_size]
+
+
+def _split_multistatus(responses):
+    """
+    Split the individual responses of a multi-status into a tuple (statuses, errors),
+    both dictionaries indexed by job id
+    """
+    statuses = {}
+    errors = {}
+    for job in responses:
+        if job['http_status'].startswith('2'):
+            statuses[job['job_id']] = job
+        elif job['http_status'].startswith('404'):
+            errors[job['job_id']] = NotFound(job['job_id'], job.get('http_message', None))
+        else:
+            errors[job['job_id']] = ClientError(job.get('http_message', None))
+    return statuses, errors
+
+
+def submit_many(context, jobs, concurrency=4, retries=3, backoff=1,
+                delegation_lifetime=timedelta(hours=7), force_delegation=False,
+                delegate_when_lifetime_lt=timedelta(hours=2)):
+    """
+    Submits a list of jobs concurrently. The credentials are delegated only once.
+
+    Args:
+        context:     fts3.rest.client.context.Context instance
+        jobs:        List of dictionaries representing the jobs (see new_job)
+        concurrency: Maximum number of submissions in flight
+        retries:     How many times to retry a submission if the server is busy (503)
+        backoff:     Initial wait, in seconds, between retries. It doubles on each attempt
+        delegation_lifetime: Delegation lifetime
+        force_delegation:    Force delegation even if there is a valid proxy
+        delegate_when_lifetime_lt: If the remaining lifetime on the delegated proxy is less than this interval,
+                  do a new delegation
+
+    Returns:
+        A tuple (job_ids, errors). job_ids is a list with the same order as jobs, containing
+        the job id, or None if that submission failed. errors is a dictionary
+        with the position of the failed jobs as key, and the exception as value.
+    """
+    delegate(context, delegation_lifetime, force_delegation, delegate_when_lifetime_lt)
+
+    def _submit(worker_context, job):
+        submitter = Submitter(worker_context)
+        params = job.get('params', {})
+        return submitter.submit(
+            transfers=job.get('files', None), delete=job.get('delete', None), staging=job.get('staging', None),
+            **params
+        )
+
+    results, errors = _run_concurrently(context, _submit, jobs, concurrency, retries, backoff)
+    job_ids = [results.get(index, None) for index in range(len(jobs))]
+    return job_ids, errors
+
+
+def get_many_jobs_statuses(context, job_ids, chunk_size=50, concurrency=4, retries=3, backoff=1):
+    """
+    Get the status of a potentially large list of jobs. The list is split in chunks,
+    each one queried with a single request, and the chunks are queried concurrently.
+    Jobs that can not be queried are reported individually.
+
+    Args:
+        context:     fts3.rest.client.context.Context instance
+        job_ids:     The job list
+        chunk_size:  How many jobs to query per request
+        concurrency: Maximum number of requests in flight
+        retries:     How many times to retry a request if the server is busy (503)
+        backoff:     Initial wait, in seconds, between retries. It doubles on each attempt
+
+    Returns:
+        A tuple (statuses, errors). Both are dictionaries indexed by job id. statuses contains
+        the decoded job status, errors the exception raised when querying that job.
+    """
+    def _query_chunk(worker_context, chunk):
+        inquirer = Inquirer(worker_context)
+        try:
+            jobs = inquirer.get_jobs_statuses(chunk)
+            # A single id returns the job itself, not a list
+            if isinstance(jobs, dict):
+                jobs = [jobs]
+            return dict([(job['job_id'], job) for job in jobs]), {}
+        except MultiStatus, e:
+            # Some of the jobs failed, and the response says which ones
+            return _split_multistatus(e.responses)
+        except ClientError:
+            # The response could not be decoded. Go one by one to find out which ones failed
+            if len(chunk) == 1:
+                raise
+            chunk_statuses = {}
+            chunk_errors = {}
+            for job_id in chunk:
+                try:
+                    chunk_statuses[job_id] = _with_retries(
+                        lambda: inquirer.get_job_status(job_id), retries, backoff
+                    )
+                except Exception, e:
+                    chunk_errors[job_id] = e
+            return chunk_statuses, chunk_errors
+
+    chunks = list(_chunks(list(job_ids), chunk_size))
+    results, failed_chunks = _run_concurrently(context, _query_chunk, chunks, concurrency, retries, backoff)
+
+    statuses = {}
+    errors = {}
+    for chunk_statuses, chunk_errors in results.itervalues():
+        statuses.update(chunk_statuses)
+        errors.update(chunk_errors)
+    for index, e in failed_chunks.iteritems():
+        for job_id in chunks[index]:
+            errors[job_id] = e
+    return statuses, errors
+
+
+def poll_until_terminal(context, job_ids, interval=30, timeout=None, chunk_size=50, concurrency=4,
+                        retries=3, backoff=1):
+    """
+    Waits until all the given jobs reach a terminal state, querying their status in chunks.
+    Jobs that reach a terminal state, or that fail to be queried, are not polled again.
+
+    Args:
+        context:     fts3.rest.client.context.Context instance
+        job_ids:     The job list
+        interval:    Seconds to wait between polls
+        timeout:     Maximum number of seconds to wait. None means wait forever
+        chunk_size:  How many jobs to query per request
+        concurrency: Maximum number of requests in flight
+        retries:     How many times to retry a request if the server is busy (503)
+        backoff:     Initial wait, in seconds, between retries. It doubles on each attempt
+
+    Returns:
+        A tuple (statuses, errors). Both are dictionaries indexed by job id. statuses contains
+        the last known status of each job, which will be non terminal only if the timeout expired.
+        errors contains the exception raised when querying a job, if any.
+    """
+    if timeout is not None:
+        deadline = datetime.utcnow() + timedelta(seconds=timeout)
+    else:
+        deadline = None
+
+    statuses = {}
+    errors = {}
+    pending = list(job_ids)
+    while pending:
+        round_statuses, round_errors = get_many_jobs_statuses(
+            context, pending, chunk_size, concurrency, retries, backoff
+        )
+        statuses.update(round_statuses)
+        errors.update(round_errors)
+
+        pending = filter(
+            lambda job_id: job_id not in errors and
+                statuses.get(job_id, {}).get('job_state') not in _JOB_TERMINAL_STATES,
+            pending
+        )
+        log.debug("%d jobs still not in a terminal state" % len(pending))
+
+        if not pending:
+            break
+        if deadline is not None and datetime.utcnow() + timedelta(seconds=interval) > deadline:
+            log.warning("Timeout expired with %d jobs not in a terminal state" % len(pending))
+            break
+        time.sleep(interval)
+
+    return statuses, errors
@@ -272,3 +272,24 @@ def submit(context, job, delegation_lifetime=timedelta(hours=7), force_delegatio
         transfers=job.get('files', None), delete=job.get('delete', None), staging=job.get('staging', None),
         **params
     )
+
+
+def submit_multiple(context, jobs, delegation_lifetime=timedelta(hours=7), force_delegation=False, delegate_when_lifetime_lt=timedelta(hours=2)):
+    """
+    Submits several jobs with a single request
+
+    Args:
+        context: fts3.rest.client.context.Context instance
+        jobs:    List of dictionaries representing the jobs
+        delegation_lifetime: Delegation lifetime
+        force_delegation:    Force delegation even if there is a valid proxy
+        delegate_when_lifetime_lt: If the remaining lifetime on the delegated proxy is less than this interval,
+                  do a new delegation
+
+    Returns:
+        A list, in the same order as jobs, with the result of each submission: a dictionary with
+        the job_id and the http_status, plus http_message if the submission failed
+    """
+    delegate(context, delegation_lifetime, force_delegation, delegate_when_lifetime_lt)
+    submitter = Submitter(context)
+    return submitter.submit_multiple(jobs)
@@ -46,6 +46,16 @@ class ClientError(FTS3ClientException):
         return "Client error: %s" % self.reason
 
 
+class MultiStatus(ClientError):
+    """
+    Some of the operations within a request failed.
+    responses holds the individual result of each one of them
+    """
+    def __init__(self, reason, responses):
+        super(MultiStatus, self).__init__(reason)
+        self.responses = responses
+
+
 class NeedDelegation(ClientError):
     def __str__(self):
         return "Need to delegate credentials"
@@ -21,6 +21,7 @@ except:
     import json
 import urllib
 
+from columnar import decode_files
 from exceptions import *
 
 
@@ -46,7 +47,33 @@ class Inquirer(object):
         except NotFound:
             raise NotFound(job_id)
 
-    def get_jobs_statuses(self, job_ids, list_files=False):
+    def wait_for_job_change(self, job_id, etag=None, timeout=60):
+        """
+        Returns the job status as soon as it differs from the one identified by etag,
+        or once timeout seconds have passed. The returned job includes its current etag.
+        If etag is None, the job is returned straight away.
+        Servers that do not support long polling return the job immediately, without etag.
+        """
+        if not isinstance(job_id, basestring):
+            raise Exception('The job_id provided is not a string!')
+
+        # Do not let the server hold the request for longer than we are willing to wait
+        if self.context.timeout:
+            timeout = min(timeout, max(self.context.timeout - 5, 1))
+
+        args = {'wait_until_change': etag or '', 'timeout': str(int(timeout))}
+        try:
+            return json.loads(self.context.get("/jobs/%s" % job_id, args))
+        except NotFound:
+            raise NotFound(job_id)
+
+    def get_jobs_statuses(self, job_ids, list_files=False, files_format=None):
+        """
+        Get the status of several jobs at once.
+        If list_files is True, a subset of the fields of their files is included. With files_format
+        'columnar' or 'dictionary', the server sends them in a compact format, and they are
+        returned as ColumnarFiles, decoded as they are accessed.
+        """
 
         if isinstance(job_ids, list):
             xfer_ids = ','.join(job_ids)
@@ -56,14 +83,38 @@ class Inquirer(object):
         try:
             if not list_files:
                 job_info = json.loads(self.context.get("/jobs/%s" % xfer_ids))
-            else:
+            elif not files_format:
                 job_info = json.loads(self.context.get("/jobs/%s?files=file_state,dest_surl,finish_time,start_time,reason,source_surl,file_metadata" % xfer_ids))
+            else:
+                job_info = json.loads(self.context.get("/jobs/%s?files=file_state,dest_surl,finish_time,start_time,reason,source_surl,file_metadata&files_format=%s" % (xfer_ids, files_format)))
+                for job in job_info if isinstance(job_info, list) else [job_info]:
+                    if 'files' in job:
+                        job['files'] = decode_files(job['files'])
 
             return job_info
+        except NotFound:
+            raise NotFound(xfer_ids)
+
+    def get_job_summary(self, job_id):
+        """
+        How many files of the job are in each state, bytes done and total, and average throughput,
+        without listing the files
+        """
+        try:
+            return json.loads(self.context.get("/jobs/%s/summary" % job_id))
         except NotFound:
             raise NotFound(job_id)
 
-    def get_job_list(self, user_dn=None, vo_name=None, source_se=None, dest_se=None, delegation_id=None, state_in=None):
+    def get_jobs_summaries(self, job_ids):
+        """
+        Summaries of several jobs at once
+        """
+        if not isinstance(job_ids, list):
+            raise Exception('The input provided is not a list of ids!')
+        return json.loads(self.context.get("/jobs/summary", {'ids': ','.join(job_ids)}))
+
+    @staticmethod
+    def _job_list_url(user_dn, vo_name, source_se, dest_se, delegation_id, state_in):
         url = "/jobs?"
         args = {}
         if user_dn:
@@ -82,9 +133,39 @@ class Inquirer(object):
         query = '&'.join(map(lambda (k, v): "%s=%s" % (k, urllib.quote(v, '')),
                              args.iteritems()))
         url += query
+        return url
 
+    def get_job_list(self, user_dn=None, vo_name=None, source_se=None, dest_se=None, delegation_id=None, state_in=None):
+        url = self._job_list_url(user_dn, vo_name, source_se, dest_se, delegation_id, state_in)
         return json.loads(self.context.get(url))
 
+    def iter_job_list(self, user_dn=None, vo_name=None, source_se=None, dest_se=None, delegation_id=None, state_in=None):
+        """
+        Same as get_job_list, but returns a generator that parses the jobs as they arrive
+        """
+        url = self._job_list_url(user_dn, vo_name, source_se, dest_se, delegation_id, state_in)
+        return self.context.get_ndjson(url)
+
+    def iter_job_files(self, job_id):
+        """
+        Generator over the files of the job, parsed as they arrive
+        """
+        try:
+            for f in self.context.get_ndjson("/jobs/%s/files" % job_id):
+                yield f
+        except NotFound:
+            raise NotFound(job_id)
+
+    def iter_job_dm(self, job_id):
+        """
+        Generator over the data management operations of the job, parsed as they arrive
+        """
+        try:
+            for dm in self.context.get_ndjson("/jobs/%s/dm" % job_id):
+                yield dm
+        except NotFound:
+            raise NotFound(job_id)
+
     def whoami(self):
         return json.loads(self.context.get("/whoami"))
 
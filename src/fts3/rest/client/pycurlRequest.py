@@ -78,6 +78,8 @@ class PycurlRequest(object):
 
         self.curl_handle = pycurl.Curl()
         self._set_ssl()
+        # Accept any compression supported by libcurl, the response is decoded transparently
+        self.curl_handle.setopt(pycurl.ENCODING, '')
 
     def _handle_error(self, url, code, response_body=None):
         # Try parsing the response, maybe we can get the error message
@@ -95,9 +97,10 @@ class PycurlRequest(object):
 
         if code == 207:
             try:
-                raise ClientError('\n'.join(map(lambda m: m['http_message'], response)))
-            except (KeyError, TypeError):
+                reason = '\n'.join(filter(None, map(lambda m: m.get('http_message', None), response)))
+            except (AttributeError, TypeError):
                 raise ClientError(message)
+            raise MultiStatus(reason, response)
         elif code == 400:
             if message:
                 raise ClientError('Bad request: ' + message)
@@ -118,7 +121,7 @@ class PycurlRequest(object):
         elif code >= 500:
             raise ServerError(str(code))
 
-    def method(self, method, url, body=None, headers=None):
+    def _perform(self, method, url, body=None, headers=None):
         self.curl_handle.setopt(pycurl.CUSTOMREQUEST, method)
         if method == 'GET':
             self.curl_handle.setopt(pycurl.HTTPGET, True)
@@ -157,6 +160,10 @@ class PycurlRequest(object):
 
         self.curl_handle.perform()
         response_file.seek(0)
+        return response_file
+
+    def method(self, method, url, body=None, headers=None):
+        response_file = self._perform(method, url, body, headers)
         response_str = response_file.read()
         #log.debug(response_str)
 
@@ -164,5 +171,26 @@ class PycurlRequest(object):
 
         return response_str
 
+    def stream(self, method, url, headers=None):
+        """
+        Returns the content type of the response, and an iterator over its lines.
+        The response is kept in a temporary file, so the memory used does not depend on its size
+        """
+        response_file = self._perform(method, url, headers=headers)
+        code = self.curl_handle.getinfo(pycurl.HTTP_CODE)
+        if code != 200:
+            self._handle_error(url, code, response_file.read())
+            response_file.seek(0)
+        content_type = self.curl_handle.getinfo(pycurl.CONTENT_TYPE) or ''
+
+        def _lines():
+            try:
+                for line in response_file:
+                    yield line.rstrip('\r\n')
+            finally:
+                response_file.close()
+
+        return content_type, _lines()
+
 
 __all__ = ['PycurlRequest']
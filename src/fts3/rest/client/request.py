@@ -56,9 +56,10 @@ class Request(object):
 
         if code == 207:
             try:
-                raise ClientError('\n'.join(map(lambda m: m['http_message'], response)))
-            except (KeyError, TypeError):
+                reason = '\n'.join(filter(None, map(lambda m: m.get('http_message', None), response)))
+            except (AttributeError, TypeError):
                 raise ClientError(message)
+            raise MultiStatus(reason, response)
         elif code == 400:
             if message:
                 raise ClientError('Bad request: ' + message)
@@ -82,15 +83,17 @@ class Request(object):
         elif code >= 500:
             raise ServerError(str(code))
 
-    def method(self, method, url, body=None, headers=None):   
+    def _headers(self, headers):
         _headers = {'Accept': 'application/json'}
         if headers:
             _headers.update(headers)
         if self.access_token:
             _headers['Authorization'] = 'Bearer ' + self.access_token
-        
+        return _headers
+
+    def method(self, method, url, body=None, headers=None):   
         response = self.session.request(method=method, url=str(url), 
-                             data=body, headers=_headers, verify = self.verify, 
+                             data=body, headers=self._headers(headers), verify = self.verify, 
                              timeout=(self.connectTimeout, self.timeout), 
                              cert=(self.ucert, self.ukey))
         
@@ -101,5 +104,25 @@ class Request(object):
 
         return str(response.text)
 
+    def stream(self, method, url, headers=None):
+        """
+        Returns the content type of the response, and an iterator over its lines, read as they arrive
+        """
+        response = self.session.request(method=method, url=str(url),
+                             headers=self._headers(headers), verify = self.verify,
+                             timeout=(self.connectTimeout, self.timeout),
+                             cert=(self.ucert, self.ukey), stream=True)
+        if response.status_code != 200:
+            self._handle_error(url, response.status_code, response.text)
+
+        def _lines():
+            try:
+                for line in response.iter_lines(chunk_size=65536):
+                    yield line
+            finally:
+                response.close()
+
+        return response.headers.get('Content-Type', ''), _lines()
+
 
 __all__ = ['Request']
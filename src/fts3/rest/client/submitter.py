@@ -20,6 +20,8 @@ try:
 except:
     import json
 
+from exceptions import MultiStatus
+
 
 class Submitter(object):
 
@@ -60,6 +62,25 @@ class Submitter(object):
         r = json.loads(self.context.post_json('/jobs', job))
         return r['job_id']
 
+    def submit_multiple(self, jobs):
+        """
+        Submit several jobs with a single request. Each job is a dictionary with, optionally,
+        the keys files, delete, staging and params (the later being passed as kwargs
+        to build_submission), as built by fts3.rest.client.easy.new_job
+        Returns a list with the result of each submission, as returned by the server: a
+        dictionary with the job_id and http_status, and http_message if it failed.
+        """
+        submissions = list()
+        for job in jobs:
+            submissions.append(json.loads(Submitter.build_submission(
+                job.get('files', None), job.get('delete', None), job.get('staging', None),
+                **job.get('params', {})
+            )))
+        try:
+            return json.loads(self.context.post_json('/jobs', {'jobs': submissions}))
+        except MultiStatus, e:
+            return e.responses
+
     def cancel(self, job_id, file_ids = None):
         if file_ids is not None:
             file_ids_str = ','.join(map(str, file_ids))
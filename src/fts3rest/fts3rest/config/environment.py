@@ -28,16 +28,42 @@ else:
     from pylons.configuration import PylonsConfig
 
 from mako.lookup import TemplateLookup
+from paste.deploy.converters import asbool
 from sqlalchemy import engine_from_config, event
 
 import fts3rest.lib.app_globals as app_globals
 import fts3rest.lib.helpers
 from fts3.util.config import fts3_config_load
-from fts3rest.lib.helpers.connection_validator import connection_validator, connection_set_sqlmode
+from fts3rest.lib.helpers.connection_validator import ConnectionValidator, connection_set_sqlmode
+from fts3rest.lib.helpers.pool_monitor import PoolMonitor
+from fts3rest.lib.async_logging import install_async_logging
+from fts3rest.lib.autocomplete import AutocompleteIndex
+from fts3rest.lib.config_cache import config_cache
+from fts3rest.lib.hosts_activity import HostsActivitySnapshot
+from fts3rest.lib.metrics import MetricsExporter, ProcessCounters
+from fts3rest.lib.middleware.instrumentation import QueryInstrumentation, RouteHistograms
+from fts3rest.lib.replica import ReplicaRouter
+from fts3rest.lib.job_summary_cache import job_summary_cache
+from fts3rest.lib.proxy_store import proxy_store
+from fts3rest.lib.token_cache import token_cache
 from fts3rest.config.routing import make_map
 from fts3rest.model import init_model
 
 
+def _register_connection_validator(config, engine, monitor=None):
+    """
+    Ping connections on checkout. By default, only those idle for a while.
+    """
+    connection_validator = ConnectionValidator(
+        policy=config.get('fts3.DbPingPolicy', 'idle').lower(),
+        idle_time=int(config.get('fts3.DbPingIdleTime', 10)),
+        monitor=monitor
+    )
+    event.listens_for(engine, 'checkout')(connection_validator)
+    event.listens_for(engine, 'checkin')(ConnectionValidator.mark_used)
+    event.listens_for(engine, 'connect')(ConnectionValidator.mark_used)
+
+
 def load_environment(global_conf, app_conf):
     """Configure the Pylons environment via the ``pylons.config``
     object
@@ -74,12 +100,17 @@ def load_environment(global_conf, app_conf):
         config.update(fts3cfg)
 
     # Setup the SQLAlchemy database engine
+    # Pool size, overflow and timeout can be set with sqlalchemy.pool_size, sqlalchemy.max_overflow
+    # and sqlalchemy.pool_timeout
     kwargs = dict()
     if config['sqlalchemy.url'].startswith('mysql://'):
         import MySQLdb.cursors
         kwargs['connect_args'] = {'cursorclass': MySQLdb.cursors.SSCursor}
     engine = engine_from_config(config, 'sqlalchemy.', pool_recycle=7200, **kwargs)
     init_model(engine)
+    pool_monitor = PoolMonitor()
+    pool_monitor.register(engine)
+    config['pylons.app_globals'].pool_monitor = pool_monitor
 
     # Disable for sqlite the isolation level to work around issues with savepoints
     if config['sqlalchemy.url'].startswith('sqlite'):
@@ -88,9 +119,84 @@ def load_environment(global_conf, app_conf):
             dbapi_connection.isolation_level = None
 
     # Catch dead connections
-    event.listens_for(engine, 'checkout')(connection_validator)
+    _register_connection_validator(config, engine, pool_monitor)
     event.listens_for(engine, 'connect')(connection_set_sqlmode)
 
+    # Optional read replica, used by the actions decorated with read_replica
+    if config.get('sqlalchemy_replica.url'):
+        replica_engine = engine_from_config(config, 'sqlalchemy_replica.', pool_recycle=7200)
+        pool_monitor.register(replica_engine)
+        _register_connection_validator(config, replica_engine, pool_monitor)
+        config['pylons.app_globals'].replica_router = ReplicaRouter(
+            engine, replica_engine, check_interval=int(config.get('fts3.DbReplicaLagCheckInterval', 10))
+        )
+    else:
+        replica_engine = None
+        config['pylons.app_globals'].replica_router = None
+
+    # Snapshot of the activity of the hosts, served by /status/hosts
+    config['pylons.app_globals'].hosts_activity = HostsActivitySnapshot(
+        int(config.get('fts3.HostsActivityRefresh', 30))
+    )
+
+    # Prefix indexes used by the autocomplete
+    config['pylons.app_globals'].autocomplete = AutocompleteIndex(
+        int(config.get('fts3.AutocompleteRefresh', 300)),
+        min_length=int(config.get('fts3.AutocompleteMinLength', 2)),
+        limit=int(config.get('fts3.AutocompleteLimit', 20))
+    )
+
+    # Configuration cache, shared with the scheduler
+    config_cache.check_interval = int(config.get('fts3.ConfigCacheCheckInterval', 0))
+    config_cache.ttl = int(config.get('fts3.ConfigCacheTTL', 300))
+    config_cache.setup(engine)
+
+    # Validated OAuth2 access tokens
+    token_cache.size = int(config.get('fts3.OAuth2TokenCacheSize', 1000))
+    token_cache.ttl = int(config.get('fts3.OAuth2TokenCacheTTL', 60))
+
+    # Summaries of the jobs in a terminal state
+    job_summary_cache.size = int(config.get('fts3.JobSummaryCacheSize', 10000))
+
+    # Files holding the delegated proxies for gfal2 and voms-proxy-init
+    proxy_store.directory = config.get('fts3.ProxyStoreDirectory', None)
+    proxy_store.max_idle = int(config.get('fts3.ProxyStoreSize', 100))
+    proxy_store.idle_timeout = int(config.get('fts3.ProxyStoreIdleTimeout', 300))
+
+    # Optional per request query counting and timing
+    # The metrics need them for the per route figures
+    metrics_enabled = asbool(config.get('fts3.Metrics', False))
+    if metrics_enabled or asbool(config.get('fts3.Instrumentation', False)):
+        QueryInstrumentation.register(engine)
+        if replica_engine is not None:
+            QueryInstrumentation.register(replica_engine)
+        config['pylons.app_globals'].request_histograms = RouteHistograms()
+    else:
+        config['pylons.app_globals'].request_histograms = None
+
+    # Optional Prometheus metrics. The exporter thread is started by make_app
+    if metrics_enabled:
+        config['pylons.app_globals'].metrics = ProcessCounters()
+        config['pylons.app_globals'].metrics_exporter = MetricsExporter(
+            directory=config.get('fts3.MetricsDirectory', os.path.join(config['cache_dir'], 'metrics')),
+            counters=config['pylons.app_globals'].metrics,
+            histograms=config['pylons.app_globals'].request_histograms,
+            pool_monitor=pool_monitor,
+            flush_interval=int(config.get('fts3.MetricsFlushInterval', 5)),
+            queue_interval=int(config.get('fts3.MetricsQueueInterval', 60)),
+            msg_dir=config.get('fts3.MessagingDirectory', '/var/lib/fts3')
+        )
+    else:
+        config['pylons.app_globals'].metrics = None
+        config['pylons.app_globals'].metrics_exporter = None
+
+    # Optional non blocking logging
+    if asbool(config.get('fts3.AsyncLogging', False)):
+        install_async_logging(
+            queue_size=int(config.get('fts3.LogQueueSize', 10000)),
+            counters=config['pylons.app_globals'].metrics
+        )
+
     # Mako templating
     config['pylons.app_globals'].mako_lookup = TemplateLookup(
         directories=paths['templates'],
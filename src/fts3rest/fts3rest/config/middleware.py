@@ -26,10 +26,13 @@ from pylons.wsgiapp import PylonsApp
 from routes.middleware import RoutesMiddleware
 
 from fts3rest.lib.heartbeat import Heartbeat
+from fts3rest.lib.middleware.compression import CompressionMiddleware
 from fts3rest.lib.middleware.fts3auth import FTS3AuthMiddleware
 from fts3rest.lib.middleware.error_as_json import ErrorAsJson
+from fts3rest.lib.middleware.instrumentation import InstrumentationMiddleware
 from fts3rest.lib.middleware.request_logger import RequestLogger
 from fts3rest.lib.middleware.timeout import TimeoutHandler
+from fts3rest.lib.profiler import RequestProfiler
 from fts3rest.config.environment import load_environment
 
 
@@ -66,6 +69,10 @@ def make_app(global_conf, full_stack=True, static_files=True, **app_conf):
     app = RoutesMiddleware(app, config['routes.map'])
     app = SessionMiddleware(app, config)
 
+    # Per request profiling, if enabled. It needs the credentials, so it goes under the authentication
+    if asbool(config.get('fts3.Profiling', False)):
+        app = RequestProfiler(app, config)
+
     # FTS3 authentication/authorization middleware
     app = FTS3AuthMiddleware(app, config)
 
@@ -75,6 +82,14 @@ def make_app(global_conf, full_stack=True, static_files=True, **app_conf):
     # Convert errors to a json representation
     app = ErrorAsJson(app, config)
 
+    # Compress the responses, if the client accepts it
+    if asbool(config.get('fts3.Compression', True)):
+        app = CompressionMiddleware(app, config)
+
+    # Query counting and timing, if enabled
+    if config['pylons.app_globals'].request_histograms is not None:
+        app = InstrumentationMiddleware(app, config, config['pylons.app_globals'].request_histograms)
+
     # Request logging
     app = RequestLogger(app, config)
 
@@ -95,4 +110,8 @@ def make_app(global_conf, full_stack=True, static_files=True, **app_conf):
     # Heartbeat thread
     Heartbeat('fts_rest', int(config.get('fts3.HeartBeatInterval', 60))).start()
 
+    # Metrics exporter thread
+    if config['pylons.app_globals'].metrics_exporter is not None:
+        config['pylons.app_globals'].metrics_exporter.start()
+
     return app
@@ -52,6 +52,8 @@ def do_connect(config, map):
                 conditions=dict(method=['GET']))
     map.connect('/jobs/', controller='jobs', action='index',
                 conditions=dict(method=['GET']))
+    map.connect('/jobs/summary', controller='jobs', action='get_summaries',
+                conditions=dict(method=['GET']))
     map.connect('/jobs/{job_list}', controller='jobs', action='get',
                 conditions=dict(method=['GET']))
     map.connect('/jobs/{job_id}/files', controller='jobs', action='get_files',
@@ -66,6 +68,8 @@ def do_connect(config, map):
                 conditions=dict(method=['GET']))
     map.connect('/jobs/{job_id}/dm', controller='jobs', action='get_dm',
                 conditions=dict(method=['GET']))
+    map.connect('/jobs/{job_id}/summary', controller='jobs', action='get_summary',
+                conditions=dict(method=['GET']))
     map.connect('/jobs/{job_id}/{field}', controller='jobs', action='get_field',
                 conditions=dict(method=['GET']))
     map.connect('/jobs/{job_id_list}', controller='jobs', action='cancel',
@@ -86,8 +90,12 @@ def do_connect(config, map):
                 conditions=dict(method=['GET']))
     map.connect('/archive/', controller='archive', action='index',
                 conditions=dict(method=['GET']))
+    map.connect('/archive/files', controller='archive', action='list_files',
+                conditions=dict(method=['GET']))
     map.connect('/archive/{job_id}', controller='archive', action='get',
                 conditions=dict(method=['GET']))
+    map.connect('/archive/{job_id}/files', controller='archive', action='get_files',
+                conditions=dict(method=['GET']))
     map.connect('/archive/{job_id}/{field}', controller='archive',
                 action='get_field',
                 conditions=dict(method=['GET']))
@@ -168,6 +176,12 @@ def do_connect(config, map):
     map.connect('/config/activity_shares/{vo_name}', controller='config/activities', action='delete_activity_shares',
                 conditions=dict(method=['DELETE']))
 
+    # Import and export the whole configuration
+    map.connect('/config/bulk', controller='config/bulk', action='import_config',
+                conditions=dict(method=['POST']))
+    map.connect('/config/export', controller='config/bulk', action='export_config',
+                conditions=dict(method=['GET']))
+
     # Configure cloud storages
     map.connect('/config/cloud_storage', controller='config/cloud', action='get_cloud_storages',
                 conditions=dict(method=['GET']))
@@ -207,6 +221,8 @@ def do_connect(config, map):
                 conditions=dict(method=['POST']))
     map.connect('/dm/rename', controller='datamanagement', action='rename',
                 conditions=dict(method=['POST']))
+    map.connect('/dm/bulk', controller='datamanagement', action='bulk',
+                conditions=dict(method=['POST']))
 
     # Banning
     map.connect('/ban/se', controller='banning', action='ban_se',
@@ -238,3 +254,17 @@ def do_connect(config, map):
     # State check
     map.connect('/status/hosts', controller='serverstatus', action='hosts_activity',
                 conditions=dict(method=['GET']))
+    map.connect('/status/dbpool', controller='serverstatus', action='db_pool',
+                conditions=dict(method=['GET']))
+    map.connect('/status/requests', controller='serverstatus', action='request_stats',
+                conditions=dict(method=['GET']))
+    map.connect('/status/oauth2tokens', controller='serverstatus', action='oauth2_token_stats',
+                conditions=dict(method=['GET']))
+    map.connect('/status/profile', controller='serverstatus', action='profile',
+                conditions=dict(method=['GET']))
+    map.connect('/status/profile/{name}', controller='serverstatus', action='profile_result',
+                conditions=dict(method=['GET']))
+
+    # Metrics
+    map.connect('/metrics', controller='metrics', action='metrics',
+                conditions=dict(method=['GET']))
@@ -15,14 +15,64 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from webob.exc import HTTPNotFound, HTTPForbidden
+try:
+    import simplejson as json
+except:
+    import json
+import time
+from datetime import datetime
+from pylons import request, response
 
-from fts3.model import ArchivedJob
+from fts3.model import ArchivedJob, ArchivedFile
 from fts3rest.lib.api import doc
 from fts3rest.lib.base import BaseController, Session
 from fts3rest.lib.helpers import jsonify
-from fts3rest.lib.middleware.fts3auth import authorized
+from fts3rest.lib.helpers.jsonify import ClassEncoder
+from fts3rest.lib.http_exceptions import *
+from fts3rest.lib.middleware.fts3auth import authorize, authorized
 from fts3rest.lib.middleware.fts3auth.constants import *
+from fts3rest.lib.middleware.instrumentation import record_serialization
+from fts3rest.lib.replica import read_replica
+
+# Maximum number of archived files returned per page
+MAX_PAGE_SIZE = 10000
+
+
+def _file_columns(fields):
+    """
+    Attributes of ArchivedFile to retrieve, all if fields is empty
+    """
+    all_columns = [column.key for column in ArchivedFile.__mapper__.column_attrs]
+    if not fields:
+        return all_columns
+    columns = fields.split(',')
+    for column in columns:
+        if column not in all_columns:
+            raise HTTPBadRequest('Unknown field %s' % column)
+    # Needed for the pagination
+    if 'file_id' not in columns:
+        columns.insert(0, 'file_id')
+    return columns
+
+
+def _project(query_columns, rows):
+    """
+    Turn the rows into dictionaries
+    """
+    for row in rows:
+        yield dict(zip(query_columns, row))
+
+
+def _parse_datetime(name):
+    value = request.params.get(name, None)
+    if not value:
+        return None
+    for date_format in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    raise HTTPBadRequest('%s must be in the format YYYY-MM-DD[THH:MM:SS]' % name)
 
 
 class ArchiveController(BaseController):
@@ -54,23 +104,137 @@ class ArchiveController(BaseController):
                     'href': '/archive/{id}',
                     'title': 'Archived job information',
                     'templated': True
+                },
+                'fts:archivedFiles': {
+                    'href': '/archive/files{?vo_name,source_se,dest_se,file_state,finished_since,finished_until,fields,limit,after}',
+                    'title': 'Archived transfers',
+                    'templated': True
                 }
             }
         }
 
     @doc.response(404, 'The job doesn\'t exist')
     @doc.return_type(ArchivedJob)
+    @read_replica(max_staleness=600)
     @jsonify
     def get(self, job_id):
         """
         Get the job with the given ID
         """
         job = self._get_job(job_id)
-        # Trigger the query, so it is serialized
-        files = job.files
-        return job
+        # The files are retrieved as plain tuples, not loaded through the relation
+        job_dict = dict((column.key, getattr(job, column.key)) for column in ArchivedJob.__mapper__.column_attrs)
+        columns = _file_columns(None)
+        files = Session.query(*[getattr(ArchivedFile, c) for c in columns])\
+            .filter(ArchivedFile.job_id == job_id).order_by(ArchivedFile.file_id)
+        job_dict['files'] = _project(columns, files.yield_per(100))
+        return job_dict
+
+    @doc.query_arg('fields', 'Comma separated list of file fields to retrieve')
+    @doc.response(400, 'Unknown field')
+    @doc.response(404, 'The job doesn\'t exist')
+    @doc.return_type(array_of=ArchivedFile)
+    @read_replica(max_staleness=600)
+    @jsonify
+    def get_files(self, job_id):
+        """
+        Get the archived files of the job
+        """
+        self._get_job(job_id)
+        columns = _file_columns(request.params.get('fields', None))
+        files = Session.query(*[getattr(ArchivedFile, c) for c in columns])\
+            .filter(ArchivedFile.job_id == job_id).order_by(ArchivedFile.file_id)
+        return _project(columns, files.yield_per(100))
+
+    @doc.query_arg('vo_name', 'Filter by VO')
+    @doc.query_arg('source_se', 'Source storage element')
+    @doc.query_arg('dest_se', 'Destination storage element')
+    @doc.query_arg('file_state', 'Comma separated list of file states')
+    @doc.query_arg('finished_since', 'Files finished at or after this time (YYYY-MM-DD[THH:MM:SS], UTC)')
+    @doc.query_arg('finished_until', 'Files finished before this time (YYYY-MM-DD[THH:MM:SS], UTC)')
+    @doc.query_arg('fields', 'Comma separated list of file fields to retrieve')
+    @doc.query_arg('limit', 'Maximum number of files to return (default and maximum 10000)')
+    @doc.query_arg('after', 'Return files with an id greater than this one. Use the "next" value of the previous page')
+    @doc.response(400, 'Invalid filter')
+    @doc.response(403, 'Operation forbidden')
+    @authorize(TRANSFER)
+    @read_replica(max_staleness=600)
+    def list_files(self):
+        """
+        List archived files, ordered by file id.
+        The response is an object with the list of files, and the value of "after" to use for the next page,
+        or null if there are no more
+        """
+        user = request.environ['fts3.User.Credentials']
+
+        filter_vo = request.params.get('vo_name', None)
+        filter_source = request.params.get('source_se', None)
+        filter_dest = request.params.get('dest_se', None)
+        filter_state = request.params.get('file_state', None)
+        finished_since = _parse_datetime('finished_since')
+        finished_until = _parse_datetime('finished_until')
+        columns = _file_columns(request.params.get('fields', None))
+        try:
+            limit = max(1, min(int(request.params.get('limit', MAX_PAGE_SIZE)), MAX_PAGE_SIZE))
+            after = request.params.get('after', None)
+            if after is not None:
+                after = long(after)
+        except ValueError:
+            raise HTTPBadRequest('limit and after must be integers')
+
+        # Automatically apply filters depending on granted level
+        filter_dn = None
+        granted_level = user.get_granted_level_for(TRANSFER)
+        if granted_level == PRIVATE:
+            filter_dn = user.user_dn
+        elif granted_level == VO:
+            filter_vo = user.vos[0]
+        elif granted_level == NONE:
+            raise HTTPForbidden('User not allowed to list archived transfers')
+
+        files = Session.query(*[getattr(ArchivedFile, c) for c in columns])
+        if filter_vo or filter_dn:
+            files = files.join(ArchivedJob, ArchivedJob.job_id == ArchivedFile.job_id)
+            if filter_vo:
+                files = files.filter(ArchivedJob.vo_name == filter_vo)
+            if filter_dn:
+                files = files.filter(ArchivedJob.user_dn == filter_dn)
+        if filter_source:
+            files = files.filter(ArchivedFile.source_se == filter_source)
+        if filter_dest:
+            files = files.filter(ArchivedFile.dest_se == filter_dest)
+        if filter_state:
+            files = files.filter(ArchivedFile.file_state.in_(filter_state.split(',')))
+        if finished_since:
+            files = files.filter(ArchivedFile.finish_time >= finished_since)
+        if finished_until:
+            files = files.filter(ArchivedFile.finish_time < finished_until)
+        if after is not None:
+            files = files.filter(ArchivedFile.file_id > after)
+        files = files.order_by(ArchivedFile.file_id).limit(limit)
+
+        response.headers['Content-Type'] = 'application/json'
+
+        def _stream():
+            count = 0
+            last_id = None
+            yield '{"files":['
+            for entry in _project(columns, files.yield_per(1000)):
+                start = time.time()
+                serialized = json.dumps(entry, cls=ClassEncoder)
+                record_serialization(time.time() - start)
+                if count:
+                    yield ','
+                yield serialized
+                count += 1
+                last_id = entry['file_id']
+            next_after = last_id if count == limit else None
+            yield '],"next":%s}' % json.dumps(next_after)
+
+        return _stream()
 
     @doc.response(404, 'The job or the field doesn\'t exist')
+    @read_replica(max_staleness=600)
     @jsonify
     def get_field(self, job_id, field):
         """
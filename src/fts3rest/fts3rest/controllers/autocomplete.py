@@ -13,11 +13,10 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from pylons import request
+from pylons import app_globals, request
 
-from fts3.model import Credential, LinkConfig, Job
 from fts3rest.lib.api import doc
-from fts3rest.lib.base import BaseController, Session
+from fts3rest.lib.base import BaseController
 from fts3rest.lib.helpers import jsonify
 from fts3rest.lib.middleware.fts3auth import authorize
 from fts3rest.lib.middleware.fts3auth.constants import *
@@ -36,8 +35,7 @@ class AutocompleteController(BaseController):
     	Autocomplete for users' dn
     	"""
         term = request.params.get('term', '/DC=cern.ch')
-        matches = Session.query(Credential.dn).filter(Credential.dn.startswith(term)).distinct().all()
-        return map(lambda r: r[0], matches)
+        return app_globals.autocomplete.search('dn', term)
 
     @doc.query_arg('term', 'Beginning of the source storage')
     @authorize(CONFIG)
@@ -47,9 +45,7 @@ class AutocompleteController(BaseController):
         Autocomplete source SE
         """
         term = request.params.get('term', 'srm://')
-        matches = Session.query(LinkConfig.source)\
-            .filter(LinkConfig.source.startswith(term)).distinct().all()
-        return map(lambda r: r[0], matches)
+        return app_globals.autocomplete.search('source', term)
 
     @doc.query_arg('term', 'Beginning of the destination storage')
     @authorize(CONFIG)
@@ -59,9 +55,7 @@ class AutocompleteController(BaseController):
         Autocomplete destination SE
         """
         term = request.params.get('term', 'srm://')
-        matches = Session.query(LinkConfig.destination)\
-            .filter(LinkConfig.destination.startswith(term)).distinct().all()
-        return map(lambda r: r[0], matches)
+        return app_globals.autocomplete.search('destination', term)
 
     @doc.query_arg('term', 'Beginning of the destination storage')
     @authorize(CONFIG)
@@ -71,15 +65,7 @@ class AutocompleteController(BaseController):
         Autocomplete a storage, regardless of it being source or destination
         """
         term = request.params.get('term', 'srm://')
-        src_matches = Session.query(LinkConfig.source)\
-            .filter(LinkConfig.source.startswith(term)).distinct().all()
-        dest_matches = Session.query(LinkConfig.destination)\
-            .filter(LinkConfig.destination.startswith(term)).distinct().all()
-
-        srcs = map(lambda r: r[0], src_matches)
-        dsts = map(lambda r: r[0], dest_matches)
-
-        return set(srcs).union(set(dsts))
+        return app_globals.autocomplete.search('storage', term)
 
     @doc.query_arg('term', 'Beginning of the VO')
     @authorize(CONFIG)
@@ -89,6 +75,4 @@ class AutocompleteController(BaseController):
         Autocomplete VO
         """
         term = request.params.get('term', 'srm://')
-        matches = Session.query(Job.vo_name)\
-            .filter(Job.vo_name.startswith(term)).distinct().all()
-        return map(lambda r: r[0], matches)
+        return app_globals.autocomplete.search('vo', term)
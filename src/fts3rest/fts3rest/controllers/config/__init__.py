@@ -27,6 +27,7 @@ from pylons import request
 
 from fts3.model import *
 from fts3rest.lib.base import BaseController, Session
+from fts3rest.lib.config_cache import bump_config_version
 from fts3rest.lib.helpers import accept
 from fts3rest.lib.http_exceptions import HTTPBadRequest
 from fts3rest.lib.middleware.fts3auth import authorize
@@ -38,7 +39,8 @@ log = logging.getLogger(__name__)
 
 def audit_configuration(action, config):
     """
-    Logs and stores in the DB a configuration action
+    Logs and stores in the DB a configuration action, and bumps the configuration version
+    so the cached configuration is reloaded
     """
     audit = ConfigAudit(
         datetime=datetime.utcnow(),
@@ -47,6 +49,7 @@ def audit_configuration(action, config):
         action=action
     )
     Session.add(audit)
+    bump_config_version(Session)
     log.info(action)
 
 
@@ -57,7 +60,13 @@ def validate_type(Type, key, value):
     column = Type.__table__.columns.get(key, None)
     if column is None:
         raise HTTPBadRequest('Field %s unknown' % key)
+    return validate_column_type(column, key, value)
 
+
+def validate_column_type(column, key, value):
+    """
+    Validate that value is of a suitable type for the column
+    """
     type_map = {
         Integer: int,
         String: basestring,
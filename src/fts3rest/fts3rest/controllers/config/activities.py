@@ -26,6 +26,7 @@ from fts3.model import *
 from fts3rest.controllers.config import audit_configuration
 from fts3rest.lib.api import doc
 from fts3rest.lib.base import BaseController, Session
+from fts3rest.lib.config_cache import config_cache
 from fts3rest.lib.helpers import jsonify, accept, get_input_as_dict
 from fts3rest.lib.http_exceptions import *
 from fts3rest.lib.middleware.fts3auth import authorize, require_certificate
@@ -61,6 +62,16 @@ def _new_activity_share_format(share):
     return new_share
 
 
+def _load_activity_shares(session):
+    response = dict()
+    for activity_share in session.query(ActivityShare):
+        response[activity_share.vo] = dict(
+            share=_new_activity_share_format(activity_share.activity_share),
+            active=activity_share.active
+        )
+    return response
+
+
 class ActivitiesConfigController(BaseController):
     """
     Activity shares configuration
@@ -74,15 +85,10 @@ class ActivitiesConfigController(BaseController):
         """
         Get all activity shares
         """
-        response = dict()
-        for activity_share in Session.query(ActivityShare):
-            response[activity_share.vo] = dict(
-                share=_new_activity_share_format(activity_share.activity_share),
-                active=activity_share.active
-            )
-        return response
+        return config_cache.get(Session, 'activity_shares', _load_activity_shares)
 
     @doc.response(403, 'The user is not allowed to see the configuration')
+    @doc.response(404, 'There are no activity shares for the VO')
     @require_certificate
     @authorize(CONFIG)
     @jsonify
@@ -90,11 +96,10 @@ class ActivitiesConfigController(BaseController):
         """
         Get activity shares for a given VO
         """
-        activity_share = Session.query(ActivityShare).get(vo_name)
-        return dict(
-            share=_new_activity_share_format(activity_share.activity_share),
-            active=activity_share.active
-        )
+        activity_shares = config_cache.get(Session, 'activity_shares', _load_activity_shares)
+        if vo_name not in activity_shares:
+            raise HTTPNotFound('No activity shares for %s' % vo_name)
+        return activity_shares[vo_name]
 
     @doc.response(400, 'Malformed activity share request')
     @doc.response(403, 'The user is not allowed to modify the configuration')
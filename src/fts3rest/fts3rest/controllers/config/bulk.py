@@ -0,0 +1,283 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+try:
+    import simplejson as json
+except:
+    import json
+import logging
+from paste.deploy.converters import asbool
+from pylons import request, response
+from sqlalchemy import and_, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import ColumnProperty, class_mapper
+
+from fts3.model import *
+from fts3rest.controllers.config import audit_configuration, validate_column_type
+from fts3rest.controllers.config.activities import _normalize_activity_share_format, _new_activity_share_format
+from fts3rest.lib.api import doc
+from fts3rest.lib.base import BaseController, Session
+from fts3rest.lib.helpers import jsonify, get_input_as_dict
+from fts3rest.lib.http_exceptions import *
+from fts3rest.lib.middleware.fts3auth import authorize
+from fts3rest.lib.middleware.fts3auth.constants import *
+
+
+__controller__ = 'BulkConfigController'
+log = logging.getLogger(__name__)
+
+# Sections of the configuration document, in the order they are inserted
+# (shares reference links, so they are deleted first)
+SECTIONS = [
+    ('links', LinkConfig),
+    ('se', Se),
+    ('operations', OperationConfig),
+    ('shares', ShareConfig),
+    ('activity_shares', ActivityShare),
+]
+
+
+def _columns(Type):
+    """
+    List of (attribute name, column) of the mapped type
+    """
+    columns = []
+    for prop in class_mapper(Type).iterate_properties:
+        if isinstance(prop, ColumnProperty):
+            columns.append((prop.key, prop.columns[0]))
+    return columns
+
+
+def _column_default(column):
+    if column.default is not None and column.default.is_scalar:
+        # Flags take booleans, the default is stored as the raw value
+        if isinstance(column.type, Flag):
+            return column.default.arg == column.type.positive
+        return column.default.arg
+    return None
+
+
+def _to_document(Type, key, value):
+    if Type is ActivityShare and key == 'activity_share' and isinstance(value, list):
+        return _new_activity_share_format(value)
+    return value
+
+
+def _validate_entry(section, Type, columns, entry):
+    """
+    Validate an entry of the document, and return it as a dictionary column key => value
+    Missing columns are not in the returned dictionary.
+    """
+    if not isinstance(entry, dict):
+        raise HTTPBadRequest('Entries of %s must be objects' % section)
+
+    known = dict(columns)
+    for key in entry.keys():
+        if key not in known:
+            raise HTTPBadRequest('Field %s unknown in %s' % (key, section))
+
+    values = dict()
+    for key, column in columns:
+        if key not in entry:
+            if column.primary_key:
+                raise HTTPBadRequest('Missing %s in %s' % (key, section))
+            continue
+        value = entry[key]
+        if value is None:
+            if column.primary_key:
+                raise HTTPBadRequest('Missing %s in %s' % (key, section))
+        elif Type is ActivityShare and key == 'activity_share':
+            try:
+                value = _normalize_activity_share_format(value)
+                for share in value:
+                    for weight in share.itervalues():
+                        if not type(weight) in (float, int):
+                            raise HTTPBadRequest('Share weight must be a number')
+            except AttributeError:
+                raise HTTPBadRequest('Malformed activity share for %s' % entry.get('vo'))
+            if len(json.dumps(value)) > column.type.length:
+                raise HTTPBadRequest('Activity share for %s is too long' % entry.get('vo'))
+        else:
+            value = validate_column_type(column, key, value)
+            if isinstance(column.type, String) and column.type.length and len(value) > column.type.length:
+                raise HTTPBadRequest('Field %s exceeds the allowed length of %d' % (key, column.type.length))
+        values[column.key] = value
+    return values
+
+
+class SectionDiff(object):
+    """
+    Differences between the entries of a section and the stored configuration
+    """
+
+    def __init__(self, Type):
+        self.table = Type.__table__
+        self.pk_columns = [column for key, column in _columns(Type) if column.primary_key]
+        self.inserts = []
+        self.updates = []
+        self.deletes = []
+        self.unchanged = 0
+
+    def _pk_match(self):
+        return and_(*[column == bindparam('_pk_' + column.key) for column in self.pk_columns])
+
+    def delete(self):
+        if self.deletes:
+            Session.execute(self.table.delete().where(self._pk_match()), self.deletes)
+
+    def upsert(self):
+        if self.inserts:
+            Session.execute(self.table.insert(), self.inserts)
+        if self.updates:
+            Session.execute(self.table.update().where(self._pk_match()), self.updates)
+
+    def summary(self):
+        return dict(
+            inserted=len(self.inserts), updated=len(self.updates), deleted=len(self.deletes),
+            unchanged=self.unchanged
+        )
+
+
+def _diff_section(section, Type, entries, replace):
+    """
+    Compare the entries with the stored configuration
+    """
+    if not isinstance(entries, list):
+        raise HTTPBadRequest('%s must be a list' % section)
+
+    columns = _columns(Type)
+    diff = SectionDiff(Type)
+    value_columns = [column for key, column in columns if not column.primary_key]
+
+    stored = dict()
+    for row in Session.query(*[getattr(Type, key) for key, column in columns]):
+        values = dict((column.key, value) for (key, column), value in zip(columns, row))
+        stored[tuple(values[column.key] for column in diff.pk_columns)] = values
+
+    seen = set()
+    for entry in entries:
+        values = _validate_entry(section, Type, columns, entry)
+        pk = tuple(values[column.key] for column in diff.pk_columns)
+        if pk in seen:
+            raise HTTPBadRequest('Duplicated entry in %s: %s' % (section, ', '.join(map(unicode, pk))))
+        seen.add(pk)
+
+        current = stored.get(pk, None)
+        if current is None:
+            for column in value_columns:
+                values.setdefault(column.key, _column_default(column))
+            diff.inserts.append(values)
+        else:
+            changed = dict(current)
+            changed.update(values)
+            if changed == current:
+                diff.unchanged += 1
+                continue
+            for column in diff.pk_columns:
+                changed['_pk_' + column.key] = changed.pop(column.key)
+            diff.updates.append(changed)
+
+    if replace:
+        for pk in stored.keys():
+            if pk not in seen:
+                diff.deletes.append(dict(('_pk_' + column.key, value) for column, value in zip(diff.pk_columns, pk)))
+
+    return diff
+
+
+class BulkConfigController(BaseController):
+    """
+    Import and export the whole configuration
+    """
+
+    @doc.query_arg('replace', 'If true, entries not in the document are removed from the sections present in it')
+    @doc.query_arg('dry_run', 'If true, the changes are computed, but not applied')
+    @doc.response(400, 'Invalid configuration document')
+    @doc.response(403, 'The user is not allowed to modify the configuration')
+    @doc.response(409, 'The configuration conflicts with the existing one')
+    @authorize(CONFIG)
+    @jsonify
+    def import_config(self):
+        """
+        Apply a configuration document, as returned by /config/export, in a single transaction.
+        Sections not present in the document are not modified
+        """
+        document = get_input_as_dict(request)
+        replace = asbool(request.params.get('replace', False))
+        dry_run = asbool(request.params.get('dry_run', False))
+
+        unknown = set(document.keys()) - set(section for section, Type in SECTIONS)
+        if unknown:
+            raise HTTPBadRequest('Unknown sections: %s' % ', '.join(unknown))
+
+        try:
+            diffs = []
+            for section, Type in SECTIONS:
+                if section in document:
+                    diffs.append((section, _diff_section(section, Type, document[section], replace)))
+            # Remove first, in reverse order, so entries go before those they reference
+            for section, diff in reversed(diffs):
+                diff.delete()
+            for section, diff in diffs:
+                diff.upsert()
+
+            summary = dict((section, diff.summary()) for section, diff in diffs)
+            changes = sum(counts['inserted'] + counts['updated'] + counts['deleted'] for counts in summary.values())
+            if dry_run or not changes:
+                Session.rollback()
+            else:
+                audit_configuration('bulk', json.dumps(summary))
+                Session.commit()
+        except IntegrityError, e:
+            Session.rollback()
+            raise HTTPConflict('The configuration conflicts with the existing one: %s' % str(e.orig))
+        except:
+            Session.rollback()
+            raise
+
+        return summary
+
+    @doc.response(403, 'The user is not allowed to query the configuration')
+    @authorize(CONFIG)
+    def export_config(self):
+        """
+        Export the link, storage, operation limits, shares and activity shares configuration.
+        The output can be sent back to /config/bulk
+        """
+        response.headers['Content-Type'] = 'application/json'
+
+        def _export():
+            yield '{'
+            for index, (section, Type) in enumerate(SECTIONS):
+                columns = _columns(Type)
+                pk = [getattr(Type, key) for key, column in columns if column.primary_key]
+                query = Session.query(*[getattr(Type, key) for key, column in columns])\
+                    .order_by(*pk).yield_per(100)
+                if index:
+                    yield ','
+                yield '%s:[' % json.dumps(section)
+                comma = False
+                for row in query:
+                    entry = dict(
+                        (key, _to_document(Type, key, value)) for (key, column), value in zip(columns, row)
+                    )
+                    if comma:
+                        yield ','
+                    yield json.dumps(entry)
+                    comma = True
+                yield ']'
+            yield '}'
+
+        return _export()
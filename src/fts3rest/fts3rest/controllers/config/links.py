@@ -29,6 +29,7 @@ from fts3.model import *
 from fts3rest.controllers.config import audit_configuration, validate_type
 from fts3rest.lib.api import doc
 from fts3rest.lib.base import BaseController, Session
+from fts3rest.lib.config_cache import config_cache, detached
 from fts3rest.lib.helpers import jsonify, accept, get_input_as_dict
 from fts3rest.lib.http_exceptions import *
 from fts3rest.lib.middleware.fts3auth import authorize
@@ -39,6 +40,10 @@ __controller__ = 'LinkConfigController'
 log = logging.getLogger(__name__)
 
 
+def _load_link_configs(session):
+    return detached(session, session.query(LinkConfig).all())
+
+
 class LinkConfigController(BaseController):
     """
     Link configuration
@@ -113,7 +118,7 @@ class LinkConfigController(BaseController):
         """
         Get a list of all the links configured
         """
-        return Session.query(LinkConfig).all()
+        return config_cache.get(Session, 'links', _load_link_configs)
 
     @doc.response(403, 'The user is not allowed to query the configuration')
     @doc.response(404, 'The group or the member does not exist')
@@ -124,7 +129,11 @@ class LinkConfigController(BaseController):
         Get the existing configuration for a given link
         """
         sym_name = urllib.unquote(sym_name)
-        link = Session.query(LinkConfig).filter(LinkConfig.symbolicname == sym_name).first()
+        link = None
+        for link_cfg in config_cache.get(Session, 'links', _load_link_configs):
+            if link_cfg.symbolicname == sym_name:
+                link = link_cfg
+                break
         if not link:
             raise HTTPNotFound('Link %s does not exist' % sym_name)
         return link
@@ -28,6 +28,7 @@ from fts3.model import *
 from fts3rest.controllers.config import audit_configuration, validate_type
 from fts3rest.lib.api import doc
 from fts3rest.lib.base import BaseController, Session
+from fts3rest.lib.config_cache import bump_config_version, config_cache
 from fts3rest.lib.helpers import jsonify, accept, get_input_as_dict
 from fts3rest.lib.http_exceptions import *
 from fts3rest.lib.middleware.fts3auth import authorize
@@ -38,6 +39,36 @@ __controller__ = 'SeConfigurationController'
 log = logging.getLogger(__name__)
 
 
+def _load_se_config(session):
+    """
+    Merge the storage and operation limits configuration of all the storages
+    """
+    from_se = session.query(Se)
+    from_ops = session.query(OperationConfig)
+
+    # Merge both
+    response = dict()
+    for opt in from_se:
+        se = opt.storage
+        config = response.get(se, dict())
+        link_config = dict()
+        for attr in ['inbound_max_active', 'inbound_max_throughput', 'outbound_max_active', 'outbound_max_throughput', 'udt', 'ipv6', 'se_metadata', 'site', 'debug_level']:
+            link_config[attr] = getattr(opt, attr)
+            config['se_info'] = link_config
+        response[se] = config
+
+    for op in from_ops:
+        config = response.get(op.host, dict())
+        if 'operations' not in config:
+            config['operations'] = dict()
+        if op.vo_name not in config['operations']:
+            config['operations'][op.vo_name] = dict()
+        config['operations'][op.vo_name][op.operation] = op.concurrent_ops
+        response[op.host] = config
+
+    return response
+
+
 class SeConfigurationController(BaseController):
     """
     Grid storage configuration
@@ -102,32 +133,11 @@ class SeConfigurationController(BaseController):
         Get the configurations status for a given SE
         """
         se = request.params.get('se', None)
-        from_se = Session.query(Se)
-        from_ops = Session.query(OperationConfig)
+        response = config_cache.get(Session, 'se', _load_se_config)
         if se:
-            from_se = from_se.filter(Se.storage == se)
-            from_ops = from_ops.filter(OperationConfig.host == se)
-
-        # Merge both
-        response = dict()
-        for opt in from_se:
-            se = opt.storage
-            config = response.get(se, dict())
-            link_config = dict()
-            for attr in ['inbound_max_active', 'inbound_max_throughput', 'outbound_max_active', 'outbound_max_throughput', 'udt', 'ipv6', 'se_metadata', 'site', 'debug_level']:
-                link_config[attr] = getattr(opt, attr)
-                config['se_info'] = link_config
-            response[se] = config
-
-        for op in from_ops:
-            config = response.get(op.host, dict())
-            if 'operations' not in config:
-                config['operations'] = dict()
-            if op.vo_name not in config['operations']:
-                config['operations'][op.vo_name] = dict()
-            config['operations'][op.vo_name][op.operation] = op.concurrent_ops
-            response[op.host] = config
-
+            if se not in response:
+                return dict()
+            return {se: response[se]}
         return response
 
     @doc.query_arg('se', 'Storage element', required=True)
@@ -144,6 +154,7 @@ class SeConfigurationController(BaseController):
         try:
             Session.query(Se).filter(Se.storage == se).delete()
             Session.query(OperationConfig).filter(OperationConfig.host == se).delete()
+            bump_config_version(Session)
             Session.commit()
         except:
             Session.rollback()
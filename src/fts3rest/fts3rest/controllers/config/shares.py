@@ -29,6 +29,7 @@ from fts3.model import *
 from fts3rest.controllers.config import audit_configuration
 from fts3rest.lib.api import doc
 from fts3rest.lib.base import BaseController, Session
+from fts3rest.lib.config_cache import config_cache, detached
 from fts3rest.lib.helpers import jsonify, get_input_as_dict
 from fts3rest.lib.http_exceptions import *
 from fts3rest.lib.middleware.fts3auth import authorize
@@ -39,6 +40,10 @@ __controller__ = 'VoShareConfigController'
 log = logging.getLogger(__name__)
 
 
+def _load_shares(session):
+    return detached(session, session.query(ShareConfig).all())
+
+
 class VoShareConfigController(BaseController):
     """
     VO Share configuration
@@ -97,7 +102,7 @@ class VoShareConfigController(BaseController):
         """
         List the existing shares
         """
-        return Session.query(ShareConfig).all()
+        return config_cache.get(Session, 'shares', _load_shares)
 
     @doc.response(403, 'The user is not allowed to modify the configuration')
     @authorize(CONFIG)
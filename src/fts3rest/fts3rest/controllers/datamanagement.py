@@ -16,14 +16,18 @@
 #   limitations under the License.
 
 from datetime import datetime
-from pylons import request
+from paste.deploy.converters import asbool
+from pylons import config, request, response
 from pylons.controllers.util import abort
 from webob.exc import HTTPBadRequest
+from webob.util import status_reasons
+import Queue
 import errno
+import itertools
 import logging
-import os
 import stat
-import tempfile
+import threading
+import time
 import urlparse
 import urllib
 try:
@@ -36,12 +40,19 @@ from fts3rest.lib.api import doc
 from fts3rest.lib.base import BaseController, Session
 from fts3rest.lib.helpers import jsonify
 from fts3rest.lib.http_exceptions import HTTPAuthenticationTimeout
-from fts3rest.lib.gfal2_wrapper import Gfal2Wrapper, Gfal2Error
+from fts3rest.lib.gfal2_wrapper import GError, Gfal2Wrapper, Gfal2Error
 from fts3rest.lib.middleware.fts3auth import authorize
 from fts3rest.lib.middleware.fts3auth.constants import DATAMANAGEMENT
+from fts3rest.lib.proxy_store import proxy_store
 
 log = logging.getLogger(__name__)
 
+# Directory entry type, from dirent.h
+DT_DIR = 4
+
+# How many entries can be skipped before resetting the timeout of the listing
+SKIP_PROGRESS = 1000
+
 
 try:
     from fts3rest.controllers.CSdropbox import DropboxConnector
@@ -70,11 +81,7 @@ def _get_proxy():
     if cred.termination_time <= datetime.utcnow():
         raise HTTPAuthenticationTimeout('Delegated proxy expired (%s)' % user.delegation_id)
 
-    tmp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.pem', prefix='rest-proxy-', delete=False)
-    tmp_file.write(cred.proxy)
-    tmp_file.flush()
-    os.fsync(tmp_file.fileno())
-    return tmp_file
+    return proxy_store.acquire(cred.dlg_id, cred.proxy, cred.termination_time)
 
 
 def _http_status_from_errno(err_code):
@@ -140,6 +147,90 @@ def _list_impl(context, surl):
     return listing
 
 
+def _list_entry(entry, st_stat):
+    if st_stat is None:
+        # Without stat, rely on the entry type
+        if entry.d_type == DT_DIR:
+            return {'name': entry.d_name + '/'}
+        return {'name': entry.d_name}
+    d_name = entry.d_name
+    if stat.S_ISDIR(st_stat.st_mode):
+        d_name += '/'
+    return {
+        'name': d_name,
+        'size': st_stat.st_size,
+        'mode': st_stat.st_mode,
+        'mtime': st_stat.st_mtime
+    }
+
+
+def _list_stream_impl(context, surl, offset, limit, with_stat):
+    """
+    Generate the entries of the directory, skipping the first offset.
+    Generates up to limit + 1 entries, so the caller knows if there are more.
+    The skipped entries are read without stat, and a None is generated every SKIP_PROGRESS
+    of them, so skipping a big offset is not taken as a timeout.
+    """
+    dir_handle = context.opendir(surl)
+    position = 0
+    while position < offset:
+        if not dir_handle.read():
+            return
+        position += 1
+        if position % SKIP_PROGRESS == 0:
+            yield None
+
+    if with_stat:
+        read = dir_handle.readpp
+    else:
+        read = lambda: (dir_handle.read(), None)
+    (entry, st_stat) = read()
+    while entry:
+        yield _list_entry(entry, st_stat)
+        if limit is not None and position >= offset + limit:
+            break
+        position += 1
+        (entry, st_stat) = read()
+
+
+class _ReleaseProxyWhenDone(object):
+    """
+    Streamed listing that gives back the proxy, and stops the listing, once the WSGI server
+    closes it, even if it was never iterated (i.e. HEAD, or the client went away)
+    """
+
+    def __init__(self, response, entries, proxy):
+        self.response = response
+        self.entries = entries
+        self.proxy = proxy
+        self.released = False
+
+    def __iter__(self):
+        return iter(self.response)
+
+    def close(self):
+        try:
+            self.response.close()
+            self.entries.close()
+        finally:
+            if not self.released:
+                self.released = True
+                proxy_store.release(self.proxy)
+
+
+def _get_list_page():
+    try:
+        offset = int(request.params.get('offset', 0))
+        limit = request.params.get('limit', None)
+        if limit is not None:
+            limit = int(limit)
+    except ValueError:
+        raise HTTPBadRequest('offset and limit must be integers')
+    if offset < 0 or (limit is not None and limit < 1):
+        raise HTTPBadRequest('offset must be positive, and limit greater than 0')
+    return offset, limit
+
+
 def _rename_impl(context, rename_dict):
     if len(rename_dict['old']) == 0 or len(rename_dict['new']) == 0:
         raise HTTPBadRequest('No old or name specified')
@@ -189,12 +280,158 @@ def _mkdir_impl(context, mkdir_dict):
     return context.mkdir(str(path), 0775)
 
 
+# Operations accepted by /dm/bulk, with their mandatory fields
+_BULK_OPERATIONS = {
+    'stat': (('surl',), lambda context, operation: _stat_impl(context, str(operation['surl']))),
+    'mkdir': (('surl',), lambda context, operation: context.mkdir(str(operation['surl']), 0775)),
+    'unlink': (('surl',), lambda context, operation: context.unlink(str(operation['surl']))),
+    'rmdir': (('surl',), lambda context, operation: context.rmdir(str(operation['surl']))),
+    'rename': (('old', 'new'), lambda context, operation: context.rename(str(operation['old']), str(operation['new']))),
+}
+
+
+def _bulk_impl(context, operations, parallelism, timeout):
+    """
+    Run the operations using up to parallelism threads sharing the context.
+    Generates (index, error code, error message, result) as they finish.
+    Operations running for longer than timeout seconds are reported as timed out,
+    and their thread is abandoned and replaced. Abandoned threads keep running until the
+    operation returns, so there are at most 2 * parallelism threads alive. Past that,
+    no thread is replaced, and once none is left working, the pending operations are
+    reported as timed out too.
+    """
+    context.set_opt_integer('CORE', 'NAMESPACE_TIMEOUT', timeout)
+    # The request is not available from the worker threads
+    for operation in operations:
+        if _is_dropbox(str(operation.get('surl', operation.get('old')))):
+            context = _set_dropbox_headers(context)
+            break
+
+    pending = Queue.Queue()
+    for index, operation in enumerate(operations):
+        pending.put((index, operation))
+    done = Queue.Queue()
+    running = dict()
+    lock = threading.Lock()
+    max_threads = 2 * parallelism
+    # Threads alive, and those of them not abandoned
+    threads = dict(alive=0, working=0)
+
+    def _worker():
+        try:
+            while True:
+                try:
+                    index, operation = pending.get_nowait()
+                except Queue.Empty:
+                    with lock:
+                        threads['working'] -= 1
+                    return
+                with lock:
+                    running[index] = time.time()
+                try:
+                    outcome = (index, 0, None, _BULK_OPERATIONS[operation['op']][1](context, operation))
+                except GError, e:
+                    outcome = (index, e.code, e.message, None)
+                except Exception, e:
+                    outcome = (index, errno.EIO, str(e), None)
+                with lock:
+                    abandoned = running.pop(index, None) is None
+                if abandoned:
+                    return
+                done.put(outcome)
+        finally:
+            with lock:
+                threads['alive'] -= 1
+
+    def _start_worker():
+        with lock:
+            if threads['alive'] >= max_threads:
+                return
+            threads['alive'] += 1
+            threads['working'] += 1
+        thread = threading.Thread(target=_worker)
+        thread.daemon = True
+        thread.start()
+
+    for i in xrange(min(parallelism, len(operations))):
+        _start_worker()
+
+    reported = 0
+    while reported < len(operations):
+        try:
+            yield done.get(timeout=1)
+            reported += 1
+        except Queue.Empty:
+            pass
+        now = time.time()
+        with lock:
+            expired = [index for index, start in running.iteritems() if now - start > timeout]
+            for index in expired:
+                del running[index]
+            threads['working'] -= len(expired)
+        for index in expired:
+            yield (index, errno.ETIMEDOUT, 'Timeout expired', None)
+            reported += 1
+            _start_worker()
+        with lock:
+            stalled = threads['working'] == 0
+        # Too many threads hung, nothing is going to pick the rest
+        while stalled:
+            try:
+                index, operation = pending.get_nowait()
+            except Queue.Empty:
+                break
+            yield (index, errno.ETIMEDOUT, 'Timeout expired, too many operations hung', None)
+            reported += 1
+
+
+def _get_bulk_operations():
+    try:
+        operations = json.loads(request.body)
+    except ValueError, e:
+        raise HTTPBadRequest('Malformed request: %s' % str(e))
+    if not isinstance(operations, list):
+        raise HTTPBadRequest('Expecting a list of operations')
+
+    max_operations = int(config.get('fts3.BulkDataManagementMaxOperations', 10000))
+    if len(operations) > max_operations:
+        raise HTTPBadRequest('Too many operations, the limit is %d' % max_operations)
+
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get('op', None) not in _BULK_OPERATIONS:
+            raise HTTPBadRequest('Invalid operation: %s' % json.dumps(operation))
+        for field in _BULK_OPERATIONS[operation['op']][0]:
+            value = operation.get(field, None)
+            if not isinstance(value, basestring) or not value:
+                raise HTTPBadRequest('Missing %s for %s' % (field, operation['op']))
+            if urlparse.urlparse(value).scheme in ['file']:
+                raise HTTPBadRequest('Forbiden SURL scheme')
+    return operations
+
+
+def _bulk_status(operation, code, message, result):
+    status = dict(operation)
+    if code:
+        http_code = _http_status_from_errno(code)
+        status['http_status'] = "%d %s" % (http_code, status_reasons[http_code])
+        status['http_message'] = "[%d] %s" % (code, message)
+    else:
+        status['http_status'] = '200 Ok'
+        if operation['op'] == 'stat':
+            status['stat'] = result
+    return status
+
+
 class DatamanagementController(BaseController):
     """
     Data management operations
     """
 
     @doc.query_arg('surl', 'Remote SURL', required=True)
+    @doc.query_arg('stream', 'If true, the entries are sent as they are read from the storage')
+    @doc.query_arg('offset', 'Number of entries to skip (stream mode only)')
+    @doc.query_arg('limit', 'Maximum number of entries to return (stream mode only)')
+    @doc.query_arg('stat', 'If false, size, mode and mtime are not retrieved (stream mode only)')
     @doc.response(400, 'Protocol not supported OR the SURL is not a directory')
     @doc.response(403, 'Permission denied')
     @doc.response(404, 'The SURL does not exist')
@@ -202,12 +439,21 @@ class DatamanagementController(BaseController):
     @doc.response(503, 'Try again later')
     @doc.response(500, 'Internal error')
     @authorize(DATAMANAGEMENT)
-    @jsonify
     def list(self):
         """
-        List the content of a remote directory
+        List the content of a remote directory.
+        By default, the response is an object indexed by entry name.
+        In stream mode, the response is an object with the list of entries, as they are read from the storage,
+        and "next", the offset to use to get the next page, or null if there are no more.
+        If the listing fails midway, the error is sent in "error".
         """
         surl = _get_valid_surl()
+        if asbool(request.params.get('stream', False)):
+            return self._list_stream(surl)
+        return self._list(surl)
+
+    @jsonify
+    def _list(self, surl):
         proxy = _get_proxy()
 
         m = Gfal2Wrapper(proxy, _list_impl)
@@ -216,7 +462,50 @@ class DatamanagementController(BaseController):
         except Gfal2Error, e:
             _http_error_from_gfal2_error(e)
         finally:
-            os.unlink(proxy.name)
+            proxy_store.release(proxy)
+
+    def _list_stream(self, surl):
+        offset, limit = _get_list_page()
+        with_stat = asbool(request.params.get('stat', True))
+        proxy = _get_proxy()
+
+        entries = Gfal2Wrapper(proxy, _list_stream_impl).stream(surl, offset, limit, with_stat)
+        # Wait for the first entry, so errors opening the directory get the proper status code
+        try:
+            first = [next(entries)]
+        except StopIteration:
+            first = []
+        except Gfal2Error, e:
+            proxy_store.release(proxy)
+            _http_error_from_gfal2_error(e)
+
+        response.headers['Content-Type'] = 'application/json'
+
+        def _stream():
+            count = 0
+            next_offset = None
+            error = None
+            yield '{"entries":['
+            try:
+                for entry in itertools.chain(first, entries):
+                    if limit is not None and count == limit:
+                        next_offset = offset + limit
+                        break
+                    if count:
+                        yield ','
+                    yield json.dumps(entry)
+                    count += 1
+            except Gfal2Error, e:
+                log.warning("Listing of %s failed after %d entries: %s" % (surl, count, e.message))
+                error = "[%d] %s" % (e.errno, e.message)
+            finally:
+                entries.close()
+            if error:
+                yield '],"error":%s,"next":null}' % json.dumps(error)
+            else:
+                yield '],"next":%s}' % json.dumps(next_offset)
+
+        return _ReleaseProxyWhenDone(_stream(), entries, proxy)
 
     @doc.query_arg('surl', 'Remote SURL', required=True)
     @doc.response(400, 'Protocol not supported OR the SURL is not a directory')
@@ -240,7 +529,7 @@ class DatamanagementController(BaseController):
         except Gfal2Error, e:
             _http_error_from_gfal2_error(e)
         finally:
-            os.unlink(proxy.name)
+            proxy_store.release(proxy)
 
     @doc.query_arg('old', 'Old SURL name', required=True)
     @doc.query_arg('new', 'New SURL name', required=True)
@@ -283,7 +572,7 @@ class DatamanagementController(BaseController):
         except KeyError, e:
             raise HTTPBadRequest('Missing parameter: %s' % str(e))
         finally:
-            os.unlink(proxy.name)
+            proxy_store.release(proxy)
 
     @doc.query_arg('surl', 'Remote SURL', required=True)
     @doc.response(400, 'Protocol not supported OR the SURL is not a directory')
@@ -325,7 +614,7 @@ class DatamanagementController(BaseController):
         except KeyError, e:
             raise HTTPBadRequest('Missing parameter: %s' % str(e))
         finally:
-            os.unlink(proxy.name)
+            proxy_store.release(proxy)
 
     @doc.query_arg('surl', 'Remote SURL', required=True)
     @doc.response(400, 'Protocol not supported OR the SURL is not a directory')
@@ -366,7 +655,46 @@ class DatamanagementController(BaseController):
         except KeyError, e:
             raise HTTPBadRequest('Missing parameter: %s' % str(e))
         finally:
-            os.unlink(proxy.name)
+            proxy_store.release(proxy)
+
+    @doc.input('List of operations', 'array')
+    @doc.response(400, 'Malformed list of operations')
+    @doc.response(419, 'The credentials need to be re-delegated')
+    @doc.response(207, 'Some of the operations failed')
+    @authorize(DATAMANAGEMENT)
+    @jsonify
+    def bulk(self, start_response):
+        """
+        Run a list of operations with a single worker.
+        Each operation is an object with the field "op" (stat, mkdir, unlink, rmdir or rename), and
+        "surl", or "old" and "new" for rename.
+        The response has, in the same order, the operations with their http_status and http_message,
+        plus the result for stat
+        """
+        operations = _get_bulk_operations()
+        parallelism = int(config.get('fts3.BulkDataManagementParallelism', 8))
+        timeout = int(config.get('fts3.BulkDataManagementTimeout', 30))
+        proxy = _get_proxy()
+
+        # The worker itself is only killed if it does not report anything for too long
+        m = Gfal2Wrapper(proxy, _bulk_impl, timeout=timeout + 30)
+        statuses = [None] * len(operations)
+        try:
+            for index, code, message, result in m.stream(operations, parallelism, timeout):
+                statuses[index] = _bulk_status(operations[index], code, message, result)
+        except Gfal2Error, e:
+            log.warning("Bulk data management worker failed: %s" % e.message)
+            for index, status in enumerate(statuses):
+                if status is None:
+                    statuses[index] = _bulk_status(operations[index], e.errno, e.message, None)
+        finally:
+            proxy_store.release(proxy)
+
+        for status in statuses:
+            if not status['http_status'].startswith('2'):
+                start_response('207 Multi-Status', [('Content-Type', 'application/json')])
+                break
+        return statuses
 
     @doc.query_arg('surl', 'Remote SURL', required=True)
     @doc.response(400, 'Protocol not supported OR the SURL is not a directory')
@@ -405,4 +733,4 @@ class DatamanagementController(BaseController):
         except KeyError, e:
             raise HTTPBadRequest('Missing parameter: %s' % str(e))
         finally:
-            os.unlink(proxy.name)
\ No newline at end of file
+            proxy_store.release(proxy)
\ No newline at end of file
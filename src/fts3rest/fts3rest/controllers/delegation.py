@@ -385,7 +385,7 @@ class DelegationController(BaseController):
             raise HTTPForbidden('Delegated proxy already expired')
 
         try:
-            voms_client = voms.VomsClient(credential.proxy)
+            voms_client = voms.VomsClient(credential.proxy, credential.dlg_id)
             (new_proxy, new_termination_time) = voms_client.init(voms_list)
         except voms.VomsException, e:
             # Error generating the proxy because of the request itself
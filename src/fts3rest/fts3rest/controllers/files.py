@@ -27,10 +27,11 @@ from fts3.model import File
 from fts3rest.lib.api import doc
 from fts3rest.lib.base import BaseController, Session
 from fts3rest.lib.JobBuilder import get_storage_element
-from fts3rest.lib.helpers import jsonify
+from fts3rest.lib.helpers import jsonify_ndjson
 from fts3rest.lib.middleware.fts3auth import authorize
 from fts3rest.lib.middleware.fts3auth.constants import *
 from fts3rest.lib.http_exceptions import *
+from fts3rest.lib.replica import read_replica
 
 
 log = logging.getLogger(__name__)
@@ -52,10 +53,13 @@ class FilesController(BaseController):
     @doc.response(400, 'DN and delegation ID do not match')
     @doc.return_type(array_of=File)
     @authorize(TRANSFER)
-    @jsonify
+    @read_replica(max_staleness=10)
+    @jsonify_ndjson
     def index(self):
         """
         Get a list of active jobs, or those that match the filter requirements
+
+        Sent as newline delimited JSON, one object per line, if application/x-ndjson is preferred in the Accept header
         """
         user = request.environ['fts3.User.Credentials']
 
@@ -16,10 +16,11 @@
 #   limitations under the License.
 
 from datetime import datetime, timedelta
-from pylons import request
+from pylons import app_globals, config, request, response
 from requests.exceptions import HTTPError
+from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import noload
+from sqlalchemy.orm import ColumnProperty, class_mapper, noload
 
 from fts3rest.lib.helpers.msgbus import submit_state_change
 
@@ -27,22 +28,123 @@ try:
     import simplejson as json
 except ImportError:
     import json
+import hashlib
 import logging
+import threading
+import time
 
 from fts3.model import Job, File, JobActiveStates, FileActiveStates
 from fts3.model import DataManagement, DataManagementActiveStates
 from fts3.model import Credential, FileRetryLog
-from fts3rest.lib.JobBuilder import JobBuilder
+from fts3rest.lib.JobBuilder import BanningSnapshot, JobBuilder
 from fts3rest.lib.api import doc
 from fts3rest.lib.base import BaseController, Session
-from fts3rest.lib.helpers import jsonify, get_input_as_dict
+from fts3rest.lib.helpers import jsonify, jsonify_ndjson, get_input_as_dict
 from fts3rest.lib.http_exceptions import *
+from fts3rest.lib.job_summary_cache import job_summary_cache
 from fts3rest.lib.middleware.fts3auth import authorize, authorized
 from fts3rest.lib.middleware.fts3auth.constants import *
+from fts3rest.lib.replica import read_replica
 
 
 log = logging.getLogger(__name__)
 
+# Formats for the files requested with ?files=
+FILES_FORMATS = ('columnar', 'dictionary')
+# Fields with few distinct values, sent as indexes into a list of values with files_format=dictionary
+DICTIONARY_FIELDS = ('file_state', 'source_se', 'dest_se', 'vo_name', 'activity')
+
+
+def _columnar_files(job_id, file_fields, dictionary):
+    """
+    Files of the job as {"columns": [...], "rows": [[...], ...]}, in the order of their file id.
+    The rows are built in memory, so unlike the files as objects, they are not streamed.
+    Fields that are not columns of File are ignored.
+    If dictionary is True, the values of DICTIONARY_FIELDS are replaced by their index in
+    "dictionaries": {field: [values]}
+    """
+    known = set(prop.key for prop in class_mapper(File).iterate_properties if isinstance(prop, ColumnProperty))
+    columns = [field for field in file_fields if field in known]
+    if not columns:
+        count = Session.query(func.count(File.file_id)).filter(File.job_id == job_id).scalar()
+        return dict(columns=[], rows=[[]] * count)
+
+    query = Session.query(*[getattr(File, column) for column in columns])\
+        .filter(File.job_id == job_id)\
+        .order_by(File.file_id)\
+        .yield_per(1000)
+    if not dictionary:
+        return dict(columns=columns, rows=[list(row) for row in query])
+
+    encoded = [(position, column) for position, column in enumerate(columns) if column in DICTIONARY_FIELDS]
+    dictionaries = dict((column, []) for position, column in encoded)
+    indexes = dict((column, dict()) for position, column in encoded)
+    rows = []
+    for row in query:
+        row = list(row)
+        for position, column in encoded:
+            value = row[position]
+            index = indexes[column].get(value, None)
+            if index is None:
+                index = indexes[column][value] = len(dictionaries[column])
+                dictionaries[column].append(value)
+            row[position] = index
+        rows.append(row)
+    return dict(columns=columns, dictionaries=dictionaries, rows=rows)
+
+
+def _job_etag(summary):
+    """
+    Fingerprint of the state of a job: the job state, how many files and data management
+    operations are in each state, bytes done, and average throughput
+
+    Args:
+        summary: The summary of the job, as built by JobsController._summarize
+    """
+    fingerprint = "%s:%s:%s:%d:%s" % (
+        summary['job_state'],
+        ','.join(["%s=%d" % (state, count) for state, count in sorted(summary['files'].iteritems())]),
+        ','.join(["%s=%d" % (state, count) for state, count in sorted(summary['dm'].iteritems())]),
+        summary['bytes_done'],
+        # Rounded, so the order in which the database adds them up does not matter
+        '%.2f' % summary['throughput'] if summary['throughput'] is not None else ''
+    )
+    return hashlib.sha1(fingerprint).hexdigest()
+
+
+def _empty_summary(job_id, job_state):
+    return dict(
+        job_id=job_id, job_state=job_state, files=dict(), dm=dict(),
+        total_files=0, bytes_total=0, bytes_done=0, throughput=None
+    )
+
+
+def _job_description(submitted_dict):
+    """
+    Validate a job description, so it can be passed as keyword arguments to the JobBuilder
+    """
+    if not isinstance(submitted_dict, dict):
+        raise HTTPBadRequest('Expecting a dictionary')
+    reserved = [key for key in ('user', 'banning') if key in submitted_dict]
+    if reserved:
+        raise HTTPBadRequest('Unexpected fields in the job description: %s' % ', '.join(reserved))
+    return submitted_dict
+
+
+def _etag_matches(if_none_match, etag):
+    """
+    True if etag is one of those in the If-None-Match header. Weak etags are compared as strong,
+    since the compression weakens them
+    """
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == '*' or candidate.strip('"') == etag:
+            return True
+    return False
+
+
 def _multistatus(responses, start_response, expecting_multistatus=False):
     """
     Return 200 if everything is Ok, 207 if there is any errors,
@@ -57,13 +159,41 @@ def _multistatus(responses, start_response, expecting_multistatus=False):
             start_response(single['http_status'], [('Content-Type', 'application/json')])
         return single
 
-    for response in responses:
-        if isinstance(response, dict) and not response.get('http_status', '').startswith('2'):
+    for entry in responses:
+        if isinstance(entry, dict) and not entry.get('http_status', '').startswith('2'):
             start_response("207 Multi-Status", [('Content-Type', 'application/json')])
             break
     return responses
 
 
+class LongPollWaiters(object):
+    """
+    Number of requests of this process held by wait_until_change.
+    Each of them keeps a worker thread busy, so they are limited
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def acquire(self, limit):
+        """
+        Returns False if there are already limit requests waiting
+        """
+        with self.lock:
+            if self.count >= limit:
+                return False
+            self.count += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.count -= 1
+
+
+long_poll_waiters = LongPollWaiters()
+
+
 class JobsController(BaseController):
     """
     Operations on jobs and transfers
@@ -80,6 +210,109 @@ class JobsController(BaseController):
             raise HTTPForbidden('Not enough permissions to check the job "%s"' % job_id)
         return job
 
+    @staticmethod
+    def _get_job_etag(job_id, job_state=None):
+        """
+        Fingerprint of the state of a job, the same sent with its summary
+        """
+        if job_state is None:
+            job_state = Session.query(Job.job_state).filter(Job.job_id == job_id).scalar()
+        summary = _empty_summary(job_id, job_state)
+        JobsController._summarize({job_id: summary})
+        return summary['etag']
+
+    @staticmethod
+    def _summarize(pending):
+        """
+        Fill the summaries of the jobs: how many files and data management operations are in each state,
+        bytes of the files done and total, average throughput of the files, and the etag.
+        The files of all the jobs are aggregated by a single query, grouped by job and state.
+
+        Args:
+            pending: Dictionary job id => empty summary
+        """
+        throughputs = dict((job_id, [0.0, 0]) for job_id in pending.keys())
+        file_states = Session.query(
+                File.job_id, File.file_state, func.count(File.file_id), func.sum(File.filesize),
+                func.sum(File.throughput), func.count(File.throughput)
+            )\
+            .filter(File.job_id.in_(pending.keys()))\
+            .group_by(File.job_id, File.file_state)
+        for job_id, state, count, size, throughput_sum, throughput_count in file_states:
+            summary = pending[job_id]
+            summary['files'][state] = count
+            summary['total_files'] += count
+            summary['bytes_total'] += int(size or 0)
+            if state == 'FINISHED':
+                summary['bytes_done'] += int(size or 0)
+            throughputs[job_id][0] += float(throughput_sum or 0)
+            throughputs[job_id][1] += throughput_count
+
+        dm_states = Session.query(DataManagement.job_id, DataManagement.file_state, func.count(DataManagement.file_id))\
+            .filter(DataManagement.job_id.in_(pending.keys()))\
+            .group_by(DataManagement.job_id, DataManagement.file_state)
+        for job_id, state, count in dm_states:
+            pending[job_id]['dm'][state] = count
+
+        for job_id, summary in pending.iteritems():
+            throughput_sum, throughput_count = throughputs[job_id]
+            if throughput_count:
+                summary['throughput'] = throughput_sum / throughput_count
+            summary['etag'] = _job_etag(summary)
+
+    @staticmethod
+    def _get_summaries(job_ids, env):
+        """
+        Summaries of the jobs, as filled by _summarize.
+        Summaries of jobs in a terminal state are cached.
+
+        Returns:
+            A dictionary job id => summary, or the HTTPError if it can not be returned
+        """
+        found = dict(
+            (job.job_id, job) for job in
+            Session.query(Job.job_id, Job.job_state, Job.user_dn, Job.vo_name).filter(Job.job_id.in_(job_ids))
+        )
+
+        summaries = dict()
+        pending = dict()
+        for job_id in job_ids:
+            job = found.get(job_id, None)
+            if job is None:
+                summaries[job_id] = HTTPNotFound('No job with the id "%s" has been found' % job_id)
+            elif not authorized(TRANSFER, resource_owner=job.user_dn, resource_vo=job.vo_name, env=env):
+                summaries[job_id] = HTTPForbidden('Not enough permissions to check the job "%s"' % job_id)
+            else:
+                summaries[job_id] = job_summary_cache.get(job_id, job.job_state)
+                if summaries[job_id] is None:
+                    pending[job_id] = summaries[job_id] = _empty_summary(job_id, job.job_state)
+        if not pending:
+            return summaries
+
+        JobsController._summarize(pending)
+        for summary in pending.values():
+            job_summary_cache.put(summary)
+        return summaries
+
+    @staticmethod
+    def _wait_for_change(job_id, etag, timeout):
+        """
+        Block until the etag of the job differs from the given one, or until timeout expires.
+        State changes are done by the FTS3 server, so the database needs to be checked.
+        The session is closed between checks, so the connection goes back to the pool while waiting.
+
+        Returns:
+            The current etag of the job
+        """
+        interval = float(config.get('fts3.LongPollInterval', 1))
+        deadline = time.time() + timeout
+        current = JobsController._get_job_etag(job_id)
+        while current == etag and time.time() + interval < deadline:
+            Session.close()
+            time.sleep(interval)
+            current = JobsController._get_job_etag(job_id)
+        return current
+
     @doc.query_arg('user_dn', 'Filter by user DN')
     @doc.query_arg('vo_name', 'Filter by VO')
     @doc.query_arg('dlg_id', 'Filter by delegation ID')
@@ -93,10 +326,13 @@ class JobsController(BaseController):
     @doc.response(400, 'DN and delegation ID do not match')
     @doc.return_type(array_of=Job)
     @authorize(TRANSFER)
-    @jsonify
+    @read_replica(max_staleness=10)
+    @jsonify_ndjson
     def index(self):
         """
         Get a list of active jobs, or those that match the filter requirements
+
+        Sent as newline delimited JSON, one object per line, if application/x-ndjson is preferred in the Accept header
         """
         user = request.environ['fts3.User.Credentials']
 
@@ -182,10 +418,15 @@ class JobsController(BaseController):
         return jobs
 
     @doc.query_arg('files', 'Comma separated list of file fields to retrieve in this query')
+    @doc.query_arg('files_format', 'Files as columns and rows (columnar), with repeated values encoded (dictionary)')
+    @doc.query_arg('wait_until_change', 'Hold the request until the etag of the job differs from this one. Single job only')
+    @doc.query_arg('timeout', 'Maximum number of seconds to wait for wait_until_change (default 60)')
     @doc.response(200, 'The jobs exist')
     @doc.response(207, 'Some job had an error')
     @doc.response(403, 'The user doesn\'t have enough privileges')
     @doc.response(404, 'The job doesn\'t exist')
+    @doc.response(400, 'wait_until_change used with multiple jobs, invalid timeout, or unknown files_format')
+    @doc.response(503, 'Too many requests waiting for a change')
     @doc.return_type(Job)
     @jsonify
     def get(self, job_list, start_response):
@@ -201,18 +442,47 @@ class JobsController(BaseController):
             file_fields = request.GET['files'].split(',')
         else:
             file_fields = []
+        files_format = request.GET.get('files_format', None)
+        if files_format and files_format not in FILES_FORMATS:
+            raise HTTPBadRequest('Unknown files_format, it must be one of: %s' % ', '.join(FILES_FORMATS))
+
+        etag = None
+        if 'wait_until_change' in request.GET:
+            if len(filter(len, job_ids)) != 1:
+                raise HTTPBadRequest('wait_until_change can only be used with a single job')
+            try:
+                timeout = float(request.GET.get('timeout', 60))
+            except ValueError:
+                raise HTTPBadRequest('Invalid timeout')
+            max_timeout = float(config.get('fts3.LongPollMaxTimeout', 60))
+            timeout = max(0, min(timeout, max_timeout))
+            # Check permissions before holding the request
+            JobsController._get_job(job_ids[0], env=environ)
+            if not long_poll_waiters.acquire(int(config.get('fts3.LongPollMaxWaiters', 10))):
+                raise HTTPServiceUnavailable('Too many requests waiting for a change, try again later')
+            try:
+                etag = JobsController._wait_for_change(job_ids[0], request.GET['wait_until_change'], timeout)
+            finally:
+                long_poll_waiters.release()
+            response.headers['ETag'] = '"%s"' % etag
 
         statuses = list()
         for job_id in filter(len, job_ids):
             try:
                 job = JobsController._get_job(job_id, env=environ)
-                if len(file_fields):
+                if len(file_fields) and files_format:
+                    job.__dict__['files'] = _columnar_files(
+                        job.job_id, file_fields, dictionary=(files_format == 'dictionary')
+                    )
+                elif len(file_fields):
                     class FileIterator(object):
                         def __init__(self, job_id):
                             self.job_id = job_id
 
                         def __call__(self):
-                            for f in Session.query(File).filter(File.job_id == self.job_id):
+                            files = Session.query(File).filter(File.job_id == self.job_id)\
+                                .order_by(File.file_id)
+                            for f in files:
                                 fd = dict()
                                 for field in file_fields:
                                     try:
@@ -221,6 +491,8 @@ class JobsController(BaseController):
                                         pass
                                 yield fd
                     job.__dict__['files'] = FileIterator(job.job_id)()
+                if etag:
+                    setattr(job, 'etag', etag)
                 setattr(job, 'http_status', '200 Ok')
                 statuses.append(job)
             except HTTPError, e:
@@ -256,10 +528,12 @@ class JobsController(BaseController):
     @doc.response(403, 'The user doesn\'t have enough privileges')
     @doc.response(404, 'The job doesn\'t exist')
     @doc.return_type(array_of=File)
-    @jsonify
+    @jsonify_ndjson
     def get_files(self, job_id):
         """
         Get the files within a job
+
+        Sent as newline delimited JSON, one object per line, if application/x-ndjson is preferred in the Accept header
         """
         owner = Session.query(Job.user_dn, Job.vo_name).filter(Job.job_id == job_id).first()
         if owner is None:
@@ -272,10 +546,12 @@ class JobsController(BaseController):
     @doc.response(403, 'The user doesn\'t have enough privileges')
     @doc.response(404, 'The job doesn\'t exist')
     @doc.return_type(array_of=DataManagement)
-    @jsonify
+    @jsonify_ndjson
     def get_dm(self, job_id):
         """
         Get the data management tasks within a job
+
+        Sent as newline delimited JSON, one object per line, if application/x-ndjson is preferred in the Accept header
         """
         owner = Session.query(Job.user_dn, Job.vo_name).filter(Job.job_id == job_id).first()
         if owner is None:
@@ -285,6 +561,68 @@ class JobsController(BaseController):
         dm = Session.query(DataManagement).filter(DataManagement.job_id == job_id)
         return dm.yield_per(100).enable_eagerloads(False)
 
+    @doc.response(304, 'The summary did not change since the etag given in If-None-Match')
+    @doc.response(403, 'The user doesn\'t have enough privileges')
+    @doc.response(404, 'The job doesn\'t exist')
+    @doc.return_type('Files and data management per state, bytes done and total, and average throughput')
+    @jsonify
+    def get_summary(self, job_id):
+        """
+        Get how many files of the job are in each state, and how much has been transferred
+
+        The etag is the same used by wait_until_change, and it is also sent in the ETag header.
+        If it matches If-None-Match, 304 is returned without computing the summary
+        """
+        if_none_match = request.headers.get('If-None-Match', None)
+        if if_none_match:
+            job = JobsController._get_job(job_id, env=request.environ)
+            cached = job_summary_cache.get(job_id, job.job_state)
+            if cached is not None:
+                etag = cached['etag']
+            else:
+                etag = JobsController._get_job_etag(job_id, job.job_state)
+            if _etag_matches(if_none_match, etag):
+                raise HTTPNotModified(headers=[('ETag', '"%s"' % etag)])
+
+        summary = JobsController._get_summaries([job_id], request.environ)[job_id]
+        if isinstance(summary, HTTPError):
+            raise summary
+        response.headers['ETag'] = '"%s"' % summary['etag']
+        return summary
+
+    @doc.query_arg('ids', 'Comma separated list of job ids', required=True)
+    @doc.response(207, 'Some job had an error')
+    @doc.response(400, 'No job id given')
+    @doc.return_type('Array of job summaries, as returned by /jobs/{job_id}/summary')
+    @jsonify
+    def get_summaries(self, start_response):
+        """
+        Get the summaries of several jobs at once
+        """
+        job_ids = filter(len, request.GET.get('ids', '').split(','))
+        if not job_ids:
+            raise HTTPBadRequest('No job id given')
+
+        summaries = JobsController._get_summaries(job_ids, request.environ)
+        responses = list()
+        multistatus = False
+        for job_id in job_ids:
+            summary = summaries[job_id]
+            if isinstance(summary, HTTPError):
+                responses.append(dict(
+                    job_id=job_id,
+                    http_status="%s %s" % (summary.code, summary.title),
+                    http_message=summary.detail
+                ))
+                multistatus = True
+            else:
+                # Cached summaries are shared, so do not modify them
+                responses.append(dict(summary, http_status='200 Ok'))
+
+        if multistatus:
+            start_response('207 Multi-Status', [('Content-Type', 'application/json')])
+        return responses
+
     @doc.response(403, 'The user doesn\'t have enough privileges')
     @doc.response(404, 'The job doesn\'t exist')
     @doc.return_type('File final states (array if multiple files were given)')
@@ -513,7 +851,126 @@ class JobsController(BaseController):
 
         return _multistatus(responses, start_response, expecting_multistatus=len(requested_job_ids) > 1)
 
+    @staticmethod
+    def _check_delegation(user):
+        """
+        The auto-generated delegation id must be valid
+        """
+        credential = Session.query(Credential).get((user.delegation_id, user.user_dn))
+        if credential is None:
+            raise HTTPAuthenticationTimeout('No delegation found for "%s"' % user.user_dn)
+        if credential.expired():
+            remaining = credential.remaining()
+            seconds = abs(remaining.seconds + remaining.days * 24 * 3600)
+            raise HTTPAuthenticationTimeout(
+                'The delegated credentials expired %d seconds ago (%s)' % (seconds, user.delegation_id)
+            )
+        if credential.remaining() < timedelta(hours=1):
+            raise HTTPAuthenticationTimeout(
+                'The delegated credentials has less than one hour left (%s)' % user.delegation_id
+            )
+
+    @staticmethod
+    def _insert_job(populated):
+        """
+        Insert the job, files and data management operations. It does not commit.
+        """
+        try:
+            Session.execute(Job.__table__.insert(), [populated.job])
+        except IntegrityError:
+            raise HTTPConflict('The sid provided by the user is duplicated')
+        if len(populated.files):
+            Session.execute(File.__table__.insert(), populated.files)
+        if len(populated.datamanagement):
+            Session.execute(DataManagement.__table__.insert(), populated.datamanagement)
+        Session.flush()
+
+    @staticmethod
+    def _notify_submission(populated):
+        """
+        Send the state messages for a job already committed
+        """
+        # Need to re-query so we get the file ids
+        job = Session.query(Job).get(populated.job_id)
+        for i in range(len(job.files)):
+            try:
+                submit_state_change(job, job.files[i], populated.files[0]['file_state'])
+            except Exception, e:
+                log.warning("Failed to write state message to disk: %s" % e.message)
+
+        metrics = getattr(app_globals, 'metrics', None)
+        if metrics is not None:
+            metrics.increment('fts3_rest_submitted_jobs_total', vo=populated.job['vo_name'])
+            metrics.increment('fts3_rest_submitted_files_total', len(populated.files), vo=populated.job['vo_name'])
+
+        if len(populated.files):
+            log.info("Job %s submitted with %d transfers" % (populated.job_id, len(populated.files)))
+        elif len(populated.datamanagement):
+            log.info(
+                "Job %s submitted with %d data management operations" % (populated.job_id, len(populated.datamanagement))
+            )
+
+    def _submit_many(self, user, job_list, start_response):
+        """
+        Submit several jobs at once. The credentials and banned storages are checked only once,
+        and the jobs are inserted in chunks, one transaction per chunk.
+        If a chunk fails, its jobs are inserted one by one so only the conflicting ones are rejected.
+        """
+        if not isinstance(job_list, list) or len(job_list) == 0:
+            raise HTTPBadRequest('jobs must be a non empty list of job descriptions')
+        max_jobs = int(config.get('fts3.BulkSubmitMaxJobs', 1000))
+        if len(job_list) > max_jobs:
+            raise HTTPBadRequest('Too many jobs in a single submission (%d > %d)' % (len(job_list), max_jobs))
+        chunk_size = int(config.get('fts3.BulkSubmitChunkSize', 100))
+
+        def _error(e):
+            return dict(job_id=None, http_status="%s %s" % (e.code, e.title), http_message=e.detail)
+
+        banning = BanningSnapshot()
+        responses = [None] * len(job_list)
+        populated_list = list()
+        for index, submitted_dict in enumerate(job_list):
+            try:
+                populated_list.append((index, JobBuilder(user, banning, **_job_description(submitted_dict))))
+            except HTTPError, e:
+                responses[index] = _error(e)
+
+        log.info("%s (%s) is submitting %d transfer jobs" % (user.user_dn, user.vos[0], len(populated_list)))
+
+        for chunk_start in range(0, len(populated_list), chunk_size):
+            chunk = populated_list[chunk_start:chunk_start + chunk_size]
+            try:
+                for index, populated in chunk:
+                    JobsController._insert_job(populated)
+                Session.commit()
+            except (IntegrityError, HTTPConflict):
+                Session.rollback()
+                for index, populated in chunk:
+                    try:
+                        JobsController._insert_job(populated)
+                        Session.commit()
+                    except IntegrityError, e:
+                        Session.rollback()
+                        responses[index] = _error(HTTPConflict('The submission is duplicated ' + str(e)))
+                    except HTTPError, e:
+                        Session.rollback()
+                        responses[index] = _error(e)
+                    except:
+                        Session.rollback()
+                        raise
+            except:
+                Session.rollback()
+                raise
+
+        for index, populated in populated_list:
+            if responses[index] is None:
+                JobsController._notify_submission(populated)
+                responses[index] = dict(job_id=populated.job_id, http_status='200 Ok')
+
+        return _multistatus(responses, start_response, expecting_multistatus=True)
+
     @doc.input('Submission description', 'SubmitSchema')
+    @doc.response(207, 'Some of the jobs of a multiple submission failed')
     @doc.response(400, 'The submission request could not be understood')
     @doc.response(403, 'The user doesn\'t have enough permissions to submit')
     @doc.response(409, 'The request could not be completed due to a conflict with the current state of the resource')
@@ -521,49 +978,34 @@ class JobsController(BaseController):
     @doc.return_type('{"job_id": <job id>}')
     @authorize(TRANSFER)
     @jsonify
-    def submit(self):
+    def submit(self, start_response):
         """
         Submits a new job
 
         It returns the information about the new submitted job. To know the format for the
         submission, /api-docs/schema/submit gives the expected format encoded as a JSON-schema.
         It can be used to validate (i.e in Python, jsonschema.validate)
+
+        Several jobs can be submitted at once passing {"jobs": [<submission>, ...]}.
+        In that case, a list with the job id or the error for each job is returned.
         """
         # First, the request has to be valid JSON
         submitted_dict = get_input_as_dict(request)
 
-        # The auto-generated delegation id must be valid
         user = request.environ['fts3.User.Credentials']
-        credential = Session.query(Credential).get((user.delegation_id, user.user_dn))
-        if credential is None:
-            raise HTTPAuthenticationTimeout('No delegation found for "%s"' % user.user_dn)
-        if credential.expired():
-            remaining = credential.remaining()
-            seconds = abs(remaining.seconds + remaining.days * 24 * 3600)
-            raise HTTPAuthenticationTimeout(
-                'The delegated credentials expired %d seconds ago (%s)' % (seconds, user.delegation_id)
-            )
-        if credential.remaining() < timedelta(hours=1):
-            raise HTTPAuthenticationTimeout(
-                'The delegated credentials has less than one hour left (%s)' % user.delegation_id
-            )
+        JobsController._check_delegation(user)
+
+        if 'jobs' in submitted_dict:
+            return self._submit_many(user, submitted_dict['jobs'], start_response)
 
         # Populate the job and files
-        populated = JobBuilder(user, **submitted_dict)
+        populated = JobBuilder(user, **_job_description(submitted_dict))
 
         log.info("%s (%s) is submitting a transfer job" % (user.user_dn, user.vos[0]))
 
         # Insert the job
         try:
-            try:
-                Session.execute(Job.__table__.insert(), [populated.job])
-            except IntegrityError:
-                raise HTTPConflict('The sid provided by the user is duplicated')
-            if len(populated.files):
-                Session.execute(File.__table__.insert(), populated.files)
-            if len(populated.datamanagement):
-                Session.execute(DataManagement.__table__.insert(), populated.datamanagement)
-            Session.flush()
+            JobsController._insert_job(populated)
             Session.commit()
 	except IntegrityError as err:
 		Session.rollback()
@@ -573,20 +1015,7 @@ class JobsController(BaseController):
             raise
 
         # Send messages
-        # Need to re-query so we get the file ids
-        job = Session.query(Job).get(populated.job_id)
-        for i in range(len(job.files)):
-            try:
-                submit_state_change(job, job.files[i], populated.files[0]['file_state'])
-            except Exception, e:
-                log.warning("Failed to write state message to disk: %s" % e.message)
-
-        if len(populated.files):
-            log.info("Job %s submitted with %d transfers" % (populated.job_id, len(populated.files)))
-        elif len(populated.datamanagement):
-            log.info(
-                "Job %s submitted with %d data management operations" % (populated.job_id, len(populated.datamanagement))
-            )
+        JobsController._notify_submission(populated)
 
         return {'job_id': populated.job_id}
 
@@ -0,0 +1,49 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from pylons import app_globals, response
+
+from fts3rest.lib.api import doc
+from fts3rest.lib.base import BaseController
+from fts3rest.lib.http_exceptions import HTTPNotFound
+from fts3rest.lib.metrics import CONTENT_TYPE, collect, render
+from fts3rest.lib.middleware.fts3auth import authorize
+from fts3rest.lib.middleware.fts3auth.constants import *
+
+
+__controller__ = 'MetricsController'
+
+
+class MetricsController(BaseController):
+    """
+    Monitoring metrics
+    """
+
+    @doc.response(403, 'The user is not allowed to query the metrics')
+    @doc.response(404, 'Metrics are disabled')
+    @doc.return_type('Metrics in the Prometheus text format')
+    @authorize(CONFIG)
+    def metrics(self):
+        """
+        Metrics of all the processes of this host, in the Prometheus text format
+        """
+        exporter = app_globals.metrics_exporter
+        if exporter is None:
+            raise HTTPNotFound('Metrics are disabled')
+        # The other processes dump theirs periodically, but this one can be up to date
+        exporter.flush()
+        counters, gauges = collect(exporter.directory)
+        response.headers['Content-Type'] = CONTENT_TYPE
+        return render(counters, gauges)
@@ -36,6 +36,7 @@ from fts3rest.lib.http_exceptions import *
 from fts3rest.lib.middleware.fts3auth import require_certificate
 from fts3rest.lib.middleware.fts3auth.constants import VALID_OPERATIONS
 from fts3rest.lib.oauth2lib.utils import random_ascii_string
+from fts3rest.lib.token_cache import token_cache
 
 
 URN_NO_REDIRECT = 'urn:ietf:wg:oauth:2.0:oob'
@@ -244,6 +245,7 @@ class Oauth2Controller(BaseController):
                 Session.query(OAuth2Token).filter(OAuth2Token.client_id == client_id).delete()
                 Session.query(OAuth2Code).filter(OAuth2Code.client_id == client_id).delete()
                 Session.commit()
+                token_cache.invalidate(client_id)
                 redirect(url_for(controller='oauth2', action='get_my_apps'), code=HTTPSeeOther.code)
         except:
             Session.rollback()
@@ -268,6 +270,7 @@ class Oauth2Controller(BaseController):
             Session.query(OAuth2Token).filter(OAuth2Token.client_id == client_id).delete()
             Session.query(OAuth2Code).filter(OAuth2Code.client_id == client_id).delete()
             Session.commit()
+            token_cache.invalidate(client_id)
         except:
             Session.rollback()
             raise
@@ -493,6 +496,7 @@ class Oauth2Controller(BaseController):
                 (OAuth2Code.client_id == client_id) & (OAuth2Code.dlg_id == user.delegation_id)
             )
             Session.commit()
+            token_cache.invalidate(client_id, user.delegation_id)
         except:
             Session.rollback()
             raise
@@ -24,10 +24,11 @@ from pylons import config,request
 
 from fts3rest.lib.api import doc
 from fts3rest.lib.base import BaseController, Session
-from fts3rest.lib.helpers import jsonify, accept, get_input_as_dict
+from fts3rest.lib.helpers import jsonify, jsonify_ndjson, accept, get_input_as_dict
 from fts3.model import OptimizerEvolution, Optimizer
 from datetime import datetime
 from fts3rest.lib.http_exceptions import *
+from fts3rest.lib.replica import read_replica
 
 
 
@@ -45,10 +46,13 @@ class OptimizerController(BaseController):
         return config['fts3.Optimizer']
 
     @doc.return_type(array_of=OptimizerEvolution)
-    @jsonify
+    @read_replica(max_staleness=300)
+    @jsonify_ndjson
     def evolution(self):
         """
         Returns the optimizer evolution
+
+        Sent as newline delimited JSON, one object per line, if application/x-ndjson is preferred in the Accept header
         """
         evolution = Session.query(OptimizerEvolution)
         if 'source_se' in request.params and request.params['source_se']:
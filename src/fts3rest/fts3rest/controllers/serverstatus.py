@@ -13,47 +13,140 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from fts3.model import File
+import os
+import pstats
+from paste.deploy.converters import asbool
+from pylons import app_globals, config, request, response
+
+from fts3rest.lib.api import doc
 from fts3rest.lib.base import BaseController, Session
 from fts3rest.lib.middleware.fts3auth import authorize, require_certificate
 from fts3rest.lib.middleware.fts3auth.constants import *
 from fts3rest.lib.helpers import jsonify
+from fts3rest.lib.http_exceptions import HTTPBadRequest, HTTPConflict, HTTPForbidden, HTTPNotFound
+from fts3rest.lib.profiler import PROFILE_NAME_REGEX, ProfilerBusy, StackSampler, format_profile, profile_directory
+from fts3rest.lib.token_cache import token_cache
 
 
 __controller__ = 'ServerStatusController'
 
 
+def _check_profiling_allowed():
+    """
+    Profiling must be enabled, and only the server itself can use it
+    """
+    if not asbool(config.get('fts3.Profiling', False)):
+        raise HTTPNotFound('Profiling is disabled')
+    if not request.environ['fts3.User.Credentials'].is_root:
+        raise HTTPForbidden('Only root can profile the server')
+
+
 class ServerStatusController(BaseController):
     """
     Server general status
     """
 
+    @doc.query_arg('fresh', 'Recompute the activity instead of using the snapshot. Root only')
+    @doc.response(403, 'fresh requested by a non root user')
     @require_certificate
     @authorize(CONFIG)
     @jsonify
     def hosts_activity(self):
         """
         What are the hosts doing
+
+        The time when the activity was computed is sent in the X-Generated-At header
+        """
+        fresh = request.params.get('fresh', 'false').lower() in ('true', '1')
+        if fresh and not request.environ['fts3.User.Credentials'].is_root:
+            raise HTTPForbidden('Only root can request a fresh snapshot')
+        generated_at, hosts = app_globals.hosts_activity.get(fresh=fresh)
+        response.headers['X-Generated-At'] = generated_at.strftime('%Y-%m-%dT%H:%M:%S')
+        return hosts
+
+    @require_certificate
+    @authorize(CONFIG)
+    @jsonify
+    def db_pool(self):
+        """
+        Usage of the database connection pool of this process
+        """
+        return app_globals.pool_monitor.snapshot(Session.get_bind().pool)
+
+    @doc.response(404, 'Request instrumentation is disabled')
+    @require_certificate
+    @authorize(CONFIG)
+    @jsonify
+    def request_stats(self):
+        """
+        Per route statistics of the requests served by this process
+        """
+        if app_globals.request_histograms is None:
+            raise HTTPNotFound('Request instrumentation is disabled')
+        return app_globals.request_histograms.snapshot()
+
+    @require_certificate
+    @authorize(CONFIG)
+    @jsonify
+    def oauth2_token_stats(self):
+        """
+        Usage of the OAuth2 access token cache of this process
+        """
+        return token_cache.get_stats()
+
+    @doc.query_arg('duration', 'Seconds to sample (default 10)')
+    @doc.query_arg('format', 'collapsed (default, one line per stack) or top (functions seen the most)')
+    @doc.response(400, 'Invalid duration or format')
+    @doc.response(403, 'Only root can profile the server')
+    @doc.response(404, 'Profiling is disabled')
+    @doc.response(409, 'There is already a profiling session running')
+    @doc.return_type('Sampled stacks as text')
+    @require_certificate
+    @authorize(CONFIG)
+    def profile(self):
+        """
+        Sample the stacks of the threads of this process for a while
+        """
+        _check_profiling_allowed()
+        try:
+            duration = float(request.params.get('duration', 10))
+        except ValueError:
+            raise HTTPBadRequest('Invalid duration')
+        max_duration = float(config.get('fts3.ProfileMaxDuration', 60))
+        if duration <= 0 or duration > max_duration:
+            raise HTTPBadRequest('The duration must be between 0 and %d seconds' % max_duration)
+        output_format = request.params.get('format', 'collapsed')
+        if output_format not in ('collapsed', 'top'):
+            raise HTTPBadRequest('Invalid format %s' % output_format)
+
+        sampler = StackSampler(interval=float(config.get('fts3.ProfileInterval', 0.005)))
+        try:
+            result = sampler.sample(duration)
+        except ProfilerBusy, e:
+            raise HTTPConflict(str(e))
+
+        response.headers['Content-Type'] = 'text/plain'
+        if output_format == 'top':
+            return result.top()
+        return result.collapsed()
+
+    @doc.query_arg('sort', 'pstats sort key (default cumulative)')
+    @doc.response(400, 'Invalid sort key')
+    @doc.response(403, 'Only root can profile the server')
+    @doc.response(404, 'Profiling is disabled, or the profile does not exist')
+    @doc.return_type('Profile as printed by pstats')
+    @require_certificate
+    @authorize(CONFIG)
+    def profile_result(self, name):
+        """
+        Get the profile of a request run with the header X-FTS3-Profile
         """
-        staging = Session.execute(
-            "SELECT COUNT(*), agent_dn "
-            " FROM t_file "
-            " WHERE file_state = 'STARTED' "
-            " GROUP BY agent_dn")
-        response = dict()
-
-        for (count, host) in staging:
-            response[host] = dict(staging=count)
-
-        active = Session.execute(
-            "SELECT COUNT(*), transferHost "
-            " FROM t_file "
-            " WHERE file_state = 'ACTIVE' "
-            " GROUP BY transferHost"
-        )
-        for (count, host) in active:
-            if host not in response:
-                response[host] = dict()
-            response[host]['active'] = count
-
-        return response
+        _check_profiling_allowed()
+        path = os.path.join(profile_directory(config), name)
+        if not PROFILE_NAME_REGEX.match(name) or not os.path.exists(path):
+            raise HTTPNotFound('Profile %s not found' % name)
+        sort = request.params.get('sort', 'cumulative')
+        if sort not in pstats.Stats.sort_arg_dict_default:
+            raise HTTPBadRequest('Invalid sort key %s' % sort)
+        response.headers['Content-Type'] = 'text/plain'
+        return format_profile(path, sort=sort)
@@ -222,23 +222,34 @@ def _select_best_replica(files, vo_name, entry_state, strategy):
     	files[best_index]['dest_surl_uuid'] = str(uuid.uuid5(BASE_ID, files[best_index]['dest_surl'].encode('utf-8'))) 
 
 
-def _apply_banning(files):
+class BanningSnapshot(object):
     """
-    Query the banning information for all pairs, reject the job
+    In memory copy of the banned storages, so several jobs can be
+    checked against them with a single query
+    """
+
+    def __init__(self):
+        # Usually, banned SES will be in the order of ~100 max
+        # Files may be several thousands
+        # We get all banned in memory so we avoid querying too many times the DB
+        # We then build a dictionary to make look up easy
+        self.banned_ses = dict()
+        for b in Session.query(BannedSE):
+            self.banned_ses[str(b.se)] = (b.vo, b.status)
+
+    def get(self, se):
+        return self.banned_ses.get(str(se), None)
+
+
+def _apply_banning(files, banning):
+    """
+    Check the banning information for all pairs, reject the job
     as soon as one SE can not submit.
     Update wait_timeout and wait_timestamp is there is a hit
     """
-    # Usually, banned SES will be in the order of ~100 max
-    # Files may be several thousands
-    # We get all banned in memory so we avoid querying too many times the DB
-    # We then build a dictionary to make look up easy
-    banned_ses = dict()
-    for b in Session.query(BannedSE):
-        banned_ses[str(b.se)] = (b.vo, b.status)
-
     for f in files:
-        source_banned = banned_ses.get(str(f['source_se']), None)
-        dest_banned = banned_ses.get(str(f['dest_se']), None)
+        source_banned = banning.get(f['source_se'])
+        dest_banned = banning.get(f['dest_se'])
         banned = False
 
         if source_banned and (source_banned[0] == f['vo_name'] or source_banned[0] == '*'):
@@ -665,10 +676,19 @@ class JobBuilder(object):
         for dm in self.datamanagement:
             dm['vo_name'] = self.user.vos[0]
 
-    def __init__(self, user, **kwargs):
+    def __init__(self, user, banning=None, **kwargs):
         """
         Constructor
+
+        Args:
+            user:    The user submitting the job
+            banning: A BanningSnapshot. If None, the banned storages are queried.
+                     Passing it allows to share the snapshot between several jobs.
+            kwargs:  The job description
         """
+        # Never trust a banning coming from the submission body
+        if not isinstance(banning, BanningSnapshot):
+            banning = None
         try:
             self.user = user
             # Get the job parameters
@@ -706,10 +726,12 @@ class JobBuilder(object):
             # Reject for SE banning
             # If any SE does not accept submissions, reject the whole job
             # Update wait_timeout and wait_timestamp if WAIT_AS is set
+            if banning is None:
+                banning = BanningSnapshot()
             if self.files:
-                _apply_banning(self.files)
+                _apply_banning(self.files, banning)
             if self.datamanagement:
-                _apply_banning(self.datamanagement)
+                _apply_banning(self.datamanagement, banning)
 
         except ValueError, e:
             raise HTTPBadRequest('Invalid value within the request: %s' % str(e))
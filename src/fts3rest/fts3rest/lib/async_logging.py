@@ -0,0 +1,127 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Logging without blocking the requests on disk I/O.
+
+The records are put into a bounded queue, and written by a background thread through
+the handlers configured in the ini file. If the queue is full, the records are dropped,
+counted, and the count is reported in the log once there is room again.
+"""
+
+import logging
+import Queue
+import threading
+
+DROPPED_COUNTER = 'fts3_rest_log_dropped_total'
+
+
+class AsyncHandler(logging.Handler):
+    """
+    Queue the records, and hand them over to the targets from a background thread
+    """
+
+    def __init__(self, targets, queue_size=10000, counters=None):
+        logging.Handler.__init__(self)
+        self.targets = targets
+        self.queue = Queue.Queue(maxsize=queue_size)
+        self.counters = counters
+        self.dropped_lock = threading.Lock()
+        self.dropped = 0
+        self.reported = 0
+        self.thread = threading.Thread(target=self._consume, name='AsyncLogging')
+        self.thread.daemon = True
+        self.thread.start()
+
+    @staticmethod
+    def _prepare(record):
+        # Render now, the arguments may be modified, or not be safe to use from another thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+    def emit(self, record):
+        try:
+            self._prepare(record)
+            self.queue.put_nowait(record)
+        except Queue.Full:
+            with self.dropped_lock:
+                self.dropped += 1
+            if self.counters is not None:
+                self.counters.increment(DROPPED_COUNTER)
+        except Exception:
+            self.handleError(record)
+
+    def _handle(self, record):
+        for target in self.targets:
+            if record.levelno >= target.level:
+                target.handle(record)
+
+    def _report_dropped(self):
+        with self.dropped_lock:
+            dropped = self.dropped - self.reported
+            self.reported = self.dropped
+        if dropped:
+            self._handle(logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                "%d log entries dropped because the logging queue was full" % dropped, None, None
+            ))
+
+    def _consume(self):
+        while True:
+            record = self.queue.get()
+            try:
+                self._report_dropped()
+                self._handle(record)
+            except Exception:
+                pass
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        """
+        Wait until the queued records are written
+        """
+        self.queue.join()
+        for target in self.targets:
+            target.flush()
+
+    def close(self):
+        self.flush()
+        for target in self.targets:
+            target.close()
+        logging.Handler.close(self)
+
+
+def install_async_logging(queue_size=10000, counters=None):
+    """
+    Replace the handlers of the configured loggers with asynchronous ones
+    Returns the list of AsyncHandler installed
+    """
+    installed = []
+    loggers = [logging.getLogger()]
+    loggers.extend(filter(lambda l: isinstance(l, logging.Logger), logging.Logger.manager.loggerDict.values()))
+    for logger in loggers:
+        targets = filter(lambda h: not isinstance(h, AsyncHandler), logger.handlers)
+        if not targets:
+            continue
+        handler = AsyncHandler(targets, queue_size, counters)
+        for target in targets:
+            logger.removeHandler(target)
+        logger.addHandler(handler)
+        installed.append(handler)
+    return installed
@@ -0,0 +1,131 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import bisect
+import logging
+import threading
+import time
+from threading import Thread
+
+from fts3.model import Credential, Job, LinkConfig
+from fts3rest.lib.base import Session
+from fts3rest.lib.config_cache import config_cache
+
+log = logging.getLogger(__name__)
+
+
+class PrefixIndex(object):
+    """
+    Sorted list of unique values, searchable by prefix
+    """
+
+    def __init__(self, values):
+        self.values = sorted(set(filter(None, values)))
+
+    def search(self, term, limit):
+        """
+        Up to limit values starting with term, in order
+        """
+        matches = []
+        position = bisect.bisect_left(self.values, term)
+        while position < len(self.values) and len(matches) < limit:
+            value = self.values[position]
+            if not value.startswith(term):
+                break
+            matches.append(value)
+            position += 1
+        return matches
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _load_storages(session):
+    sources = [r[0] for r in session.query(LinkConfig.source)]
+    destinations = [r[0] for r in session.query(LinkConfig.destination)]
+    return dict(
+        source=PrefixIndex(sources),
+        destination=PrefixIndex(destinations),
+        storage=PrefixIndex(sources + destinations)
+    )
+
+
+class AutocompleteIndex(Thread):
+    """
+    Per process prefix indexes used by the autocomplete.
+    DNs and VOs are rebuilt on the background every refresh_interval seconds, so the requests do not
+    need to scan t_credential and t_job. The thread is started with the first request.
+    If refresh_interval is 0, they are rebuilt for each request.
+    Storages come from the link configuration, and are reloaded when it changes.
+    Terms shorter than min_length return nothing, and at most limit matches are returned.
+    """
+
+    def __init__(self, refresh_interval, min_length=2, limit=20):
+        Thread.__init__(self)
+        self.daemon = True
+        self.refresh_interval = refresh_interval
+        self.min_length = min_length
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.indexes = None
+        self.started = False
+
+    def refresh(self):
+        """
+        Rebuild the DN and VO indexes
+        """
+        start = time.time()
+        indexes = dict(
+            dn=PrefixIndex([r[0] for r in Session.query(Credential.dn).distinct()]),
+            vo=PrefixIndex([r[0] for r in Session.query(Job.vo_name).distinct()])
+        )
+        log.debug("Autocomplete indexes rebuilt in %.2f seconds" % (time.time() - start))
+        with self.lock:
+            self.indexes = indexes
+            return indexes
+
+    def _get_indexes(self):
+        if not self.refresh_interval:
+            return self.refresh()
+        with self.lock:
+            if self.indexes is not None:
+                return self.indexes
+            if not self.started:
+                self.started = True
+                self.start()
+        # First call, do not wait for the thread
+        return self.refresh()
+
+    def search(self, name, term):
+        """
+        Search term in the index name (dn, vo, source, destination or storage)
+        """
+        if term is None or len(term) < self.min_length:
+            return []
+        if name in ('dn', 'vo'):
+            index = self._get_indexes()[name]
+        else:
+            index = config_cache.get(Session, 'autocomplete_storages', _load_storages)[name]
+        return index.search(term, self.limit)
+
+    def run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception, e:
+                log.warning("Failed to refresh the autocomplete indexes: %s" % str(e))
+            finally:
+                Session.remove()
@@ -44,12 +44,28 @@ class DestroySessionWhenDone(object):
     def next(self):
         try:
             return self.response.next()
-        except StopIteration:
-            log.debug('Closing database session')
-            Session.rollback()  # Needed explicitly. See FTS-443
-            Session.remove()
+        except:
+            # Done, or failed half way
+            self._destroy()
             raise
 
+    def close(self):
+        """
+        Called by the WSGI server when done, even if the client went away before the end
+        """
+        try:
+            close = getattr(self.response, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._destroy()
+
+    @staticmethod
+    def _destroy():
+        log.debug('Closing database session')
+        Session.rollback()  # Needed explicitly. See FTS-443
+        Session.remove()
+
 
 class BaseController(WSGIController):
 
@@ -0,0 +1,163 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Per process cache of the configuration (links, storages, shares...)
+
+Every configuration change made through the REST API bumps a version stored in
+t_config_version. Before serving from the cache, the version is checked with a single
+primary key lookup, and everything is dropped if it changed, so other processes and hosts
+reload lazily. Changes made without the REST API do not bump the version, so the cache
+is dropped anyway every ttl seconds.
+
+t_config_version is created by the schema scripts shipped with fts-rest.
+"""
+
+import logging
+import random
+import threading
+import time
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+from fts3.model import ConfigVersion
+
+log = logging.getLogger(__name__)
+
+# Primary key of the only row of t_config_version
+CONFIG_VERSION_ID = 1
+
+
+def bump_config_version(session):
+    """
+    Change the configuration version. Must be called within the transaction that modifies
+    the configuration, so the change and the new version are committed together.
+    The version is random rather than incremented, so a removed and re-created row
+    can not go back to a value a process has already seen.
+    """
+    if not config_cache.enabled:
+        return
+    version = random.randint(1, 2 ** 31 - 1)
+    updated = session.query(ConfigVersion)\
+        .filter(ConfigVersion.id == CONFIG_VERSION_ID)\
+        .update({ConfigVersion.version: version}, synchronize_session=False)
+    if updated:
+        return
+    # First change ever, another process may be inserting the row at the same time
+    try:
+        with session.begin_nested():
+            session.add(ConfigVersion(id=CONFIG_VERSION_ID, version=version))
+    except IntegrityError:
+        session.query(ConfigVersion)\
+            .filter(ConfigVersion.id == CONFIG_VERSION_ID)\
+            .update({ConfigVersion.version: version}, synchronize_session=False)
+
+
+class ConfigCache(object):
+    """
+    Configuration loaded from the database, invalidated when the configuration version changes.
+    The values are shared between threads, so the loaders must return plain data
+    or objects detached from the session.
+    If check_interval is greater than 0, the version is checked at most once every check_interval seconds,
+    so changes done by other processes may take up to that long to be seen.
+    If ttl is greater than 0, everything is dropped every ttl seconds, even if the version did not change.
+    If the version can not be stored, nothing is cached.
+    """
+
+    def __init__(self, check_interval=0, ttl=300):
+        self.check_interval = check_interval
+        self.ttl = ttl
+        self.enabled = True
+        self.lock = threading.Lock()
+        self.entries = dict()
+        self.version = None
+        self.last_check = 0
+        self.expires = 0
+
+    def setup(self, engine):
+        """
+        Check that t_config_version exists. If it does not, the configuration is not cached
+        """
+        try:
+            self.enabled = engine.has_table(ConfigVersion.__tablename__)
+        except DBAPIError, e:
+            log.warning("Could not check if %s exists: %s" % (ConfigVersion.__tablename__, str(e)))
+            self.enabled = False
+        if not self.enabled:
+            log.warning("%s is missing, the configuration will not be cached" % ConfigVersion.__tablename__)
+
+    def _get_version(self, session):
+        version = session.query(ConfigVersion.version)\
+            .filter(ConfigVersion.id == CONFIG_VERSION_ID).first()
+        if version is None:
+            return None
+        return version[0]
+
+    def _validate(self, session):
+        now = time.time()
+        with self.lock:
+            if self.ttl and now >= self.expires:
+                self.entries.clear()
+                self.expires = now + self.ttl
+            if self.check_interval and now - self.last_check < self.check_interval:
+                return
+        version = self._get_version(session)
+        with self.lock:
+            self.last_check = now
+            if version != self.version:
+                log.debug("Configuration version changed from %s to %s" % (self.version, version))
+                self.entries.clear()
+                self.version = version
+
+    def get(self, session, key, loader):
+        """
+        Return the cached value for key, calling loader(session) if it is not there
+        or the configuration changed since it was loaded
+        """
+        if not self.enabled:
+            return loader(session)
+        self._validate(session)
+        with self.lock:
+            if key in self.entries:
+                return self.entries[key]
+            version = self.version
+        value = loader(session)
+        with self.lock:
+            # Do not store if the version changed meanwhile
+            if version == self.version:
+                self.entries[key] = value
+        return value
+
+    def clear(self):
+        """
+        Drop everything, forcing the version to be checked again
+        """
+        with self.lock:
+            self.entries.clear()
+            self.version = None
+            self.last_check = 0
+            self.expires = 0
+
+
+def detached(session, objects):
+    """
+    Expunge objects from the session, so they can be cached
+    """
+    for obj in objects:
+        session.expunge(obj)
+    return objects
+
+
+# Shared by the configuration controllers and the scheduler
+config_cache = ConfigCache()
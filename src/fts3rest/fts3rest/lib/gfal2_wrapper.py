@@ -27,9 +27,13 @@ from StringIO import StringIO
 try:
     import gfal2
     context_type = gfal2.creat_context
+    GError = gfal2.GError
 except:
     context_type = None
 
+    class GError(Exception):
+        code = errno.EIO
+
 
 class Gfal2Error(Exception):
     """
@@ -47,13 +51,15 @@ class Gfal2Wrapper(object):
     impacting the REST API (i.e FTS-35)
     """
 
-    def __init__(self, proxy, method):
+    def __init__(self, proxy, method, timeout=30):
         """
         Calls method in a new process, with the environment properly set up, and a
         gfal2 context already initialized
+        The child is killed if it runs for longer than timeout seconds
         """
         self.proxy = proxy
         self.method = method
+        self.timeout = timeout
 
     def __call__(self, *args, **kwargs):
         pipe_read, pipe_write = os.pipe()
@@ -66,13 +72,26 @@ class Gfal2Wrapper(object):
             os.close(pipe_write)
             return self._parent(pid, os.fdopen(pipe_read, 'r'))
 
-    def _parent(self, child_pid, pipe):
-        child_output = StringIO()
-        out = pipe.read()
-        while out:
-            child_output.write(out)
-            out = pipe.read()
-        child_pid, child_status = os.waitpid(child_pid, os.P_WAIT)
+    def stream(self, *args, **kwargs):
+        """
+        Like calling the wrapper, but method must be a generator.
+        The values are sent by the child one per line as they are generated, and yielded here as they come,
+        so neither process holds all of them in memory. The timeout applies between values.
+        The generator can yield None to reset the timeout while busy, nothing is sent for it.
+        Errors raise Gfal2Error when the generator gets to them.
+        """
+        pipe_read, pipe_write = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(pipe_read)
+            self._stream_child(os.fdopen(pipe_write, 'w'), args, kwargs)
+            raise AssertionError('This line must never be reached')
+        else:
+            os.close(pipe_write)
+            return self._stream_parent(pid, os.fdopen(pipe_read, 'r'))
+
+    @staticmethod
+    def _check_status(child_status, message):
         if os.WIFSIGNALED(child_status):
             child_signal = os.WTERMSIG(child_status)
             if child_signal == signal.SIGALRM:
@@ -81,15 +100,48 @@ class Gfal2Wrapper(object):
                 raise Gfal2Error(errno.EIO, 'Child process killed by signal %d' % child_signal)
         child_exit = os.WEXITSTATUS(child_status)
         if child_exit:
-            raise Gfal2Error(child_exit, child_output.getvalue())
+            raise Gfal2Error(child_exit, message)
+
+    def _parent(self, child_pid, pipe):
+        child_output = StringIO()
+        out = pipe.read()
+        while out:
+            child_output.write(out)
+            out = pipe.read()
+        child_pid, child_status = os.waitpid(child_pid, os.P_WAIT)
+        self._check_status(child_status, child_output.getvalue())
         return json.loads(child_output.getvalue())
 
-    def _child(self, pipe, args, kwargs):
-        signal.alarm(30)
+    def _stream_parent(self, child_pid, pipe):
+        # Hold back the last line, since it is the error message if the child fails
+        finished = False
+        try:
+            line = pipe.readline()
+            next_line = pipe.readline()
+            while next_line:
+                yield json.loads(line)
+                line, next_line = next_line, pipe.readline()
+            child_pid, child_status = os.waitpid(child_pid, os.P_WAIT)
+            finished = True
+            self._check_status(child_status, json.loads(line) if line else '')
+            if line:
+                yield json.loads(line)
+        finally:
+            pipe.close()
+            if not finished:
+                # The consumer gave up
+                os.kill(child_pid, signal.SIGKILL)
+                os.waitpid(child_pid, os.P_WAIT)
+
+    def _setup_child(self):
+        signal.alarm(self.timeout)
 
         os.environ['X509_USER_CERT'] = self.proxy.name
         os.environ['X509_USER_KEY'] = self.proxy.name
         os.environ['X509_USER_PROXY'] = self.proxy.name
+
+    def _child(self, pipe, args, kwargs):
+        self._setup_child()
         exit_code = 0
         try:
             if context_type is None:
@@ -97,7 +149,7 @@ class Gfal2Wrapper(object):
             ctx = context_type()
             result = self.method(ctx, *args, **kwargs)
             pipe.write(json.dumps(result))
-        except gfal2.GError, e:
+        except GError, e:
             pipe.write(e.message)
             exit_code = e.code
         except Exception, e:
@@ -106,5 +158,27 @@ class Gfal2Wrapper(object):
         pipe.close()
         os._exit(exit_code)
 
+    def _stream_child(self, pipe, args, kwargs):
+        self._setup_child()
+        exit_code = 0
+        try:
+            if context_type is None:
+                raise RuntimeError('Could not load the gfal2 python module')
+            ctx = context_type()
+            for value in self.method(ctx, *args, **kwargs):
+                if value is not None:
+                    pipe.write(json.dumps(value) + '\n')
+                    # The pipe is buffered, and the parent must get each value as soon as it is generated
+                    pipe.flush()
+                signal.alarm(self.timeout)
+        except GError, e:
+            pipe.write(json.dumps(e.message) + '\n')
+            exit_code = e.code
+        except Exception, e:
+            pipe.write(json.dumps(e.message) + '\n')
+            exit_code = errno.EIO
+        pipe.close()
+        os._exit(exit_code)
+
 
-__all__ = ['Gfal2Error', 'Gfal2Wrapper']
+__all__ = ['GError', 'Gfal2Error', 'Gfal2Wrapper']
@@ -13,6 +13,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 import logging
+import time
 from sqlalchemy.exc import DisconnectionError
 try:
     from MySQLdb.connections import Connection as MySQLConnection
@@ -28,20 +29,67 @@ except ImportError:
 log = logging.getLogger(__name__)
 
 
-def connection_validator(dbapi_con, con_record, con_proxy):
-    exc = None
-    if isinstance(dbapi_con, MySQLConnection):
-        # True will silently reconnect if the connection was lost
-        dbapi_con.ping(True)
-    elif isinstance(dbapi_con, OracleConnection):
-        try:
-            dbapi_con.ping()
-        except DatabaseError, e:
-            exc = DisconnectionError(str(e))
-
-    if exc is not None:
-        log.warning(exc.message)
-        raise exc
+class ConnectionValidator(object):
+    """
+    Ping the connections on checkout, so dead ones are replaced before being used.
+    The policy can be one of
+        always: ping on every checkout
+        idle:   ping only if the connection has been idle for more than idle_time seconds
+        never:  do not ping at all (rely on pool_recycle)
+    """
+
+    POLICIES = ('always', 'idle', 'never')
+
+    def __init__(self, policy='always', idle_time=30, monitor=None):
+        if policy not in ConnectionValidator.POLICIES:
+            raise ValueError('Unknown ping policy "%s"' % policy)
+        self.policy = policy
+        self.idle_time = idle_time
+        self.monitor = monitor
+
+    @staticmethod
+    def mark_used(dbapi_con, con_record):
+        """
+        To be registered for the connect and checkin events
+        """
+        if con_record is not None:
+            con_record.info['fts3.last_used'] = time.time()
+
+    def _needs_ping(self, con_record):
+        if self.policy == 'always':
+            return True
+        elif self.policy == 'never':
+            return False
+        last_used = con_record.info.get('fts3.last_used', None)
+        return last_used is None or (time.time() - last_used) > self.idle_time
+
+    def __call__(self, dbapi_con, con_record, con_proxy):
+        if not self._needs_ping(con_record):
+            if self.monitor:
+                self.monitor.ping_skipped()
+            return
+
+        exc = None
+        if isinstance(dbapi_con, MySQLConnection):
+            # True will silently reconnect if the connection was lost
+            dbapi_con.ping(True)
+        elif isinstance(dbapi_con, OracleConnection):
+            try:
+                dbapi_con.ping()
+            except DatabaseError, e:
+                exc = DisconnectionError(str(e))
+        else:
+            return
+
+        if self.monitor:
+            self.monitor.ping_done(exc is None)
+        if exc is not None:
+            log.warning(exc.message)
+            raise exc
+
+
+# Backwards compatible validator, pinging on every checkout
+connection_validator = ConnectionValidator()
 
 
 def connection_set_sqlmode(dbapi_con, con_record):
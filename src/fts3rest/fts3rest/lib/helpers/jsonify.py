@@ -25,11 +25,17 @@ try:
 except:
     import json
 import logging
+import time
 import types
 
+from fts3rest.lib.middleware.instrumentation import current_stats, record_serialization
+
 
 log = logging.getLogger(__name__)
 
+STREAM_CHUNK_SIZE = 16384
+NDJSON = 'application/x-ndjson'
+
 
 class ClassEncoder(json.JSONEncoder):
 
@@ -63,20 +69,88 @@ def to_json(data, indent=2):
     return json.dumps(data, cls=ClassEncoder, indent=indent, sort_keys=False)
 
 
+def _dumps(item):
+    return json.dumps(item, cls=ClassEncoder, indent=None, sort_keys=False)
+
+
+def _timed_dumps(item):
+    start = time.time()
+    serialized = _dumps(item)
+    record_serialization(time.time() - start)
+    return serialized
+
+
+def _get_dumps():
+    """
+    Only time the serialization if the request is instrumented
+    """
+    if current_stats() is None:
+        return _dumps
+    return _timed_dumps
+
+
 def stream_response(data):
     """
     Serialize an iterable a a json-list using a generator, so we do not need to wait to serialize the full
-    list before starting to send
+    list before starting to send.
+    Serialized items are grouped into chunks of about STREAM_CHUNK_SIZE bytes, so the server and the
+    compression do not have to deal with one piece per item and separator
     """
     log.debug('Yielding json response')
+    dumps = _get_dumps()
     comma = False
-    yield '['
+    pieces = ['[']
+    size = 1
     for item in data:
         if comma:
-            yield ','
-        yield json.dumps(item, cls=ClassEncoder, indent=None, sort_keys=False)
+            pieces.append(',')
+        serialized = dumps(item)
+        pieces.append(serialized)
+        size += len(serialized) + 1
         comma = True
-    yield ']'
+        if size >= STREAM_CHUNK_SIZE:
+            yield ''.join(pieces)
+            pieces = []
+            size = 0
+    pieces.append(']')
+    yield ''.join(pieces)
+
+
+def stream_ndjson(data):
+    """
+    Serialize an iterable as newline delimited json, one item per line, so clients can parse it
+    as it arrives. Lines are grouped into chunks as stream_response does
+    """
+    log.debug('Yielding ndjson response')
+    dumps = _get_dumps()
+    pieces = []
+    size = 0
+    for item in data:
+        serialized = dumps(item)
+        pieces.append(serialized)
+        pieces.append('\n')
+        size += len(serialized) + 1
+        if size >= STREAM_CHUNK_SIZE:
+            yield ''.join(pieces)
+            pieces = []
+            size = 0
+    if pieces:
+        yield ''.join(pieces)
+
+
+def _serialize(data):
+    if hasattr(data, '__iter__') and not isinstance(data, dict):
+        return stream_response(data)
+    else:
+        log.debug('Sending directly json response')
+        return [_get_dumps()(data)]
+
+
+def _prefers_ndjson(request):
+    try:
+        return request.accept.best_match(['application/json', NDJSON], default_match='application/json') == NDJSON
+    except:
+        return False
 
 
 @decorator
@@ -97,9 +171,32 @@ def jsonify(f, *args, **kwargs):
     pylons.response.headers['Content-Type'] = 'application/json'
 
     data = f(*args, **kwargs)
+    return _serialize(data)
+
+
+@decorator
+def jsonify_ndjson(f, *args, **kwargs):
+    """
+    Same as jsonify, but if the client prefers application/x-ndjson, lists are
+    sent as newline delimited JSON, one object per line
+
+    Args:
+        f:      The method to be called
+        args:   Parameters for f
+        kwargs: Named parameters for f
 
+    Returns:
+        A string with the JSON representation of the value returned by f(), or
+        a generator of lines if it is a list and the client asked for ndjson
+    """
+    pylons = get_pylons(args)
+    if not _prefers_ndjson(pylons.request):
+        pylons.response.headers['Content-Type'] = 'application/json'
+        return _serialize(f(*args, **kwargs))
+
+    pylons.response.headers['Content-Type'] = NDJSON
+    data = f(*args, **kwargs)
     if hasattr(data, '__iter__') and not isinstance(data, dict):
-        return stream_response(data)
-    else:
-        log.debug('Sending directly json response')
-        return [json.dumps(data, cls=ClassEncoder, indent=None, sort_keys=False)]
+        return stream_ndjson(data)
+    pylons.response.headers['Content-Type'] = 'application/json'
+    return _serialize(data)
@@ -0,0 +1,131 @@
+#   Copyright notice:
+#   Copyright CERN, 2014.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMonitor(object):
+    """
+    Keeps usage statistics of the database connection pools of this process,
+    so the number of WSGI threads can be sized against them
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.since = datetime.utcnow()
+        self.checkouts = 0
+        self.checkins = 0
+        self.hold_total = 0.0
+        self.hold_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.pings = 0
+        self.pings_failed = 0
+        self.pings_skipped = 0
+
+    def register(self, engine):
+        """
+        Listen to the pool events of the engine. Can be called for several engines
+        """
+        event.listen(engine, 'checkout', self._on_checkout)
+        event.listen(engine, 'checkin', self._on_checkin)
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def _on_checkout(self, dbapi_con, con_record, con_proxy):
+        con_record.info['fts3.checkout_time'] = time.time()
+        with self.lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_con, con_record):
+        if con_record is None:
+            return
+        checkout_time = con_record.info.pop('fts3.checkout_time', None)
+        if checkout_time is None:
+            return
+        held = time.time() - checkout_time
+        with self.lock:
+            self.checkins += 1
+            self.hold_total += held
+            self.hold_max = max(self.hold_max, held)
+
+    def _on_connect(self, dbapi_con, con_record):
+        with self.lock:
+            self.connects += 1
+
+    def _on_invalidate(self, dbapi_con, con_record, exception):
+        with self.lock:
+            self.invalidations += 1
+
+    def checkout_timeout(self):
+        """
+        The pool does not emit an event when it times out, so this is called by whoever catches it
+        """
+        with self.lock:
+            self.timeouts += 1
+
+    def ping_done(self, success):
+        with self.lock:
+            self.pings += 1
+            if not success:
+                self.pings_failed += 1
+
+    def ping_skipped(self):
+        with self.lock:
+            self.pings_skipped += 1
+
+    def snapshot(self, pool):
+        """
+        Returns the statistics gathered so far, plus the current state of the pool
+        """
+        with self.lock:
+            stats = dict(
+                host=socket.getfqdn(),
+                pid=os.getpid(),
+                since=self.since,
+                pool_class=type(pool).__name__,
+                checkouts=self.checkouts,
+                hold_avg=None,
+                hold_max=self.hold_max,
+                timeouts=self.timeouts,
+                connects=self.connects,
+                invalidations=self.invalidations,
+                pings=self.pings,
+                pings_failed=self.pings_failed,
+                pings_skipped=self.pings_skipped,
+            )
+            if self.checkins:
+                stats['hold_avg'] = self.hold_total / self.checkins
+
+        if isinstance(pool, QueuePool):
+            size = pool.size()
+            checked_out = pool.checkedout()
+            max_overflow = pool._max_overflow
+            stats['size'] = size
+            stats['checked_in'] = pool.checkedin()
+            stats['checked_out'] = checked_out
+            stats['overflow'] = pool.overflow()
+            stats['max_overflow'] = max_overflow
+            if max_overflow >= 0 and size + max_overflow > 0:
+                stats['saturation'] = checked_out / float(size + max_overflow)
+            else:
+                stats['saturation'] = None
+        return stats
@@ -15,14 +15,32 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from datetime import datetime, timedelta
+from datetime import datetime
+from M2Crypto import X509
 from subprocess import Popen, PIPE, STDOUT
 from tempfile import NamedTemporaryFile
 import logging
 import os
+import re
+
+from fts3rest.lib.proxy_store import proxy_store
 
 log = logging.getLogger(__name__)
 
+# RFC 3820 proxy certificate information
+PROXY_CERT_INFO_OID = '1.3.6.1.5.5.7.1.14'
+# Pre-RFC (draft) proxy certificate information
+DRAFT_PROXY_CERT_INFO_OID = '1.3.6.1.4.1.3536.1.222'
+# VOMS attribute certificates
+VOMS_AC_OID = '1.3.6.1.4.1.8005.100.100.5'
+
+_DER_SEQUENCE = 0x30
+_DER_GENERALIZED_TIME = 0x18
+_DER_CONSTRUCTED = 0x20
+_DER_EXTENSIONS = 0xa3
+
+_PEM_CERTIFICATE_REGEX = re.compile('-----BEGIN CERTIFICATE-----.+?-----END CERTIFICATE-----', re.DOTALL)
+
 
 class VomsException(Exception):
     """
@@ -32,16 +50,106 @@ class VomsException(Exception):
         super(self, VomsException).__init__(args, kwargs)
 
 
-def _check_proxy_validity(proxy_path):
+def _der_items(der, start=0, end=None):
+    """
+    Iterate over the DER encoded items between start and end,
+    yielding the tag, and where their content starts and ends
+    """
+    if end is None:
+        end = len(der)
+    while start < end:
+        tag = ord(der[start])
+        length = ord(der[start + 1])
+        start += 2
+        if length & 0x80:
+            length_size = length & 0x7f
+            length = 0
+            for byte in der[start:start + length_size]:
+                length = (length << 8) | ord(byte)
+            start += length_size
+        yield tag, start, start + length
+        start += length
+
+
+def _der_children(der, item):
+    return list(_der_items(der, item[1], item[2]))
+
+
+def _der_oid(oid):
+    """
+    DER encoding of the content of the object identifier oid
+    """
+    arcs = map(int, oid.split('.'))
+    encoded = [chr(40 * arcs[0] + arcs[1])]
+    for arc in arcs[2:]:
+        chunk = [chr(arc & 0x7f)]
+        arc >>= 7
+        while arc:
+            chunk.insert(0, chr(0x80 | (arc & 0x7f)))
+            arc >>= 7
+        encoded.extend(chunk)
+    return ''.join(encoded)
+
+
+def _get_extension(der, oid):
+    """
+    Get the raw value of the extension oid of the DER encoded certificate, None if not present
+    """
+    encoded_oid = _der_oid(oid)
+    certificate = _der_children(der, next(_der_items(der)))
+    for item in _der_children(der, certificate[0]):
+        if item[0] != _DER_EXTENSIONS:
+            continue
+        for extension in _der_children(der, _der_children(der, item)[0]):
+            fields = _der_children(der, extension)
+            if der[fields[0][1]:fields[0][2]] == encoded_oid:
+                return der[fields[-1][1]:fields[-1][2]]
+    return None
+
+
+def _find_validity_periods(der, start=0, end=None):
+    """
+    Yield the not after time of the validity periods (a sequence of two generalized times)
+    found within the DER encoded items between start and end
+    """
+    for item in _der_items(der, start, end):
+        if not item[0] & _DER_CONSTRUCTED:
+            continue
+        children = _der_children(der, item)
+        if item[0] == _DER_SEQUENCE and len(children) == 2 and \
+                all(child[0] == _DER_GENERALIZED_TIME for child in children):
+            not_after = der[children[1][1]:children[1][2]]
+            yield datetime.strptime(not_after[:14], '%Y%m%d%H%M%S')
+        else:
+            for not_after in _find_validity_periods(der, item[1], item[2]):
+                yield not_after
+
+
+def _load_proxy_chain(proxy_pem):
+    """
+    Load the certificates contained in proxy_pem, skipping the private key
+    """
+    try:
+        return [X509.load_cert_string(pem) for pem in _PEM_CERTIFICATE_REGEX.findall(proxy_pem)]
+    except X509.X509Error, e:
+        raise VomsException('Malformed proxy: ' + str(e))
+
+
+def _check_proxy_validity(x509_list):
     """
     voms-proxy-init may return != 0 even when the proxy was created
     (something to do with the remaining lifetime), so check the validity
-    using voms-proxy-info
+    of the generated chain
     """
-    args = ['voms-proxy-info', '--file', proxy_path, '--exists']
-    log.debug(' '.join(args))
-    proc = Popen(args, shell=False, stdin=None, stdout=None, stderr=None)
-    return proc.wait() == 0
+    if not x509_list:
+        return False
+    now = datetime.utcnow()
+    for x509 in x509_list:
+        not_before = x509.get_not_before().get_datetime().replace(tzinfo=None)
+        not_after = x509.get_not_after().get_datetime().replace(tzinfo=None)
+        if now < not_before or now >= not_after:
+            return False
+    return True
 
 def _get_proxy_fqans(proxy_path):
     """
@@ -66,61 +174,52 @@ def _get_proxy_fqans(proxy_path):
     
 
 
-def _get_proxy_termination_time(proxy_path):
+def _get_proxy_termination_time(x509_list):
     """
-    Get the termination time of the proxy specified by proxy_path
+    Get the termination time of the proxy chain: the earliest expiration
+    of the certificates and of the VOMS attribute certificates they carry
     """
-    args = ['voms-proxy-info', '--file', proxy_path, '--timeleft', '--actimeleft']
-    log.debug(' '.join(args))
-
-    proc = Popen(args, shell=False, stdin=None, stdout=PIPE, stderr=STDOUT)
-    out = ''
-    for l in proc.stdout:
-        out += l
-    rcode = proc.wait()
-    if rcode != 0:
-        raise VomsException('Failed to get the termination time of a proxy: ' + out)
-
+    if not x509_list:
+        raise VomsException('Failed to get the termination time of a proxy: no certificate found')
+    not_after = []
     try:
-        timeleft = min([int(v) for v in out.split('\n') if v])
-        return datetime.utcnow() + timedelta(seconds=timeleft)
+        for x509 in x509_list:
+            not_after.append(x509.get_not_after().get_datetime().replace(tzinfo=None))
+            voms_acs = _get_extension(x509.as_der(), VOMS_AC_OID)
+            if voms_acs:
+                not_after.extend(_find_validity_periods(voms_acs))
     except Exception, e:
         raise VomsException('Failed to get the termination time of a proxy: ' + str(e))
+    return min(not_after)
+
 
-def _get_proxy_type(proxy_path):
+def _get_proxy_type(x509_list):
     """
-    Get the type of the proxy specified by proxy_path
+    Get the type of the proxy: RFC, draft or legacy
     """
-    args = ['voms-proxy-info', '--file', proxy_path, '--type']
-    log.debug(' '.join(args))
-
-    proc = Popen(args, shell=False, stdin=None, stdout=PIPE, stderr=STDOUT)
-    out = ''
-    for l in proc.stdout:
-        out += l
-    rcode = proc.wait()
-    if rcode != 0:
-        raise VomsException('Failed to get the type of a proxy: ' + out)
-
     try:
-        type = out.split(' ')[0]
-        return type
+        der = x509_list[0].as_der()
+        if _get_extension(der, PROXY_CERT_INFO_OID) is not None:
+            return 'RFC'
+        elif _get_extension(der, DRAFT_PROXY_CERT_INFO_OID) is not None:
+            return 'draft'
+        return 'legacy'
     except Exception, e:
         raise VomsException('Failed to get the type of a proxy: ' + str(e))
 
+
 class VomsClient(object):
     """
     Wrapper for the VOMS client
     """
 
-    def __init__(self, proxy):
-        proxy_fd = NamedTemporaryFile(mode='w', suffix='.pem', delete=False)
-        proxy_fd.write(proxy)
-        proxy_fd.close()
-        self.proxy_path = proxy_fd.name
+    def __init__(self, proxy, dlg_id=None):
+        self.stored_proxy = proxy_store.acquire(dlg_id, proxy)
+        self.proxy_path = self.stored_proxy.name
+        self.x509_list = _load_proxy_chain(proxy)
 
     def __del__(self):
-        os.unlink(self.proxy_path)
+        proxy_store.release(self.stored_proxy)
 
     def init(self, voms_list, lifetime=None):
         """
@@ -137,17 +236,14 @@ class VomsClient(object):
             VomsException: There was an 'expected' error getting the proxy
                            Meaning: The user requested a voms to which he/she doesn't belong
         """
-        new_proxy = self._voms_proxy_init(voms_list, lifetime)
-        new_termination_time = _get_proxy_termination_time(new_proxy)
-
-        new_proxy_pem = open(new_proxy).read()
-        os.unlink(new_proxy)
-
+        new_proxy_pem, new_x509_list = self._voms_proxy_init(voms_list, lifetime)
+        new_termination_time = _get_proxy_termination_time(new_x509_list)
         return new_proxy_pem, new_termination_time
 
     def _voms_proxy_init(self, voms_list, lifetime):
         """
         Call voms-proxy-init to get the new voms extensions
+        Returns the new proxy PEM encoded, and its certificates
         """
         new_proxy = NamedTemporaryFile(mode='w', suffix='.pem', delete=False).name
         args = ['voms-proxy-init',
@@ -156,7 +252,7 @@ class VomsClient(object):
             '--out', new_proxy,
             '--noregen', '--ignorewarn']
         
-        if _get_proxy_type(self.proxy_path) == 'RFC':
+        if _get_proxy_type(self.x509_list) == 'RFC':
             args.append('--rfc')
             
         for v in voms_list:
@@ -171,10 +267,21 @@ class VomsClient(object):
         for l in proc.stdout:
             out += l
         rcode = proc.wait()
-        if rcode != 0 and not _check_proxy_validity(new_proxy):
+
+        try:
+            new_proxy_pem = open(new_proxy).read()
+        finally:
+            os.unlink(new_proxy)
+        try:
+            new_x509_list = _load_proxy_chain(new_proxy_pem)
+        except VomsException:
+            new_x509_list = []
+        if rcode != 0 and not _check_proxy_validity(new_x509_list):
             raise VomsException("Failed to generate a proxy (%d): %s" % (rcode, out))
+        elif not new_x509_list:
+            raise VomsException("Failed to read the generated proxy: %s" % out)
 
-        return new_proxy
+        return new_proxy_pem, new_x509_list
    
     def get_proxy_fqans(self):
 	"""
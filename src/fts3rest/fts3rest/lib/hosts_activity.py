@@ -0,0 +1,99 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import logging
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import func
+from threading import Thread
+
+from fts3.model import File
+from fts3rest.lib.base import Session
+
+log = logging.getLogger(__name__)
+
+
+def query_hosts_activity():
+    """
+    Count the files being staged and transferred by each host
+    """
+    response = dict()
+
+    staging = Session.query(func.count(File.file_id), File.staging_host)\
+        .filter(File.file_state == 'STARTED').group_by(File.staging_host)
+    for (count, host) in staging:
+        response[host] = dict(staging=count)
+
+    active = Session.query(func.count(File.file_id), File.transfer_host)\
+        .filter(File.file_state == 'ACTIVE').group_by(File.transfer_host)
+    for (count, host) in active:
+        if host not in response:
+            response[host] = dict()
+        response[host]['active'] = count
+
+    return response
+
+
+class HostsActivitySnapshot(Thread):
+    """
+    Keeps in memory the activity of the hosts, refreshed on the background every
+    refresh_interval seconds, so the requests do not need to scan t_file.
+    The thread is started with the first request. If refresh_interval is 0, nothing is cached.
+    """
+
+    def __init__(self, refresh_interval):
+        Thread.__init__(self)
+        self.daemon = True
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.hosts = None
+        self.generated_at = None
+        self.started = False
+
+    def refresh(self):
+        """
+        Recompute the snapshot
+        """
+        hosts = query_hosts_activity()
+        with self.lock:
+            self.hosts = hosts
+            self.generated_at = datetime.utcnow()
+            return self.generated_at, self.hosts
+
+    def get(self, fresh=False):
+        """
+        Returns a tuple (generated_at, hosts activity)
+        """
+        if not self.refresh_interval:
+            return self.refresh()
+        with self.lock:
+            if not self.started:
+                self.started = True
+                self.start()
+            if self.hosts is not None and not fresh:
+                return self.generated_at, self.hosts
+        # First call, or asked for a fresh one, do not wait for the thread
+        return self.refresh()
+
+    def run(self):
+        while True:
+            time.sleep(self.refresh_interval)
+            try:
+                self.refresh()
+            except Exception, e:
+                log.warning("Failed to refresh the activity of the hosts: %s" % str(e))
+            finally:
+                Session.remove()
@@ -0,0 +1,88 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Per process cache of the summaries of the jobs
+
+Summaries are only cached for jobs in a terminal state, which are not modified anymore,
+indexed by the job id and its state, so a job that changes state is never served a stale entry.
+"""
+
+import threading
+from collections import OrderedDict
+
+from fts3.model import JobTerminalStates
+
+
+class JobSummaryCache(object):
+    """
+    Bounded cache of job summaries. The least recently used entry is evicted when full.
+    If size is 0, nothing is cached.
+    """
+
+    def __init__(self, size=10000):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, job_id, job_state):
+        """
+        Return the summary of the job in job_state, or None if not cached
+        """
+        if not self.size or job_state not in JobTerminalStates:
+            return None
+        with self.lock:
+            summary = self.entries.pop((job_id, job_state), None)
+            if summary is None:
+                self.misses += 1
+                return None
+            self.entries[(job_id, job_state)] = summary
+            self.hits += 1
+            return summary
+
+    def put(self, summary):
+        """
+        Cache the summary, only if the job is in a terminal state
+        """
+        if not self.size or summary['job_state'] not in JobTerminalStates:
+            return
+        key = (summary['job_id'], summary['job_state'])
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = summary
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self):
+        """
+        Returns a dictionary with the size and counters of the cache
+        """
+        with self.lock:
+            return dict(
+                entries=len(self.entries), capacity=self.size,
+                hits=self.hits, misses=self.misses, evictions=self.evictions
+            )
+
+
+# Shared by all the requests of the process
+job_summary_cache = JobSummaryCache()
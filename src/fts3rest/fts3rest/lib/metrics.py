@@ -0,0 +1,366 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Metrics in the Prometheus text exposition format.
+
+Each process dumps periodically its own metrics into a file, in a directory shared by all the
+processes of the host. When scraped, the files are merged: counters and histograms are summed,
+gauges are kept per process. The counters of the processes that are gone are folded into
+an archive file, so they do not go backwards.
+The size of the queues is computed by a background thread, at most once per interval for the
+whole host, so scraping does not hit the database.
+"""
+
+import errno
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from sqlalchemy import func
+from threading import Thread
+
+from fts3.model import File
+from fts3rest.lib.base import Session
+from fts3rest.lib.scheduler.Cache import ThreadLocalCache
+from fts3rest.lib.token_cache import token_cache
+
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Type and help of each metric family
+FAMILIES = {
+    'fts3_rest_requests_total': ('counter', 'Requests served, per route'),
+    'fts3_rest_request_errors_total': ('counter', 'Requests that failed with a 5xx, per route'),
+    'fts3_rest_request_duration_seconds': ('histogram', 'Time spent serving the requests, per route'),
+    'fts3_rest_request_queries': ('histogram', 'Database queries per request, per route'),
+    'fts3_rest_request_db_seconds_total': ('counter', 'Time spent on the database, per route'),
+    'fts3_rest_response_bytes_total': ('counter', 'Bytes sent back, per route'),
+    'fts3_rest_db_pool_size': ('gauge', 'Size of the database connection pool, per process'),
+    'fts3_rest_db_pool_checked_out': ('gauge', 'Connections in use, per process'),
+    'fts3_rest_db_pool_overflow': ('gauge', 'Connections open on top of the pool size, per process'),
+    'fts3_rest_db_pool_checkouts_total': ('counter', 'Connections taken from the pool'),
+    'fts3_rest_db_pool_timeouts_total': ('counter', 'Timeouts waiting for a connection from the pool'),
+    'fts3_rest_db_pool_connects_total': ('counter', 'New connections opened to the database'),
+    'fts3_rest_db_pool_invalidations_total': ('counter', 'Connections invalidated'),
+    'fts3_rest_scheduler_cache_hits_total': ('counter', 'Scheduler cache hits, per cache'),
+    'fts3_rest_scheduler_cache_misses_total': ('counter', 'Scheduler cache misses, per cache'),
+    'fts3_rest_oauth2_token_cache_hits_total': ('counter', 'OAuth2 access tokens found in the cache'),
+    'fts3_rest_oauth2_token_cache_misses_total': ('counter', 'OAuth2 access tokens not found in the cache'),
+    'fts3_rest_oauth2_token_cache_evictions_total': ('counter', 'OAuth2 access tokens evicted from the full cache'),
+    'fts3_rest_oauth2_token_cache_invalidations_total': ('counter', 'OAuth2 access tokens removed from the cache on revocation'),
+    'fts3_rest_submitted_jobs_total': ('counter', 'Jobs submitted, per vo'),
+    'fts3_rest_submitted_files_total': ('counter', 'Files submitted, per vo'),
+    'fts3_rest_log_dropped_total': ('counter', 'Log entries dropped because the logging queue was full'),
+    'fts3_queue_active_files': ('gauge', 'Active transfers, per host'),
+    'fts3_queue_staging_files': ('gauge', 'Files being staged, per host'),
+    'fts3_queue_submitted_files': ('gauge', 'Files waiting to be scheduled, per vo'),
+    'fts3_msgbus_queue_depth': ('gauge', 'Messages waiting to be sent to the message broker'),
+    'fts3_queue_snapshot_age_seconds': ('gauge', 'Age of the snapshot of the queues'),
+}
+
+_QUEUES_FILE = 'queues.json'
+_ARCHIVE_FILE = 'archive.json'
+_PROCESS_SUFFIX = '.proc.json'
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.iteritems()))
+
+
+class ProcessCounters(object):
+    """
+    Counters incremented by the application itself, i.e. submitted jobs
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = dict()
+
+    def increment(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def series(self):
+        with self.lock:
+            return [(name, dict(labels), value) for (name, labels), value in self.values.iteritems()]
+
+
+def _route_series(histograms):
+    series = []
+    if histograms is None:
+        return series
+    for route, stats in histograms.snapshot()['routes'].iteritems():
+        labels = dict(route=route)
+        series.append(('fts3_rest_requests_total', labels, stats['requests']))
+        series.append(('fts3_rest_request_errors_total', labels, stats['errors']))
+        series.append(('fts3_rest_request_db_seconds_total', labels, stats['db_time']))
+        series.append(('fts3_rest_response_bytes_total', labels, stats['response_bytes']))
+        for family, histogram, scale in (('fts3_rest_request_duration_seconds', stats['latency_ms'], 1000.0),
+                                         ('fts3_rest_request_queries', stats['queries'], 1)):
+            for le, count in histogram['buckets']:
+                if le != '+Inf':
+                    le = repr(float(le) / scale)
+                series.append((family + '_bucket', dict(route=route, le=le), count))
+            series.append((family + '_sum', labels, histogram['sum'] / scale))
+            series.append((family + '_count', labels, stats['requests']))
+    return series
+
+
+def _pool_series(pool_monitor, pid):
+    counters, gauges = [], []
+    if pool_monitor is None:
+        return counters, gauges
+    stats = pool_monitor.snapshot(Session.get_bind().pool)
+    for field in ('checkouts', 'timeouts', 'connects', 'invalidations'):
+        counters.append(('fts3_rest_db_pool_%s_total' % field, {}, stats[field]))
+    labels = dict(pid=str(pid))
+    for field in ('size', 'checked_out', 'overflow'):
+        if field in stats:
+            gauges.append(('fts3_rest_db_pool_%s' % field, labels, stats[field]))
+    return counters, gauges
+
+
+def _cache_series():
+    series = []
+    stats = ThreadLocalCache.get_stats()
+    for cache, hits in stats['hits'].iteritems():
+        series.append(('fts3_rest_scheduler_cache_hits_total', dict(cache=cache), hits))
+    for cache, misses in stats['misses'].iteritems():
+        series.append(('fts3_rest_scheduler_cache_misses_total', dict(cache=cache), misses))
+    stats = token_cache.get_stats()
+    for field in ('hits', 'misses', 'evictions', 'invalidations'):
+        series.append(('fts3_rest_oauth2_token_cache_%s_total' % field, {}, stats[field]))
+    return series
+
+
+def _write_json(directory, filename, data):
+    """
+    Write atomically, so readers never see half a file
+    """
+    tmp = tempfile.NamedTemporaryFile(dir=directory, prefix='.', delete=False)
+    json.dump(data, tmp)
+    tmp.close()
+    os.rename(tmp.name, os.path.join(directory, filename))
+
+
+def _read_json(path, default=None):
+    try:
+        return json.load(open(path))
+    except (IOError, ValueError):
+        return default
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError, e:
+        return e.errno == errno.EPERM
+    return True
+
+
+class MetricsExporter(Thread):
+    """
+    Keeps running on the background, dumping the metrics of this process,
+    and refreshing the snapshot of the queues when it is too old
+    """
+
+    def __init__(self, directory, counters, histograms, pool_monitor,
+                 flush_interval=5, queue_interval=60, msg_dir=None):
+        Thread.__init__(self)
+        self.daemon = True
+        self.directory = directory
+        self.counters = counters
+        self.histograms = histograms
+        self.pool_monitor = pool_monitor
+        self.flush_interval = flush_interval
+        self.queue_interval = queue_interval
+        self.msg_dir = msg_dir
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def flush(self):
+        """
+        Dump the metrics of this process
+        """
+        pid = os.getpid()
+        pool_counters, pool_gauges = _pool_series(self.pool_monitor, pid)
+        counters = self.counters.series() + _route_series(self.histograms) + pool_counters + _cache_series()
+        _write_json(self.directory, '%d%s' % (pid, _PROCESS_SUFFIX), dict(
+            pid=pid, updated=time.time(), counters=counters, gauges=pool_gauges
+        ))
+
+    def _msgbus_depth(self):
+        if not self.msg_dir:
+            return None
+        mon_dir = os.path.join(self.msg_dir, 'monitoring')
+        if not os.path.isdir(mon_dir):
+            return 0
+        # dirq stores the messages in subdirectories of the queue directory
+        depth = 0
+        for entry in os.listdir(mon_dir):
+            entry_path = os.path.join(mon_dir, entry)
+            if os.path.isdir(entry_path):
+                depth += len(filter(lambda f: not f.endswith(('.tmp', '.lck')), os.listdir(entry_path)))
+        return depth
+
+    def refresh_queues(self):
+        """
+        Query the size of the queues, unless another process has done it recently
+        """
+        path = os.path.join(self.directory, _QUEUES_FILE)
+        try:
+            if time.time() - os.path.getmtime(path) < self.queue_interval:
+                return
+        except OSError:
+            pass
+
+        gauges = []
+        try:
+            for host, count in Session.query(File.transfer_host, func.count(File.file_id))\
+                    .filter(File.file_state == 'ACTIVE').group_by(File.transfer_host):
+                gauges.append(('fts3_queue_active_files', dict(host=host or ''), count))
+            for host, count in Session.query(File.staging_host, func.count(File.file_id))\
+                    .filter(File.file_state == 'STARTED').group_by(File.staging_host):
+                gauges.append(('fts3_queue_staging_files', dict(host=host or ''), count))
+            for vo, count in Session.query(File.vo_name, func.count(File.file_id))\
+                    .filter(File.file_state == 'SUBMITTED').group_by(File.vo_name):
+                gauges.append(('fts3_queue_submitted_files', dict(vo=vo or ''), count))
+        finally:
+            Session.remove()
+
+        depth = self._msgbus_depth()
+        if depth is not None:
+            gauges.append(('fts3_msgbus_queue_depth', {}, depth))
+        _write_json(self.directory, _QUEUES_FILE, dict(generated_at=time.time(), gauges=gauges))
+
+    def run(self):
+        while True:
+            try:
+                self.flush()
+            except Exception, e:
+                log.warning("Failed to dump the metrics: %s" % str(e))
+            try:
+                self.refresh_queues()
+            except Exception, e:
+                log.warning("Failed to refresh the snapshot of the queues: %s" % str(e))
+            time.sleep(self.flush_interval)
+
+
+def _merge(target, series):
+    for name, labels, value in series:
+        key = _key(name, labels)
+        target[key] = target.get(key, 0) + value
+
+
+def collect(directory):
+    """
+    Merge the metrics dumped by all the processes
+
+    Returns:
+        A dictionary of counters and a dictionary of gauges, both indexed by (name, labels)
+    """
+    counters = dict()
+    gauges = dict()
+
+    lock = open(os.path.join(directory, '.lock'), 'a')
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    try:
+        archive_path = os.path.join(directory, _ARCHIVE_FILE)
+        archive = _read_json(archive_path, dict(counters=[]))
+        archive_changed = False
+
+        for filename in os.listdir(directory):
+            if not filename.endswith(_PROCESS_SUFFIX):
+                continue
+            path = os.path.join(directory, filename)
+            process = _read_json(path)
+            if process is None:
+                continue
+            if _pid_alive(process['pid']):
+                _merge(counters, process['counters'])
+                _merge(gauges, process['gauges'])
+            else:
+                archive['counters'].extend(process['counters'])
+                archive_changed = True
+                os.unlink(path)
+
+        if archive_changed:
+            archived = dict()
+            _merge(archived, archive['counters'])
+            archive['counters'] = [(name, dict(labels), value) for (name, labels), value in archived.iteritems()]
+            _write_json(directory, _ARCHIVE_FILE, archive)
+        _merge(counters, archive['counters'])
+    finally:
+        fcntl.flock(lock, fcntl.LOCK_UN)
+        lock.close()
+
+    queues = _read_json(os.path.join(directory, _QUEUES_FILE))
+    if queues:
+        _merge(gauges, queues['gauges'])
+        _merge(gauges, [('fts3_queue_snapshot_age_seconds', {}, time.time() - queues['generated_at'])])
+
+    return counters, gauges
+
+
+def _family(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in FAMILIES:
+            return name[:-len(suffix)]
+    return name
+
+
+def _sort_key(item):
+    (name, labels), value = item
+    labels = dict(labels)
+    le = labels.pop('le', None)
+    if le is None:
+        le = float('inf')
+    else:
+        le = float(le)
+    return _family(name), sorted(labels.items()), name.endswith('_count'), name.endswith('_sum'), le
+
+
+def _escape(value):
+    return unicode(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def render(counters, gauges):
+    """
+    Serialize the metrics in the Prometheus text format
+    """
+    lines = []
+    series = dict(counters)
+    series.update(gauges)
+    current_family = None
+    for (name, labels), value in sorted(series.iteritems(), key=_sort_key):
+        family = _family(name)
+        if family != current_family:
+            current_family = family
+            metric_type, metric_help = FAMILIES.get(family, ('untyped', None))
+            if metric_help:
+                lines.append('# HELP %s %s' % (family, metric_help))
+            lines.append('# TYPE %s %s' % (family, metric_type))
+        if labels:
+            label_str = ','.join(['%s="%s"' % (k, _escape(v)) for k, v in labels])
+            lines.append('%s{%s} %s' % (name, label_str, repr(float(value))))
+        else:
+            lines.append('%s %s' % (name, repr(float(value))))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,315 @@
+#   Copyright notice:
+#   Copyright  Members of the EMI Collaboration, 2013.
+#
+#   See www.eu-emi.eu for details on the copyright holders
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+
+"""
+Negotiated compression of the responses.
+
+The encoding is picked from the Accept-Encoding header of the request, between those enabled
+in the configuration. gzip is always available, zstd and br only if the zstandard and brotli
+modules are installed.
+The body is compressed chunk by chunk while it is sent, and the compressor is flushed every
+flush_size bytes of input, so streamed responses are not buffered in memory, nor held back.
+Responses of a known size smaller than min_size are sent as they are.
+"""
+
+import itertools
+import logging
+import zlib
+from paste.deploy.converters import aslist
+from fts3rest.lib.middleware.instrumentation import with_written
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = ['application/json', 'application/x-ndjson', 'text/']
+
+
+class GzipEncoder(object):
+
+    def __init__(self, level):
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class ZstdEncoder(object):
+
+    def __init__(self, level):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class BrotliEncoder(object):
+
+    def __init__(self, level):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+# Encoding => (encoder, configuration option for the level, default level)
+ENCODERS = {
+    'gzip': (GzipEncoder, 'fts3.CompressionGzipLevel', 6)
+}
+if zstandard is not None:
+    ENCODERS['zstd'] = (ZstdEncoder, 'fts3.CompressionZstdLevel', 3)
+if brotli is not None:
+    ENCODERS['br'] = (BrotliEncoder, 'fts3.CompressionBrotliLevel', 4)
+
+
+def parse_accept_encoding(header):
+    """
+    Parse the Accept-Encoding header
+
+    Returns:
+        A dictionary encoding => quality
+    """
+    accepted = dict()
+    for item in header.split(','):
+        params = item.strip().split(';')
+        encoding = params[0].strip().lower()
+        if not encoding:
+            continue
+        quality = 1.0
+        for param in params[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[encoding] = quality
+    return accepted
+
+
+def _get_header(headers, name):
+    for header, value in headers:
+        if header.lower() == name:
+            return value
+    return None
+
+
+def _compressed_headers(headers, encoding):
+    """
+    Headers for the compressed response: without length, with the encoding,
+    and the entity tag weakened, since it is not the same representation
+    """
+    compressed = []
+    for header, value in headers:
+        lower = header.lower()
+        if lower == 'content-length':
+            continue
+        elif lower == 'etag' and not value.startswith('W/'):
+            value = 'W/' + value
+        compressed.append((header, value))
+    compressed.append(('Content-Encoding', encoding))
+    return compressed
+
+
+class _CompressedResponse(object):
+    """
+    Compress the chunks of the wrapped response as they go
+    """
+
+    def __init__(self, app_iter, encoder, flush_size):
+        self.app_iter = app_iter
+        self.encoder = encoder
+        self.flush_size = flush_size
+
+    def __iter__(self):
+        pending = 0
+        for chunk in self.app_iter:
+            if not chunk:
+                continue
+            compressed = self.encoder.compress(chunk)
+            pending += len(chunk)
+            if pending >= self.flush_size:
+                compressed += self.encoder.flush()
+                pending = 0
+            if compressed:
+                yield compressed
+        yield self.encoder.finish()
+
+    def close(self):
+        if hasattr(self.app_iter, 'close'):
+            self.app_iter.close()
+
+
+class CompressionMiddleware(object):
+    """
+    Compress the responses with the encoding negotiated with the client
+    """
+
+    def __init__(self, wrap_app, config):
+        self.app = wrap_app
+        self.min_size = int(config.get('fts3.CompressionMinSize', 1024))
+        self.flush_size = int(config.get('fts3.CompressionFlushSize', 65536))
+        self.encoders = []
+        configured = 'fts3.CompressionEncodings' in config
+        for encoding in aslist(config.get('fts3.CompressionEncodings', 'zstd, br, gzip'), ','):
+            encoding = encoding.strip().lower()
+            if encoding not in ENCODERS:
+                # Only worth a warning if explicitly asked for
+                if configured:
+                    log.warning('Compression with %s is not available' % encoding)
+                continue
+            encoder, level_option, default_level = ENCODERS[encoding]
+            self.encoders.append((encoding, encoder, int(config.get(level_option, default_level))))
+
+    def _negotiate(self, environ):
+        """
+        Pick the encoding with the highest quality for the client. On ties, the configuration order decides
+        """
+        header = environ.get('HTTP_ACCEPT_ENCODING', None)
+        if not header:
+            return None
+        accepted = parse_accept_encoding(header)
+        selected = None
+        selected_quality = 0
+        for encoding, encoder, level in self.encoders:
+            quality = accepted.get(encoding, accepted.get('*', 0))
+            if quality > selected_quality:
+                selected = (encoding, encoder, level)
+                selected_quality = quality
+        return selected
+
+    def _compressible(self, environ, status, headers):
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return False
+        try:
+            code = int(status.split()[0])
+        except:
+            return False
+        if code < 200 or code in (204, 304):
+            return False
+        if _get_header(headers, 'content-encoding'):
+            return False
+        content_type = _get_header(headers, 'content-type') or ''
+        return any(map(lambda t: content_type.startswith(t), COMPRESSIBLE_TYPES))
+
+    def __call__(self, environ, start_response):
+        selected = self._negotiate(environ)
+        if selected is None:
+            return self.app(environ, start_response)
+        encoding, encoder, level = selected
+
+        response_status = []
+        response_headers = []
+        deferred = [True]
+        compress = [False]
+        written = []
+
+        def decide(status, headers, size):
+            if not self._compressible(environ, status, headers):
+                return headers
+            headers = headers + [('Vary', 'Accept-Encoding')]
+            if size is None:
+                length = _get_header(headers, 'content-length')
+                size = int(length) if length and length.isdigit() else None
+            if size is not None and size < self.min_size:
+                return headers
+            compress[0] = True
+            return _compressed_headers(headers, encoding)
+
+        def deferred_start_response(status, headers, exc_info=None):
+            if exc_info:
+                deferred[0] = False
+                compress[0] = False
+                return start_response(status, headers, exc_info)
+            if deferred[0]:
+                response_status[:] = [status]
+                response_headers[:] = headers
+                return written.append
+            else:
+                # Called while iterating, so only the headers are known
+                return start_response(status, decide(status, headers, None))
+
+        app_iter = self.app(environ, deferred_start_response)
+
+        if not response_status:
+            # The application starts the response when iterated
+            deferred[0] = False
+            return _LazyResponse(app_iter, compress, encoder(level), self.flush_size)
+
+        app_iter = with_written(written, app_iter)
+        size = None
+        if isinstance(app_iter, (list, tuple)):
+            size = sum(map(len, app_iter))
+        start_response(response_status[0], decide(response_status[0], response_headers, size))
+
+        if not compress[0]:
+            return app_iter
+        return _CompressedResponse(app_iter, encoder(level), self.flush_size)
+
+
+class _LazyResponse(object):
+    """
+    For applications that start the response when iterated: whether to compress or not
+    is only known once the first chunk has been produced
+    """
+
+    def __init__(self, app_iter, compress, encoder, flush_size):
+        self.app_iter = app_iter
+        self.compress = compress
+        self.encoder = encoder
+        self.flush_size = flush_size
+
+    def __iter__(self):
+        chunks = iter(self.app_iter)
+        try:
+            first = next(chunks)
+        except StopIteration:
+            if self.compress[0]:
+                yield self.encoder.finish()
+            return
+        chunks = itertools.chain([first], chunks)
+        if self.compress[0]:
+            chunks = _CompressedResponse(chunks, self.encoder, self.flush_size)
+        for chunk in chunks:
+            yield chunk
+
+    def close(self):
+        if hasattr(self.app_iter, 'close'):
+            self.app_iter.close()
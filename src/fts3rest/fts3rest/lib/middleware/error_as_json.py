@@ -34,7 +34,7 @@ class ErrorAsJson(object):
 
     def __call__(self, environ, start_response):
         accept = environ.get('HTTP_ACCEPT', 'application/json')
-        is_json_accepted = 'application/json' in accept
+        is_json_accepted = 'application/json' in accept or 'application/x-ndjson' in accept
 
         self._status_msg = None
         self._status_code = None
@@ -15,7 +15,6 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-import copy
 import hashlib
 import logging
 import re
@@ -26,7 +25,33 @@ from methods import Authenticator
 
 log = logging.getLogger(__name__)
 
+# Bound of the memoized parsing and role resolution caches. They are just dropped when full,
+# since the number of distinct FQANs, DNs and role combinations seen by a server is small
+MEMOIZE_MAX_SIZE = 10000
 
+
+def _memoize(function):
+    """
+    Cache the return value of function, which takes a single hashable argument
+    """
+    cache = dict()
+
+    def _memoized(arg):
+        try:
+            return cache[arg]
+        except KeyError:
+            if len(cache) >= MEMOIZE_MAX_SIZE:
+                cache.clear()
+            value = cache[arg] = function(arg)
+            return value
+
+    _memoized.__name__ = function.__name__
+    _memoized.__doc__ = function.__doc__
+    _memoized.cache = cache
+    return _memoized
+
+
+@_memoize
 def vo_from_fqan(fqan):
     """
     Get the VO from a full FQAN
@@ -67,6 +92,7 @@ def generate_delegation_id(dn, fqans):
     return d.hexdigest()[:16]
 
 
+@_memoize
 def build_vo_from_dn(user_dn):
     """
     Generate an 'anonymous' VO from the user_dn
@@ -84,6 +110,106 @@ def build_vo_from_dn(user_dn):
     return uname + '@' + '.'.join(reversed(domain))
 
 
+ROLE_REGEX = re.compile('(/.+)*/Role=(\\w+)(/.*)?', re.IGNORECASE)
+
+
+@_memoize
+def role_from_fqan(fqan):
+    """
+    Get the role from a full FQAN
+
+    Args:
+        fqan: A single fqans (i.e. /dteam/cern/Role=lcgadmin)
+    Returns:
+        The role (i.e. lcgadmin), or None if there is no role, or it is NULL
+    """
+    match = ROLE_REGEX.match(fqan)
+    if match and match.group(2).upper() != 'NULL':
+        return match.group(2)
+    return None
+
+
+class FrozenDict(dict):
+    """
+    Read only dictionary, so the same instance can be shared by several credentials
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('%s is read only' % type(self).__name__)
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __hash__(self):
+        return hash(frozenset(self.iteritems()))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
+
+
+ROOT_LEVELS = FrozenDict({
+    'transfer': 'all',
+    'deleg': 'all',
+    'config': 'all',
+    'datamanagement': 'all'
+})
+
+
+class RolePermissions(object):
+    """
+    Role permissions as configured in the FTS3 config file, compiled once.
+    The levels granted to a given set of roles are resolved the first time they are seen,
+    and shared afterwards.
+    """
+
+    def __init__(self, role_permissions=None):
+        """
+        Constructor
+
+        Args:
+            role_permissions: The role permissions as configured in the FTS3 config file
+        """
+        self.permissions = dict()
+        if role_permissions is not None:
+            for role, levels in role_permissions.iteritems():
+                self.permissions[role] = FrozenDict(levels)
+        self.public = self.permissions.get('public', FrozenDict())
+        self.resolved = dict()
+
+    def resolve(self, roles, is_root=False):
+        """
+        Get the levels granted to the given roles (all levels authorized for public,
+        plus those for the given roles), or everything if is_root
+
+        Returns:
+            A FrozenDict operation => level
+        """
+        key = (tuple(roles), is_root)
+        try:
+            return self.resolved[key]
+        except KeyError:
+            pass
+
+        if is_root:
+            granted_level = ROOT_LEVELS
+        else:
+            granted_level = dict(self.public)
+            for role in roles:
+                if role in self.permissions:
+                    granted_level.update(self.permissions[role])
+            granted_level = FrozenDict(granted_level)
+
+        if len(self.resolved) >= MEMOIZE_MAX_SIZE:
+            self.resolved.clear()
+        self.resolved[key] = granted_level
+        return granted_level
+
+
 class InvalidCredentials(Exception):
     """
     Credentials have been provided, but they are invalid
@@ -97,7 +223,7 @@ class UserCredentials(object):
     """
 
     authenticator = Authenticator()
-    role_regex = re.compile('(/.+)*/Role=(\\w+)(/.*)?', re.IGNORECASE)
+    role_regex = ROLE_REGEX
 
     def _anonymous(self):
         """
@@ -113,7 +239,8 @@ class UserCredentials(object):
 
         Args:
             env:              Environment (i.e. os.environ)
-            role_permissions: The role permissions as configured in the FTS3 config file
+            role_permissions: The role permissions as configured in the FTS3 config file,
+                              preferably compiled as RolePermissions
         """
         # Default
         self.user_dn   = None
@@ -145,38 +272,29 @@ class UserCredentials(object):
         """
         roles = []
         for fqan in self.voms_cred:
-            match = UserCredentials.role_regex.match(fqan)
-            if match and match.group(2).upper() != 'NULL':
-                roles.append(match.group(2))
+            role = role_from_fqan(fqan)
+            if role:
+                roles.append(role)
         return roles
 
     def _granted_level(self, role_permissions):
         """
         Get all granted levels for this user out of the configuration
         (all levels authorized for public, plus those for the given Roles)
+        The returned dictionary is shared, and read only, unless there are grants in the database
         """
-        if self.is_root:
-            return {
-                'transfer': 'all',
-                'deleg': 'all',
-                'config': 'all',
-                'datamanagement': 'all'
-            }
-
-        granted_level = dict()
+        if not isinstance(role_permissions, RolePermissions):
+            role_permissions = RolePermissions(role_permissions)
 
-        # Public apply to anyone
-        if role_permissions is not None:
-            if 'public' in role_permissions:
-                granted_level = copy.deepcopy(role_permissions['public'])
-
-            # Roles from the proxy
-            for grant in self.roles:
-                if grant in role_permissions:
-                    granted_level.update(copy.deepcopy(role_permissions[grant]))
+        granted_level = role_permissions.resolve(self.roles, self.is_root)
+        if self.is_root:
+            return granted_level
 
         # DB Configuration
-        for grant in Session.query(AuthorizationByDn).filter(AuthorizationByDn.dn == self.user_dn).all():
+        grants = Session.query(AuthorizationByDn).filter(AuthorizationByDn.dn == self.user_dn).all()
+        if grants:
+            granted_level = dict(granted_level)
+        for grant in grants:
             log.info('%s granted to "%s" because it is configured in the database' % (grant.operation, self.user_dn))
             granted_level[grant.operation] = 'all'
 
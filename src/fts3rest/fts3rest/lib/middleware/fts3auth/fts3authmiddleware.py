@@ -19,7 +19,7 @@ import logging
 
 from fts3rest.lib.base import Session
 from fts3.model import BannedDN
-from credentials import UserCredentials, InvalidCredentials
+from credentials import UserCredentials, InvalidCredentials, RolePermissions
 from sqlalchemy.exc import DatabaseError
 from urlparse import urlparse
 from webob.exc import HTTPUnauthorized, HTTPForbidden, HTTPError
@@ -37,6 +37,7 @@ class FTS3AuthMiddleware(object):
     def __init__(self, wrap_app, config):
         self.app    = wrap_app
         self.config = config
+        self.role_permissions = RolePermissions(config['fts3.Roles'])
 
     def _trusted_origin(self, environ, parsed):
         allow_origin = environ.get('ACCESS_CONTROL_ORIGIN', None)
@@ -57,7 +58,7 @@ class FTS3AuthMiddleware(object):
 
     def _get_credentials(self, environ):
         try:
-            credentials = UserCredentials(environ, self.config['fts3.Roles'])
+            credentials = UserCredentials(environ, self.role_permissions)
         except InvalidCredentials, e:
             raise HTTPForbidden('Invalid credentials (%s)' % str(e))
 
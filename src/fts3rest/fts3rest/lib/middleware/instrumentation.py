@@ -0,0 +1,314 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import itertools
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event
+
+# Statistics of the request being served by the current thread, if instrumentation is enabled
+_local = threading.local()
+
+LATENCY_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+QUERY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+class RequestStats(object):
+    """
+    What a single request has cost. Times are in seconds.
+    """
+
+    def __init__(self):
+        self.start = time.time()
+        self.duration = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.serialization_time = 0.0
+        self.response_bytes = None
+
+    def server_timing(self):
+        """
+        Value for the Server-Timing header
+        """
+        return 'db;dur=%.2f;desc="%d queries, %d rows", ser;dur=%.2f, app;dur=%.2f' % (
+            self.db_time * 1000, self.queries, self.rows,
+            self.serialization_time * 1000, (time.time() - self.start) * 1000
+        )
+
+    def summary(self):
+        """
+        Short description, to be appended to the log line of the request
+        """
+        entry = "[queries=%d db=%.2fms rows=%d ser=%.2fms" % (
+            self.queries, self.db_time * 1000, self.rows, self.serialization_time * 1000
+        )
+        if self.response_bytes is not None:
+            entry += " bytes=%d" % self.response_bytes
+        return entry + "]"
+
+
+def current_stats():
+    """
+    Statistics of the request being served by this thread, None if instrumentation is disabled
+    """
+    return getattr(_local, 'stats', None)
+
+
+def record_serialization(seconds):
+    """
+    To be called by the serializers, so the time spent generating the response is accounted
+    """
+    stats = getattr(_local, 'stats', None)
+    if stats is not None:
+        stats.serialization_time += seconds
+
+
+class QueryInstrumentation(object):
+    """
+    SQLAlchemy event hooks that account the queries, their time and the rows
+    into the statistics of the request being served
+    """
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if getattr(_local, 'stats', None) is not None:
+            conn.info.setdefault('fts3.query_start', []).append(time.time())
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = getattr(_local, 'stats', None)
+        starts = conn.info.get('fts3.query_start', None)
+        if stats is None or not starts:
+            return
+        stats.queries += 1
+        stats.db_time += time.time() - starts.pop()
+        # Affected rows, or fetched rows when the driver knows them beforehand
+        # (i.e. not for server side cursors)
+        if cursor.rowcount > 0:
+            stats.rows += cursor.rowcount
+
+    @classmethod
+    def register(cls, engine):
+        event.listen(engine, 'before_cursor_execute', cls._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', cls._after_cursor_execute)
+
+
+class _Histogram(object):
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.sum += value
+        for i, limit in enumerate(self.buckets):
+            if value <= limit:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def as_dict(self):
+        cumulative = 0
+        buckets = []
+        for limit, count in zip(self.buckets + ['+Inf'], self.counts):
+            cumulative += count
+            buckets.append((str(limit), cumulative))
+        return dict(buckets=buckets, sum=self.sum)
+
+
+class _RouteStats(object):
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.latency = _Histogram(LATENCY_BUCKETS)
+        self.queries = _Histogram(QUERY_BUCKETS)
+        self.db_time = 0.0
+        self.rows = 0
+        self.serialization_time = 0.0
+        self.response_bytes = 0
+
+
+class RouteHistograms(object):
+    """
+    Aggregates the statistics of the requests per route (controller and action).
+    They are kept per process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.since = datetime.utcnow()
+        self.routes = dict()
+
+    def record(self, route, status_code, stats):
+        with self.lock:
+            route_stats = self.routes.get(route, None)
+            if route_stats is None:
+                route_stats = self.routes[route] = _RouteStats()
+            route_stats.requests += 1
+            if status_code >= 500:
+                route_stats.errors += 1
+            route_stats.latency.observe(stats.duration * 1000)
+            route_stats.queries.observe(stats.queries)
+            route_stats.db_time += stats.db_time
+            route_stats.rows += stats.rows
+            route_stats.serialization_time += stats.serialization_time
+            route_stats.response_bytes += stats.response_bytes or 0
+
+    def snapshot(self):
+        """
+        Returns the statistics gathered so far. Latencies are in milliseconds,
+        other times in seconds.
+        """
+        with self.lock:
+            routes = dict()
+            for route, route_stats in self.routes.iteritems():
+                routes[route] = dict(
+                    requests=route_stats.requests,
+                    errors=route_stats.errors,
+                    latency_ms=route_stats.latency.as_dict(),
+                    queries=route_stats.queries.as_dict(),
+                    db_time=route_stats.db_time,
+                    rows=route_stats.rows,
+                    serialization_time=route_stats.serialization_time,
+                    response_bytes=route_stats.response_bytes
+                )
+            return dict(host=socket.getfqdn(), pid=os.getpid(), since=self.since, routes=routes)
+
+
+def _route_name(environ):
+    routing_args = environ.get('wsgiorg.routing_args', None)
+    if routing_args and routing_args[1].get('controller', None):
+        return "%s.%s" % (routing_args[1]['controller'], routing_args[1].get('action', None))
+    return 'unknown'
+
+
+class _WrittenFirst(object):
+    """
+    Sends what the application passed to write() before the response it returned
+    """
+
+    def __init__(self, written, app_iter):
+        self.written = written
+        self.app_iter = app_iter
+
+    def __iter__(self):
+        return itertools.chain(self.written, self.app_iter)
+
+    def close(self):
+        if hasattr(self.app_iter, 'close'):
+            self.app_iter.close()
+
+
+def with_written(written, app_iter):
+    """
+    Middlewares that defer start_response give the application a write callable that
+    appends to written. Returns the response to send, with those chunks first
+    """
+    if not written:
+        return app_iter
+    if isinstance(app_iter, (list, tuple)):
+        return list(written) + list(app_iter)
+    return _WrittenFirst(written, app_iter)
+
+
+class _InstrumentedResponse(object):
+    """
+    Wraps a streamed response, so the statistics are complete once it has been sent
+    """
+
+    def __init__(self, app_iter, finish):
+        self.app_iter = app_iter
+        self.finish = finish
+        self.response_bytes = 0
+
+    def __iter__(self):
+        for chunk in self.app_iter:
+            self.response_bytes += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self.app_iter, 'close'):
+                self.app_iter.close()
+        finally:
+            self.finish(self.response_bytes)
+
+
+class InstrumentationMiddleware(object):
+    """
+    Accounts the queries, database time, rows, serialization time and response size of each request.
+    They are sent back in the Server-Timing header, stored in the environment for the RequestLogger,
+    and aggregated per route into histograms.
+    For streamed responses, the header can only contain what has been done before sending the body.
+    """
+
+    def __init__(self, wrap_app, config, histograms):
+        self.app = wrap_app
+        self.config = config
+        self.histograms = histograms
+
+    def __call__(self, environ, start_response):
+        stats = RequestStats()
+        environ['fts3.RequestStats'] = stats
+        _local.stats = stats
+
+        response_status = []
+        response_headers = []
+        deferred = [True]
+        written = []
+
+        def deferred_start_response(status, headers, exc_info=None):
+            response_status[:] = [status, exc_info]
+            if deferred[0]:
+                response_headers[:] = headers
+                return written.append
+            else:
+                return start_response(status, headers, exc_info)
+
+        def finish(response_bytes):
+            stats.response_bytes = response_bytes
+            stats.duration = time.time() - stats.start
+            _local.stats = None
+            try:
+                code = int(response_status[0].split()[0])
+            except:
+                code = 0
+            self.histograms.record(_route_name(environ), code, stats)
+
+        try:
+            app_iter = self.app(environ, deferred_start_response)
+        except:
+            _local.stats = None
+            raise
+
+        # The application will start the response when iterated, so the header can not be added
+        if not response_status:
+            deferred[0] = False
+            return _InstrumentedResponse(app_iter, finish)
+
+        app_iter = with_written(written, app_iter)
+        if isinstance(app_iter, (list, tuple)):
+            stats.response_bytes = sum(map(len, app_iter))
+        response_headers.append(('Server-Timing', stats.server_timing()))
+        start_response(response_status[0], response_headers, response_status[1])
+
+        if isinstance(app_iter, (list, tuple)):
+            finish(stats.response_bytes)
+            return app_iter
+        return _InstrumentedResponse(app_iter, finish)
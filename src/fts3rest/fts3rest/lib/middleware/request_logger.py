@@ -15,74 +15,173 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import json
 import logging
 import pylons
+import random
+import time
+from datetime import datetime
 
-log = logging.getLogger('fts3rest')
+# Separate logger, so the requests can be sent somewhere else from the ini file
+request_log = logging.getLogger('fts3rest.requests')
+
+
+class _LoggedResponse(object):
+    """
+    Wraps a streamed response, so the request is logged when the server closes it
+    """
+
+    def __init__(self, app_iter, log_request):
+        self.app_iter = app_iter
+        self.log_request = log_request
+
+    def __iter__(self):
+        return iter(self.app_iter)
+
+    def close(self):
+        try:
+            if hasattr(self.app_iter, 'close'):
+                self.app_iter.close()
+        finally:
+            self.log_request()
 
 
 class RequestLogger(object):
     """
     This middleware wraps the calls and caught error messages, and send
-    them to the logger
+    them to the logger.
+    The entries are written as text, or as one JSON object per request. For failed requests,
+    the body is logged at debug level, for a fraction of them, and truncated.
     """
 
     def __init__(self, wrap_app, config):
         self.app = wrap_app
+        self.json_format = config.get('fts3.RequestLogFormat', 'text').lower() == 'json'
+        self.body_max_size = int(config.get('fts3.LogBodyMaxSize', 4096))
+        self.body_sample_rate = float(config.get('fts3.LogBodySampleRate', 1.0))
 
     def __call__(self, environ, start_response):
-        self._status_msg = None
+        start = time.time()
+        status_msg = []
         def override_start_response(status, headers, exc_info=None):
-            self._status_msg = status
+            status_msg[:] = [status]
             return start_response(status, headers, exc_info)
 
         response = self.app(environ, override_start_response)
-        if hasattr(pylons.response, 'detail'):
-            self._log_request(environ, self._status_msg, pylons.response.detail)
-        else:
-            self._log_request(environ, self._status_msg)
-        return response
+        # pylons.response and pylons.request are not available anymore once the body is being sent
+        detail = pylons.response.detail if hasattr(pylons.response, 'detail') else None
+        details = None
+        if not status_msg or self._status_code(status_msg[0]) >= 400:
+            details = self._request_details()
 
-    def _log_request(self, environ, status, message = None):
-        url = environ.get('PATH_INFO')
-        query = environ.get('QUERY_STRING', None)
-        if query:
-            url += '?' + query
-        method = environ.get('REQUEST_METHOD')
+        def log_request():
+            status = status_msg[0] if status_msg else None
+            self._log_request(environ, status, start, detail, details)
+
+        if isinstance(response, (list, tuple)):
+            log_request()
+            return response
+        # Streamed, so the status and the statistics are only complete once sent
+        return _LoggedResponse(response, log_request)
+
+    @staticmethod
+    def _status_code(status):
+        try:
+            return int(status.split()[0])
+        except:
+            return 0
+
+    @staticmethod
+    def _remote_addr(environ):
         if environ.get('HTTP_X_FORWARDED_FOR', None):
-            remote_addr = environ['HTTP_X_FORWARDED_FOR']
+            return environ['HTTP_X_FORWARDED_FOR']
         elif environ.get('REMOTE_ADDR', None):
-            remote_addr = environ['REMOTE_ADDR']
-        else:
-            remote_addr = '?'
+            return environ['REMOTE_ADDR']
+        return '?'
 
-        entry = "[From %s] [%s] \"%s %s\"" % (remote_addr, status, method, url)
+    def _text_entry(self, environ, status, url, message):
+        entry = "[From %s] [%s] \"%s %s\"" % (self._remote_addr(environ), status, environ.get('REQUEST_METHOD'), url)
         if message:
             entry += ' ' + message
-        try:
-            code = int(status.split()[0])
-        except:
-            code = 0
+        # Set if the instrumentation is enabled
+        if 'fts3.RequestStats' in environ:
+            entry += ' ' + environ['fts3.RequestStats'].summary()
+        return entry
+
+    def _json_entry(self, environ, code, url, start, message):
+        entry = dict(
+            time=datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+            remote_addr=self._remote_addr(environ),
+            method=environ.get('REQUEST_METHOD'),
+            url=url,
+            status=code,
+            duration=round(time.time() - start, 6)
+        )
+        credentials = environ.get('fts3.User.Credentials', None)
+        if credentials is not None:
+            entry['user_dn'] = credentials.user_dn
+        if message:
+            entry['message'] = message
+        stats = environ.get('fts3.RequestStats', None)
+        if stats is not None:
+            entry['queries'] = stats.queries
+            entry['db_time'] = round(stats.db_time, 6)
+            entry['rows'] = stats.rows
+            entry['serialization_time'] = round(stats.serialization_time, 6)
+            if stats.response_bytes is not None:
+                entry['response_bytes'] = stats.response_bytes
+        return json.dumps(entry)
+
+    def _log_request(self, environ, status, start, message=None, details=None):
+        url = environ.get('PATH_INFO')
+        query = environ.get('QUERY_STRING', None)
+        if query:
+            url += '?' + query
+        code = self._status_code(status)
+
+        if self.json_format:
+            entry = self._json_entry(environ, code, url, start, message)
+        else:
+            entry = self._text_entry(environ, status, url, message)
 
         if code >= 500:
-            log.error(entry)
-            self._log_request_details()
+            request_log.error(entry)
+            self._log_request_details(details)
         elif code >= 400:
-            log.info(entry)
-            self._log_request_details()
+            request_log.info(entry)
+            self._log_request_details(details)
         else:
-            log.info(entry)
+            request_log.info(entry)
 
-    def _log_request_details(self):
+    def _request_details(self):
+        """
+        Params, content type and body of the request, taken while pylons.request is still registered.
+        None if they are not going to be logged
+        """
+        if not request_log.isEnabledFor(logging.DEBUG):
+            return None
+        if self.body_sample_rate < 1 and random.random() >= self.body_sample_rate:
+            return None
         try:
-            log.debug('Request params: ' + str(pylons.request.params))
-            log.debug('Request content type: ' + pylons.request.content_type)
-            log.debug('Request body: ')
-            for line in pylons.request.body.split('\n'):
-                log.debug(line)
+            return dict(
+                params=str(pylons.request.params),
+                content_type=pylons.request.content_type,
+                body=pylons.request.body
+            )
         except AttributeError:
             # Sometimes the body is a set, so ignore the failure coming from Pylons
-            pass
+            return None
         except TypeError:
             # Sometimes there is no request registered (?), so let it go
-            pass
+            return None
+
+    def _log_request_details(self, details):
+        if details is None:
+            return
+        request_log.debug('Request params: ' + details['params'])
+        request_log.debug('Request content type: ' + details['content_type'])
+        body = details['body']
+        if len(body) > self.body_max_size:
+            request_log.debug('Request body (%d bytes, truncated): %s' % (len(body), body[:self.body_max_size]))
+        else:
+            request_log.debug('Request body: %s' % body)
@@ -26,11 +26,15 @@ class TimeoutHandler(object):
     def __init__(self, wrap_app, config):
         self.app = wrap_app
         self.config = config
+        self.pool_monitor = getattr(config['pylons.app_globals'], 'pool_monitor', None)
 
     def __call__(self, environ, start_response):
         try:
             return self.app(environ, start_response)
         except TimeoutError:
+            # Waiting for a connection from the pool
+            if self.pool_monitor:
+                self.pool_monitor.checkout_timeout()
             if asbool(self.config.get('debug')):
                 raise
             else:
@@ -17,8 +17,10 @@ import pylons
 
 from datetime import datetime, timedelta
 from fts3rest.lib.base import Session
+from fts3rest.lib.config_cache import detached
 from fts3rest.lib.middleware.fts3auth.constants import VALID_OPERATIONS
 from fts3rest.lib.oauth2lib.provider import AuthorizationProvider, ResourceProvider, ResourceAuthorization
+from fts3rest.lib.token_cache import CachedToken, token_cache
 from fts3.model.credentials import CredentialCache
 from fts3.model.oauth2 import OAuth2Application, OAuth2Code, OAuth2Token
 
@@ -128,6 +130,7 @@ class FTS3OAuth2AuthorizationProvider(AuthorizationProvider):
         )
         Session.merge(token)
         Session.commit()
+        token_cache.invalidate(client_id, data['dlg_id'])
 
     def discard_authorization_code(self, client_id, code):
         auth_code = Session.query(OAuth2Code).get(code)
@@ -140,6 +143,7 @@ class FTS3OAuth2AuthorizationProvider(AuthorizationProvider):
         if token is not None:
             Session.delete(token)
             Session.commit()
+            token_cache.invalidate(client_id, token.dlg_id)
 
 
 class FTS3ResourceAuthorization(ResourceAuthorization):
@@ -166,21 +170,44 @@ class FTS3OAuth2ResourceProvider(ResourceProvider):
     def validate_access_token(self, access_token, authorization):
         authorization.is_valid = False
 
-        token = Session.query(OAuth2Token).filter(OAuth2Token.access_token == access_token).first()
-        if not token:
-            return
+        token = token_cache.get(access_token)
+        if token is None:
+            generation = token_cache.get_generation()
+            token = self._load_token(access_token)
+            if not token:
+                return
+            if token.credentials and token.expires > datetime.utcnow():
+                token_cache.put(access_token, token, generation)
 
         authorization.is_oauth = True
         authorization.client_id = token.client_id
         authorization.expires_in = token.expires - datetime.utcnow()
-        authorization.token = token.access_token
+        authorization.token = access_token
         authorization.dlg_id = token.dlg_id
         authorization.scope = token.scope
         if authorization.expires_in > timedelta(seconds=0):
-            authorization.credentials = self._get_credentials(token.dlg_id)
+            authorization.credentials = token.credentials
             if authorization.credentials:
                 authorization.is_valid=True
 
+    def _load_token(self, access_token):
+        """
+        Get the token and its credentials from the database, detached so they can be cached
+        """
+        token = Session.query(OAuth2Token).filter(OAuth2Token.access_token == access_token).first()
+        if not token:
+            return None
+        credentials = self._get_credentials(token.dlg_id)
+        if credentials:
+            detached(Session, [credentials])
+        return CachedToken(
+            client_id=token.client_id,
+            scope=token.scope,
+            dlg_id=token.dlg_id,
+            credentials=credentials,
+            expires=token.expires
+        )
+
     def _get_credentials(self, dlg_id):
         """
         Get the user credentials bound to the authorization token
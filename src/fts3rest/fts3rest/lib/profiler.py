@@ -0,0 +1,254 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Profiling of a live process.
+
+StackSampler takes, at regular intervals, the stacks of all the other threads of the process,
+so the overhead is limited to the sampling thread, and nothing needs to be restarted.
+RequestProfiler runs a single request under cProfile, when asked to by the server itself.
+"""
+
+import cProfile
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from StringIO import StringIO
+
+from fts3rest.lib.middleware.instrumentation import with_written
+
+log = logging.getLogger(__name__)
+
+PROFILE_NAME_REGEX = re.compile('^[0-9a-f\-]+\.prof$')
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class SampleResult(object):
+    """
+    Stacks sampled, and how many times each one was seen
+    """
+
+    def __init__(self, stacks, samples, duration):
+        self.stacks = stacks
+        self.samples = samples
+        self.duration = duration
+
+    def collapsed(self):
+        """
+        One line per stack, with the frames separated by ';' followed by the count.
+        This is the input format of flamegraph.pl
+        """
+        lines = []
+        for stack, count in sorted(self.stacks.iteritems(), key=lambda s: s[1], reverse=True):
+            lines.append('%s %d' % (stack, count))
+        return '\n'.join(lines) + '\n'
+
+    def top(self, limit=50):
+        """
+        Functions where the threads were seen the most, as the function running (self)
+        or anywhere in the stack (cumulative)
+        """
+        self_count = dict()
+        cumulative_count = dict()
+        for stack, count in self.stacks.iteritems():
+            frames = stack.split(';')
+            self_count[frames[-1]] = self_count.get(frames[-1], 0) + count
+            for frame in set(frames):
+                cumulative_count[frame] = cumulative_count.get(frame, 0) + count
+
+        total = float(sum(self.stacks.itervalues())) or 1
+        lines = [
+            '%d samples in %.2f seconds' % (self.samples, self.duration),
+            '',
+            '%8s %7s %8s %7s  %s' % ('self', '%', 'cumul', '%', 'function')
+        ]
+        top_frames = sorted(cumulative_count.iteritems(), key=lambda f: (self_count.get(f[0], 0), f[1]), reverse=True)
+        for frame, cumulative in top_frames[:limit]:
+            own = self_count.get(frame, 0)
+            lines.append('%8d %6.2f%% %8d %6.2f%%  %s' % (
+                own, own * 100 / total, cumulative, cumulative * 100 / total, frame
+            ))
+        return '\n'.join(lines) + '\n'
+
+
+class StackSampler(object):
+    """
+    Statistical profiler. Only one sampling can run at a time per process.
+    """
+
+    lock = threading.Lock()
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return '%s:%s:%d' % (os.path.basename(code.co_filename), code.co_name, code.co_firstlineno)
+
+    def sample(self, duration):
+        """
+        Sample the stacks of the other threads during duration seconds
+
+        Returns:
+            A SampleResult
+        Raises:
+            ProfilerBusy if there is already a sampling running
+        """
+        if not StackSampler.lock.acquire(False):
+            raise ProfilerBusy('There is already a profiling session running')
+        try:
+            me = threading.current_thread().ident
+            stacks = dict()
+            samples = 0
+            start = time.time()
+            deadline = start + duration
+            while time.time() < deadline:
+                for thread_id, frame in sys._current_frames().iteritems():
+                    if thread_id == me:
+                        continue
+                    frames = []
+                    while frame is not None:
+                        frames.append(self._frame_name(frame))
+                        frame = frame.f_back
+                    stack = ';'.join(reversed(frames))
+                    stacks[stack] = stacks.get(stack, 0) + 1
+                samples += 1
+                time.sleep(self.interval)
+            return SampleResult(stacks, samples, time.time() - start)
+        finally:
+            StackSampler.lock.release()
+
+
+def profile_directory(config):
+    """
+    Where the per request profiles are dumped
+    """
+    if 'fts3.ProfileDirectory' in config:
+        return config['fts3.ProfileDirectory']
+    return os.path.join(config['cache_dir'], 'profiles')
+
+
+def prune_profiles(directory, max_count, max_age):
+    """
+    Remove the profiles older than max_age seconds, and the oldest ones beyond max_count.
+    A limit of 0 disables it.
+
+    Returns:
+        The number of profiles removed
+    """
+    profiles = []
+    for name in os.listdir(directory):
+        if not PROFILE_NAME_REGEX.match(name):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            profiles.append((os.path.getmtime(path), path))
+        except OSError:
+            # Removed meanwhile by another process
+            pass
+    profiles.sort(reverse=True)
+
+    expired = []
+    if max_count:
+        expired.extend(profiles[max_count:])
+        profiles = profiles[:max_count]
+    if max_age:
+        oldest = time.time() - max_age
+        expired.extend(filter(lambda p: p[0] < oldest, profiles))
+
+    removed = 0
+    for mtime, path in expired:
+        try:
+            os.unlink(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def format_profile(path, sort='cumulative', limit=100):
+    """
+    Load a profile dumped by RequestProfiler, and return it as text
+    """
+    output = StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+class RequestProfiler(object):
+    """
+    Runs under cProfile the requests carrying the header X-FTS3-Profile, if they come from
+    the server itself (root). The profile is dumped into the profile directory, and its name
+    sent back in the X-FTS3-Profile response header.
+    Only the newest max_count profiles, not older than max_age seconds, are kept.
+    Must run after the authentication middleware.
+    """
+
+    def __init__(self, wrap_app, config):
+        self.app = wrap_app
+        self.directory = profile_directory(config)
+        self.max_count = int(config.get('fts3.ProfileMaxCount', 100))
+        self.max_age = int(config.get('fts3.ProfileMaxAge', 7 * 24 * 3600))
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+    def __call__(self, environ, start_response):
+        if 'HTTP_X_FTS3_PROFILE' not in environ:
+            return self.app(environ, start_response)
+        credentials = environ.get('fts3.User.Credentials', None)
+        if credentials is None or not credentials.is_root:
+            log.warning("Ignoring profiling request from a non root user")
+            return self.app(environ, start_response)
+
+        response_status = []
+        response_headers = []
+        body = []
+        written = []
+
+        def capture_start_response(status, headers, exc_info=None):
+            response_status[:] = [status, exc_info]
+            response_headers[:] = headers
+            return written.append
+
+        def profiled():
+            # Streamed responses are consumed here, so the serialization is profiled too
+            app_iter = with_written(written, self.app(environ, capture_start_response))
+            try:
+                body.extend(app_iter)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+
+        profile = cProfile.Profile()
+        profile.runcall(profiled)
+
+        name = '%s.prof' % uuid.uuid4()
+        profile.dump_stats(os.path.join(self.directory, name))
+        prune_profiles(self.directory, self.max_count, self.max_age)
+        log.info("Profile of %s %s dumped into %s" % (environ.get('REQUEST_METHOD'), environ.get('PATH_INFO'), name))
+
+        response_headers.append(('X-FTS3-Profile', name))
+        start_response(response_status[0], response_headers, response_status[1])
+        return body
@@ -0,0 +1,168 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Per process store of the files holding the delegated proxies
+
+gfal2 and voms-proxy-init need the proxy in a file. Rather than writing one for every request,
+the files are kept, preferably in memory (tmpfs), and shared by the requests using the same proxy.
+A new version of a delegated proxy supersedes the previous file, which is removed once it is not used
+anymore. Files are overwritten before being removed, so the private keys do not linger.
+"""
+
+import atexit
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DIRECTORY = '/dev/shm'
+
+
+class StoredProxy(object):
+    """
+    A proxy file in the store. name is the path of the file
+    """
+
+    def __init__(self, key, name, termination_time):
+        self.key = key
+        self.name = name
+        self.termination_time = termination_time
+        self.refcount = 0
+        self.last_used = time.time()
+        self.superseded = False
+
+
+def _default_directory():
+    if os.path.isdir(DEFAULT_DIRECTORY) and os.access(DEFAULT_DIRECTORY, os.W_OK | os.X_OK):
+        return DEFAULT_DIRECTORY
+    return tempfile.gettempdir()
+
+
+class ProxyStore(object):
+    """
+    Reference counted proxy files, indexed by delegation id and proxy hash.
+    Up to max_idle files not in use are kept for idle_timeout seconds, unless they expire or are superseded.
+    If max_idle is 0, the files are removed as soon as they are released.
+    """
+
+    def __init__(self, directory=None, max_idle=100, idle_timeout=300):
+        self.directory = directory
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.entries = dict()
+        self.latest = dict()
+
+    def _write(self, proxy_pem):
+        fd, name = tempfile.mkstemp(suffix='.pem', prefix='rest-proxy-', dir=self.directory or _default_directory())
+        try:
+            written = 0
+            while written < len(proxy_pem):
+                written += os.write(fd, proxy_pem[written:])
+        except:
+            os.close(fd)
+            os.unlink(name)
+            raise
+        os.close(fd)
+        return name
+
+    def _wipe(self, entry):
+        del self.entries[entry.key]
+        if self.latest.get(entry.key[0], None) == entry.key:
+            del self.latest[entry.key[0]]
+        try:
+            fd = os.open(entry.name, os.O_WRONLY)
+            try:
+                os.write(fd, '\0' * os.fstat(fd).st_size)
+            finally:
+                os.close(fd)
+            os.unlink(entry.name)
+        except OSError, e:
+            log.warning("Failed to remove the proxy file %s: %s" % (entry.name, str(e)))
+
+    def _sweep(self):
+        now = time.time()
+        utcnow = datetime.utcnow()
+        idle = []
+        for entry in self.entries.values():
+            if entry.refcount > 0:
+                continue
+            if entry.superseded or now - entry.last_used > self.idle_timeout or \
+                    (entry.termination_time is not None and entry.termination_time <= utcnow):
+                self._wipe(entry)
+            else:
+                idle.append(entry)
+        if len(idle) > self.max_idle:
+            idle.sort(key=lambda e: e.last_used)
+            for entry in idle[:len(idle) - self.max_idle]:
+                self._wipe(entry)
+
+    def acquire(self, dlg_id, proxy_pem, termination_time=None):
+        """
+        Get the file holding proxy_pem, writing it if needed.
+        Must be given back with release once done.
+        """
+        if isinstance(proxy_pem, unicode):
+            proxy_pem = proxy_pem.encode('ascii')
+        key = (dlg_id, hashlib.sha256(proxy_pem).hexdigest())
+        with self.lock:
+            entry = self.entries.get(key, None)
+            if entry is None:
+                entry = StoredProxy(key, self._write(proxy_pem), termination_time)
+                self.entries[key] = entry
+            previous = self.latest.get(dlg_id, None)
+            if dlg_id is not None and previous is not None and previous != key:
+                self.entries[previous].superseded = True
+            if dlg_id is not None:
+                self.latest[dlg_id] = key
+            if termination_time is not None:
+                entry.termination_time = termination_time
+            entry.refcount += 1
+            entry.last_used = time.time()
+            self._sweep()
+            return entry
+
+    def release(self, entry):
+        """
+        The caller does not need the file anymore
+        """
+        with self.lock:
+            entry.refcount -= 1
+            entry.last_used = time.time()
+            if entry.refcount <= 0 and entry.key in self.entries:
+                if entry.superseded or not self.max_idle or entry.key[0] is None:
+                    self._wipe(entry)
+                else:
+                    self._sweep()
+
+    def clear(self):
+        """
+        Remove all the files not in use
+        """
+        with self.lock:
+            for entry in self.entries.values():
+                if entry.refcount <= 0:
+                    self._wipe(entry)
+
+
+# Shared by the data management controller and the VOMS client
+proxy_store = ProxyStore()
+atexit.register(proxy_store.clear)
@@ -0,0 +1,163 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import logging
+import threading
+import time
+import types
+from decorator import decorator
+from pylons import app_globals, config
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+
+from fts3.model import Host
+from fts3rest.lib.base import Session
+
+log = logging.getLogger(__name__)
+
+
+class ReplicaRouter(object):
+    """
+    Decides if the read replica can be used, depending on how far behind the primary it is.
+    The lag is estimated comparing the most recent heartbeat in t_hosts on both databases,
+    so its resolution depends on how often the hosts beat.
+    """
+
+    def __init__(self, primary, replica, check_interval=10):
+        self.primary = primary
+        self.replica = replica
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.lag = None
+        self.checked = 0
+
+    @staticmethod
+    def _latest_beat(engine):
+        return engine.execute(select([func.max(Host.beat)])).scalar()
+
+    def _measure_lag(self):
+        """
+        Returns the lag in seconds, or None if it can not be measured
+        """
+        try:
+            primary_beat = self._latest_beat(self.primary)
+            replica_beat = self._latest_beat(self.replica)
+        except DBAPIError, e:
+            log.warning("Could not check the lag of the read replica: %s" % str(e))
+            return None
+        if primary_beat is None:
+            return 0
+        if replica_beat is None:
+            return None
+        delta = primary_beat - replica_beat
+        return max(0, delta.days * 86400 + delta.seconds)
+
+    def get_lag(self):
+        """
+        Lag of the replica, checked at most once every check_interval seconds
+        """
+        with self.lock:
+            if time.time() - self.checked > self.check_interval:
+                self.lag = self._measure_lag()
+                self.checked = time.time()
+            return self.lag
+
+    def mark_failed(self):
+        """
+        Do not use the replica until the next check
+        """
+        with self.lock:
+            self.lag = None
+            self.checked = time.time()
+
+    def engine_for(self, max_staleness):
+        """
+        Returns the replica engine if its lag is within max_staleness seconds, None otherwise
+        """
+        lag = self.get_lag()
+        if lag is None or lag > max_staleness:
+            return None
+        return self.replica
+
+
+def _stream_from_replica(router, session, body):
+    """
+    Generator bodies are read while they are sent, after the action has returned.
+    By then, part of the response may be already sent, so a failure of the replica can not fall
+    back to the primary, and the response is truncated. At least, the replica is not used again
+    until the next check
+    """
+    try:
+        for chunk in body:
+            yield chunk
+    except DBAPIError, e:
+        log.warning("Read replica failed while streaming the response: %s" % str(e))
+        router.mark_failed()
+        raise
+    finally:
+        session.replica_bind = None
+
+
+def read_replica(max_staleness=None):
+    """
+    Decorator to run a read only action against the read replica, if there is one
+    configured and it is not more than max_staleness seconds behind the primary.
+    Otherwise, or if the replica fails, the action runs against the primary.
+    Streamed responses keep reading from the replica until they are sent,
+    and they are not retried against the primary if the replica fails meanwhile.
+
+    Args:
+        max_staleness: How many seconds behind the primary the action can tolerate.
+                       Defaults to fts3.DbReplicaMaxStaleness
+
+    Returns:
+        A method that can be used to decorate the resource/method
+    """
+
+    @decorator
+    def read_replica_inner(f, *args, **kwargs):
+        router = getattr(app_globals, 'replica_router', None)
+        if router is None:
+            return f(*args, **kwargs)
+
+        if max_staleness is None:
+            staleness = int(config.get('fts3.DbReplicaMaxStaleness', 60))
+        else:
+            staleness = max_staleness
+        engine = router.engine_for(staleness)
+        if engine is None:
+            return f(*args, **kwargs)
+
+        session = Session()
+        session.replica_bind = engine
+        streamed = False
+        try:
+            result = f(*args, **kwargs)
+            if isinstance(result, types.GeneratorType):
+                streamed = True
+                return _stream_from_replica(router, session, result)
+            return result
+        except DBAPIError, e:
+            log.warning("Read replica failed, falling back to the primary: %s" % str(e))
+            router.mark_failed()
+            Session.rollback()
+            session.replica_bind = None
+            return f(*args, **kwargs)
+        finally:
+            # Never leave the bind behind, the session may outlive the request
+            if not streamed:
+                session.replica_bind = None
+
+    return read_replica_inner
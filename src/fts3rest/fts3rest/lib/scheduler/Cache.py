@@ -12,6 +12,11 @@ class ThreadLocalCache:
     ThreadLocalCache class provides an in memory cache for each thread
     """
     initialized = False
+
+    # Hits and misses per cache, shared by all threads
+    stats_lock = threading.Lock()
+    hits = {}
+    misses = {}
  
     # Run cache clean_cleanup after every 5 mins (1800 secs)
     cache_refresh_time = 1800
@@ -72,6 +77,20 @@ class ThreadLocalCache:
                                            ThreadLocalCache.cache_entry_life):
                     del _dict[key]
                  
+    @staticmethod
+    def _account(dict_name, hit):
+        with ThreadLocalCache.stats_lock:
+            counter = ThreadLocalCache.hits if hit else ThreadLocalCache.misses
+            counter[dict_name] = counter.get(dict_name, 0) + 1
+
+    @staticmethod
+    def get_stats():
+        """
+        Returns a dictionary with the hits and misses of each cache
+        """
+        with ThreadLocalCache.stats_lock:
+            return dict(hits=dict(ThreadLocalCache.hits), misses=dict(ThreadLocalCache.misses))
+
     @staticmethod
     def cache_wrapper(dict_name, func, *args):
         """
@@ -89,6 +108,7 @@ class ThreadLocalCache:
             ThreadLocalCache.cache_cleanup()
 
         if key not in thread_dict:
+            ThreadLocalCache._account(dict_name, False)
             val.append(func(*args))
             val.append(datetime.utcnow())
             thread_dict[key] = val
@@ -96,10 +116,13 @@ class ThreadLocalCache:
             val = thread_dict[key]
             if ThreadLocalCache.check_expiry(val[1],
                                              ThreadLocalCache.cache_entry_life):
+                ThreadLocalCache._account(dict_name, False)
                 val = []
                 val.append(func(*args))
                 val.append(datetime.utcnow())
                 thread_dict[key] = val
+            else:
+                ThreadLocalCache._account(dict_name, True)
         return val[0]
 
 
@@ -6,6 +6,7 @@ import logging
 from fts3.model import File
 from fts3.model import OptimizerEvolution
 from fts3.model import ActivityShare
+from fts3rest.lib.config_cache import config_cache
 
 from sqlalchemy import func
 
@@ -15,6 +16,16 @@ from datetime import timedelta
 log = logging.getLogger(__name__)
 
 
+def _load_activity_shares(session):
+    """
+    Raw activity shares, per VO
+    """
+    shares = dict()
+    for share in session.query(ActivityShare):
+        shares[share.vo] = share.activity_share
+    return shares
+
+
 class Database:
     """
     Database class queries information from FTS3 DB using sqlalchemy 
@@ -100,7 +111,7 @@ class Database:
         Pending data is aggregated from all activities with priorities >=
         to the user_activity's priority. Only Atlas mentions the ActivityShare.
         """
-        share = self.session.query(ActivityShare).get(vo)
+        share = config_cache.get(self.session, 'scheduler_activity_shares', _load_activity_shares).get(vo)
         total_pending_data = 0
         if share is None:
             for data in self.session.query(File.user_filesize)\
@@ -110,7 +121,7 @@ class Database:
                                     .filter(File.file_state == 'SUBMITTED'):
                 total_pending_data += data[0]
         else:
-            activities = json.loads(share.activity_share)
+            activities = json.loads(share)
             for key in activities.keys():
                 if activities.get(key) >= activities.get(user_activity):
                     for data in self.session.query(File.user_filesize)\
@@ -0,0 +1,138 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Per process cache of the validated OAuth2 access tokens
+
+Saves looking up the token and the credentials for each request done with a bearer token.
+Only valid tokens are cached, indexed by a hash of the token, and never past their expiration.
+Tokens removed by this process are invalidated straight away, but other processes keep
+using them until the entry expires, so ttl bounds how long a revoked token may still be accepted.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+class CachedToken(object):
+    """
+    Validated token, with its credentials
+    """
+
+    def __init__(self, client_id, scope, dlg_id, credentials, expires):
+        self.client_id = client_id
+        self.scope = scope
+        self.dlg_id = dlg_id
+        self.credentials = credentials
+        self.expires = expires
+
+
+class TokenCache(object):
+    """
+    Bounded cache of validated tokens. The least recently used entry is evicted when full.
+    An entry lasts until the token expires, or ttl seconds, whatever comes first.
+    If size is 0, nothing is cached.
+    """
+
+    def __init__(self, size=1000, ttl=60):
+        self.size = size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(access_token):
+        if isinstance(access_token, unicode):
+            access_token = access_token.encode('utf-8')
+        return hashlib.sha256(access_token).hexdigest()
+
+    def get(self, access_token):
+        """
+        Return the CachedToken for access_token, or None if not cached or expired
+        """
+        if not self.size:
+            return None
+        key = self._key(access_token)
+        now = datetime.utcnow()
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None or entry[1] <= now:
+                self.misses += 1
+                return None
+            self.entries[key] = entry
+            self.hits += 1
+            return entry[0]
+
+    def get_generation(self):
+        """
+        To be called before validating a token, and passed to put
+        """
+        with self.lock:
+            return self.generation
+
+    def put(self, access_token, token, generation):
+        """
+        Cache a validated token. Ignored if there has been an invalidation since generation was
+        taken, since the token may have been removed meanwhile
+        """
+        if not self.size:
+            return
+        valid_until = min(token.expires, datetime.utcnow() + timedelta(seconds=self.ttl))
+        key = self._key(access_token)
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries.pop(key, None)
+            self.entries[key] = (token, valid_until)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, client_id, dlg_id=None):
+        """
+        Drop the tokens of the application client_id, only those of dlg_id if given
+        """
+        with self.lock:
+            self.generation += 1
+            for key, (token, valid_until) in self.entries.items():
+                if token.client_id == client_id and (dlg_id is None or token.dlg_id == dlg_id):
+                    del self.entries[key]
+                    self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+    def get_stats(self):
+        """
+        Returns a dictionary with the size and counters of the cache
+        """
+        with self.lock:
+            return dict(
+                entries=len(self.entries), capacity=self.size, ttl=self.ttl,
+                hits=self.hits, misses=self.misses, evictions=self.evictions, invalidations=self.invalidations
+            )
+
+
+# Shared by the authentication middleware and the OAuth2 controller
+token_cache = TokenCache()
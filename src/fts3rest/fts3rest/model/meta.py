@@ -18,11 +18,27 @@
 """SQLAlchemy Metadata and Session object"""
 import sqlalchemy
 from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm.session import Session as SessionBase
 
 __all__ = ['Base', 'Session']
 
+
+class RoutingSession(SessionBase):
+    """
+    If replica_bind is set, queries go there instead of the primary bind.
+    Flushes always go to the primary.
+    """
+
+    replica_bind = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replica_bind is not None and not self._flushing:
+            return self.replica_bind
+        return super(RoutingSession, self).get_bind(mapper, clause, **kwargs)
+
+
 # SQLAlchemy session manager. Updated by model.init_model()
-Session = scoped_session(sessionmaker())
+Session = scoped_session(sessionmaker(class_=RoutingSession))
 
 # Log the version
 import logging
@@ -41,6 +41,9 @@ from webtest import TestApp, TestRequest
 
 from fts3rest.lib.middleware import fts3auth
 from fts3rest.lib.base import Session
+from fts3rest.lib.config_cache import config_cache
+from fts3rest.lib.job_summary_cache import job_summary_cache
+from fts3rest.lib.token_cache import token_cache
 from fts3.model import Credential, CredentialCache, DataManagement
 from fts3.model import Job, File, FileRetryLog, ServerConfig
 
@@ -264,6 +267,9 @@ class TestController(TestCase):
         Session.query(Job).delete()
         Session.query(ServerConfig).delete()
         Session.commit()
+        config_cache.clear()
+        token_cache.clear()
+        job_summary_cache.clear()
 
         # Delete messages
         if 'fts3.MessagingDirectory' in config:
@@ -15,6 +15,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+from sqlalchemy import event
 from sqlalchemy.interfaces import ConnectionProxy
 
 
@@ -37,6 +38,29 @@ class QueryCounter(ConnectionProxy):
     def __iter__(self):
         return self.count.iteritems()
 
+    def total(self):
+        """
+        Total number of statements (and commits) counted so far
+        """
+        return sum(self.count.itervalues())
+
+    def reset(self):
+        self.count = {}
+
+    def attach(self, engine):
+        """
+        Count the queries executed by an engine that has been already created,
+        i.e. the one set up by the application itself
+        """
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'commit', self._on_commit)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self._increment(statement.split()[0].upper())
+
+    def _on_commit(self, conn):
+        self._increment("COMMIT")
+
     def execute(self, conn, execute, clauseelement, *multiparams, **params):
         action = str(clauseelement).split()[0]
         self._increment(action)
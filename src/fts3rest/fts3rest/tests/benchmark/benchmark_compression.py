@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+
+"""
+Benchmark of the compression of a large streamed response, as /jobs/<id>/files returns for a big job.
+
+For each available encoding and level, reports the size sent, the compression ratio,
+and the CPU time spent serializing and compressing, so the tradeoff can be chosen.
+"""
+
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from optparse import OptionParser
+
+from fts3rest.lib.helpers.jsonify import stream_response
+from fts3rest.lib.middleware.compression import CompressionMiddleware, ENCODERS
+from util import setup_logging
+
+
+FILE_STATES = ['SUBMITTED', 'ACTIVE', 'FINISHED', 'FAILED', 'CANCELED']
+
+
+def generate_files(count):
+    """
+    Generate count file entries, similar to those returned by /jobs/<id>/files
+    """
+    random.seed(count)
+    start = datetime(2016, 1, 1)
+    for file_id in xrange(count):
+        state = random.choice(FILE_STATES)
+        yield dict(
+            file_id=file_id,
+            job_id='a29f0b2c-4c1a-11e6-9f9f-02163e018f25',
+            file_state=state,
+            source_surl='gsiftp://source.example.com/data/run%06d/file%08d.root' % (file_id / 1000, file_id),
+            dest_surl='srm://destination.example.com/store/run%06d/file%08d.root' % (file_id / 1000, file_id),
+            source_se='gsiftp://source.example.com',
+            dest_se='srm://destination.example.com',
+            filesize=random.randint(1, 4 * 1024 ** 3),
+            throughput=random.random() * 100,
+            start_time=(start + timedelta(seconds=file_id)).strftime('%Y-%m-%dT%H:%M:%S'),
+            finish_time=(start + timedelta(seconds=file_id + 60)).strftime('%Y-%m-%dT%H:%M:%S'),
+            reason='' if state != 'FAILED' else 'TRANSFER globus_ftp_client: the server responded with an error',
+            checksum='ADLER32:%08x' % random.getrandbits(32)
+        )
+
+
+def benchmark_compression(files, encoding, level):
+    """
+    Serialize and compress the files with encoding and level, or without compression if encoding is None
+
+    Returns:
+        A dictionary with the bytes sent and the cpu time spent
+    """
+    def app(environ, start_response):
+        start_response('200 Ok', [('Content-Type', 'application/json')])
+        return stream_response(iter(files))
+
+    config = {}
+    if encoding:
+        config['fts3.CompressionEncodings'] = encoding
+        config[ENCODERS[encoding][1]] = level
+    wrapped = CompressionMiddleware(app, config)
+    environ = {'REQUEST_METHOD': 'GET', 'HTTP_ACCEPT_ENCODING': encoding or 'identity'}
+
+    sent = 0
+    start = time.clock()
+    for chunk in wrapped(environ, lambda status, headers, exc_info=None: None):
+        sent += len(chunk)
+    return dict(encoding=encoding or 'identity', level=level, bytes=sent, cpu_seconds=time.clock() - start)
+
+
+if __name__ == "__main__":
+    opt_parser = OptionParser()
+    opt_parser.add_option("-n", "--files", dest="files", type="int", default=50000,
+                          help="Number of files in the response")
+    opt_parser.add_option("-l", "--levels", dest="levels", default="1,6,9",
+                          help="Comma separated list of levels to try for each encoding")
+    opt_parser.add_option("-o", "--output", dest="output", default=None,
+                          help="Write the results as JSON into this file ('-' for stdout)")
+    (opts, args) = opt_parser.parse_args()
+
+    log = setup_logging(False)
+
+    files = list(generate_files(opts.files))
+    levels = map(int, opts.levels.split(','))
+
+    results = [benchmark_compression(files, None, None)]
+    for encoding in sorted(ENCODERS.keys()):
+        for level in levels:
+            results.append(benchmark_compression(files, encoding, level))
+
+    identity = results[0]
+    for result in results:
+        result['ratio'] = float(identity['bytes']) / result['bytes']
+        result['extra_cpu_seconds'] = result['cpu_seconds'] - identity['cpu_seconds']
+        log.info("{0:10} {1:>4} {2:12d} bytes\tratio {3:6.2f}\tcpu {4:7.3f} s (+{5:.3f} s)".format(
+            result['encoding'], result['level'] if result['level'] is not None else '-',
+            result['bytes'], result['ratio'], result['cpu_seconds'], max(0, result['extra_cpu_seconds'])
+        ))
+
+    if opts.output == '-':
+        json.dump(results, sys.stdout, indent=2)
+    elif opts.output:
+        with open(opts.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        log.info("Results written into %s" % opts.output)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+
+"""
+Benchmark of the construction of UserCredentials, as done by the authentication middleware
+for each request, from the variables set by mod_gridsite.
+
+Reports the credentials built per second, with the role permissions compiled once as the
+middleware does, and passing the configuration as a plain dictionary, which is compiled each time.
+"""
+
+import json
+import sys
+import time
+from optparse import OptionParser
+
+from fts3rest.lib.middleware.fts3auth import RolePermissions, UserCredentials
+from util import setup_logging, setup_database
+
+
+ROLES = {
+    'public': {'transfer': 'vo', 'deleg': 'all', 'datamanagement': 'all'},
+    'lcgadmin': {'transfer': 'all', 'config': 'vo'},
+    'production': {'transfer': 'all'},
+    'admin': {'*': 'all'}
+}
+
+
+def gridsite_environ(dn, fqans):
+    """
+    Environment as mod_gridsite would set it
+    """
+    env = {'GRST_CRED_AURI_0': 'dn:' + dn}
+    for index, fqan in enumerate(fqans, 1):
+        env['GRST_CRED_AURI_%d' % index] = 'fqan:' + fqan
+    return env
+
+
+def benchmark_credentials(env, role_permissions, iterations):
+    """
+    Build iterations credentials out of env
+
+    Returns:
+        Credentials per second
+    """
+    start = time.time()
+    for i in xrange(iterations):
+        UserCredentials(env, role_permissions)
+    return iterations / (time.time() - start)
+
+
+if __name__ == "__main__":
+    opt_parser = OptionParser()
+    opt_parser.add_option("-n", "--iterations", dest="iterations", type="int", default=10000,
+                          help="Number of credentials to build")
+    opt_parser.add_option("-d", "--db", dest="db_connect", default="sqlite:///:memory:",
+                          help="Database to use for the grants by DN")
+    opt_parser.add_option("-o", "--output", dest="output", default=None,
+                          help="Write the results as JSON into this file ('-' for stdout)")
+    (opts, args) = opt_parser.parse_args()
+
+    log = setup_logging(False)
+    setup_database(opts.db_connect)
+
+    env = gridsite_environ(
+        '/DC=ch/DC=cern/OU=Organic Units/OU=Users/CN=benchmark/CN=123456/CN=Benchmark User',
+        ['/dteam/Role=NULL/Capability=NULL', '/dteam/cern/Role=NULL/Capability=NULL',
+         '/dteam/Role=lcgadmin/Capability=NULL', '/dteam/Role=production/Capability=NULL']
+    )
+
+    result = dict(iterations=opts.iterations)
+    # First pass warms up the parsing caches and the database connection
+    benchmark_credentials(env, RolePermissions(ROLES), 100)
+    result['compiled_per_second'] = benchmark_credentials(env, RolePermissions(ROLES), opts.iterations)
+    result['uncompiled_per_second'] = benchmark_credentials(env, ROLES, opts.iterations)
+
+    log.info("{0:10.1f} credentials/second with compiled role permissions".format(result['compiled_per_second']))
+    log.info("{0:10.1f} credentials/second with the raw configuration".format(result['uncompiled_per_second']))
+
+    if opts.output == '-':
+        json.dump(result, sys.stdout, indent=2)
+    elif opts.output:
+        with open(opts.output, 'w') as output:
+            json.dump(result, output, indent=2)
+        log.info("Results written into %s" % opts.output)
@@ -0,0 +1,362 @@
+#!/usr/bin/env python
+
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Benchmark of the most used REST endpoints, going through the whole WSGI stack
+(authentication, error and request logging middlewares included), against a database
+seeded with a configurable number of jobs and files.
+
+Reports, per endpoint, the p50 and p99 latencies and the number of queries per request,
+plus the peak RSS of the process. The results can be written as JSON, so runs can be compared.
+"""
+
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from optparse import OptionParser
+from sqlalchemy.exc import SQLAlchemyError
+from webtest import TestApp
+
+from fts3.model import Base, Credential, File, Job, OptimizerEvolution
+from fts3rest.config.middleware import make_app
+from fts3rest.lib.base import Session
+from fts3rest.lib.middleware import fts3auth
+from QueryCounter import QueryCounter
+from util import setup_logging
+
+
+USER_DN = '/DC=ch/DC=cern/CN=Benchmark User'
+VO_NAME = 'testvo'
+STORAGES = ['gsiftp://se%02d.benchmark.net' % i for i in range(10)]
+BANNED_STORAGE = 'gsiftp://banned.benchmark.net'
+
+JOB_STATES = ['SUBMITTED', 'ACTIVE', 'READY', 'FINISHED', 'FAILED', 'FINISHEDDIRTY', 'CANCELED']
+FILE_STATE_FOR_JOB = {
+    'SUBMITTED': 'SUBMITTED', 'ACTIVE': 'ACTIVE', 'READY': 'READY', 'FINISHED': 'FINISHED',
+    'FAILED': 'FAILED', 'FINISHEDDIRTY': 'FINISHED', 'CANCELED': 'CANCELED'
+}
+
+DEFAULT_CONFIG = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../fts3config.test'))
+
+
+def _gridsite_environ():
+    """
+    Mock values of the variables set by mod_gridsite
+    """
+    return {
+        'GRST_CRED_AURI_0': 'dn:' + USER_DN,
+        'GRST_CRED_AURI_1': 'fqan:/%s/Role=NULL/Capability=NULL' % VO_NAME,
+        'GRST_CRED_AURI_2': 'fqan:/%s/Role=lcgadmin/Capability=NULL' % VO_NAME,
+    }
+
+
+def setup_app(database, fts3config, cache_dir):
+    """
+    Build the full application, with all its middlewares, as it would be deployed
+
+    Returns:
+        A TestApp wrapping the application, with the mocked user credentials
+    """
+    app_conf = {
+        'sqlalchemy.url': database,
+        'fts3.config': fts3config,
+        'cache_dir': cache_dir,
+        'beaker.session.key': 'fts3rest',
+        'beaker.session.secret': 'benchmark',
+    }
+    wsgiapp = make_app({'debug': 'false'}, full_stack=True, static_files=False, **app_conf)
+
+    Base.metadata.create_all(bind=Session.get_bind(), checkfirst=True)
+
+    return TestApp(wsgiapp, extra_environ=_gridsite_environ())
+
+
+def push_delegation(credentials):
+    """
+    Push into the database a mock delegated credential, so submissions are accepted
+    """
+    delegated = Credential()
+    delegated.dlg_id = credentials.delegation_id
+    delegated.dn = credentials.user_dn
+    delegated.proxy = '-NOT USED-'
+    delegated.voms_attrs = None
+    delegated.termination_time = datetime.utcnow() + timedelta(hours=7)
+    Session.merge(delegated)
+    Session.commit()
+
+
+def seed_database(n_jobs, files_per_job, batch_size=500):
+    """
+    Insert n_jobs jobs, each one with files_per_job files, spread between a set
+    of storages and with a mix of states
+
+    Returns:
+        The list of job ids
+    """
+    log.info("Seeding %d jobs with %d files each" % (n_jobs, files_per_job))
+    job_ids = []
+    jobs = []
+    files = []
+    now = datetime.utcnow()
+
+    def flush():
+        if jobs:
+            Session.execute(Job.__table__.insert(), jobs)
+        if files:
+            Session.execute(File.__table__.insert(), files)
+        Session.commit()
+        del jobs[:]
+        del files[:]
+
+    for i in xrange(n_jobs):
+        job_id = str(uuid.uuid1())
+        job_state = JOB_STATES[i % len(JOB_STATES)]
+        source_se = STORAGES[i % len(STORAGES)]
+        dest_se = STORAGES[(i + 1) % len(STORAGES)]
+        submit_time = now - timedelta(minutes=i % 600)
+        job_finished = None
+        if job_state not in ('SUBMITTED', 'ACTIVE', 'READY'):
+            job_finished = submit_time + timedelta(minutes=5)
+        jobs.append(dict(
+            job_id=job_id, job_state=job_state, job_type='N', user_dn=USER_DN, vo_name=VO_NAME,
+            cred_id='', source_se=source_se, dest_se=dest_se, submit_time=submit_time,
+            job_finished=job_finished, priority=3, overwrite_flag=False, verify_checksum='n',
+            retry=0, retry_delay=0, submit_host='benchmark'
+        ))
+        for f in xrange(files_per_job):
+            files.append(dict(
+                job_id=job_id, file_index=f, hashed_id=random.randint(0, 2 ** 16 - 1),
+                file_state=FILE_STATE_FOR_JOB[job_state], vo_name=VO_NAME,
+                source_se=source_se, dest_se=dest_se,
+                source_surl='%s/path/%s/file.%d' % (source_se, job_id, f),
+                dest_surl='%s/path/%s/file.%d' % (dest_se, job_id, f),
+                user_filesize=1024, filesize=1024, priority=3, activity='default',
+                finish_time=job_finished
+            ))
+        job_ids.append(job_id)
+        if len(files) >= batch_size or len(jobs) >= batch_size:
+            flush()
+    flush()
+
+    evolution = []
+    for i in xrange(200):
+        evolution.append(dict(
+            datetime=now - timedelta(minutes=i), source_se=STORAGES[i % len(STORAGES)],
+            dest_se=STORAGES[(i + 1) % len(STORAGES)], active=i % 50, throughput=10.0,
+            success=100.0, rationale='Benchmark', diff=1
+        ))
+    Session.execute(OptimizerEvolution.__table__.insert(), evolution)
+    Session.commit()
+
+    return job_ids
+
+
+def load_job_ids(limit):
+    """
+    Get the ids of the jobs already in the database, when the seeding is skipped
+    """
+    return [row[0] for row in Session.query(Job.job_id).filter(Job.user_dn == USER_DN).limit(limit)]
+
+
+def _submission_body():
+    return {
+        'files': [{
+            'sources': ['%s/path/bench.%s' % (STORAGES[0], uuid.uuid4())],
+            'destinations': ['%s/path/bench.%s' % (STORAGES[1], uuid.uuid4())],
+        }],
+        'params': {'overwrite': True}
+    }
+
+
+def build_cases(app, job_ids, dlg_id):
+    """
+    Each case is a tuple (name, callable). The callable issues one request.
+    """
+    active_job_ids = []
+
+    def submit():
+        body = json.dumps(_submission_body())
+        job_id = app.put('/jobs', params=body, content_type='application/json', status=200).json['job_id']
+        active_job_ids.append(job_id)
+
+    def cancel():
+        if not active_job_ids:
+            submit()
+        app.delete('/jobs/%s' % active_job_ids.pop(), status=200)
+
+    def ban():
+        app.post('/ban/se', params={'storage': BANNED_STORAGE, 'status': 'wait'}, status=200)
+        app.delete('/ban/se?storage=%s' % BANNED_STORAGE, status=204)
+
+    return [
+        ('submit', submit),
+        ('list', lambda: app.get('/jobs?limit=100', status=200)),
+        ('status', lambda: app.get('/jobs/%s' % random.choice(job_ids), status=200)),
+        ('multi_status', lambda: app.get('/jobs/%s' % ','.join(random.sample(job_ids, min(20, len(job_ids)))),
+                                         status=200)),
+        ('job_files', lambda: app.get('/jobs/%s/files' % random.choice(job_ids), status=200)),
+        ('files', lambda: app.get('/files?limit=100', status=200)),
+        ('cancel', cancel),
+        ('ban', ban),
+        ('delegation', lambda: app.get('/delegation/%s' % dlg_id, status=200)),
+        ('delegation_request', lambda: app.get('/delegation/%s/request' % dlg_id, status=200)),
+        ('optimizer', lambda: app.get('/optimizer', status=200)),
+        ('optimizer_evolution', lambda: app.get('/optimizer/evolution', status=200)),
+    ]
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    index = int(round((percent / 100.0) * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def _peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_case(name, func, iterations, warmup, query_counter):
+    """
+    Run func iterations times, after warmup executions that are not measured
+    """
+    for i in xrange(warmup):
+        func()
+
+    latencies = []
+    queries = []
+    for i in xrange(iterations):
+        query_counter.reset()
+        start = time.time()
+        func()
+        latencies.append((time.time() - start) * 1000)
+        queries.append(query_counter.total())
+
+    latencies.sort()
+    result = dict(
+        iterations=iterations,
+        p50_ms=_percentile(latencies, 50),
+        p99_ms=_percentile(latencies, 99),
+        min_ms=latencies[0],
+        max_ms=latencies[-1],
+        queries_per_request=sum(queries) / float(len(queries)),
+        queries_max=max(queries),
+        peak_rss_kb=_peak_rss_kb()
+    )
+    log.info("{0: <20}\tp50 {1:8.2f} ms\tp99 {2:8.2f} ms\t{3:6.1f} queries/request".format(
+        name, result['p50_ms'], result['p99_ms'], result['queries_per_request']
+    ))
+    return result
+
+
+def _user_confirms():
+    log.warning("Are you sure? (Type Yes)")
+    return sys.stdin.readline().strip().lower() == "yes"
+
+
+if __name__ == "__main__":
+    opt_parser = OptionParser()
+    opt_parser.add_option("-d", "--database", dest="database",
+                          default="sqlite:////tmp/fts3_benchmark.db",
+                          help="Database connection string")
+    opt_parser.add_option("-c", "--config", dest="fts3config", default=DEFAULT_CONFIG,
+                          help="FTS3 configuration file")
+    opt_parser.add_option("--cache-dir", dest="cache_dir", default="/tmp/fts3rest_benchmark",
+                          help="Cache directory for the application")
+    opt_parser.add_option("-j", "--jobs", dest="jobs", type="int", default=1000,
+                          help="Number of jobs to seed")
+    opt_parser.add_option("-f", "--files", dest="files_per_job", type="int", default=10,
+                          help="Number of files per seeded job")
+    opt_parser.add_option("--skip-seed", dest="skip_seed", action="store_true", default=False,
+                          help="Do not seed, reuse the jobs already in the database")
+    opt_parser.add_option("-n", "--iterations", dest="iterations", type="int", default=100,
+                          help="Number of measured requests per endpoint")
+    opt_parser.add_option("-w", "--warmup", dest="warmup", type="int", default=5,
+                          help="Number of requests per endpoint run before measuring")
+    opt_parser.add_option("--cases", dest="cases", default=None,
+                          help="Comma separated list of cases to run. By default, all")
+    opt_parser.add_option("-o", "--output", dest="output", default=None,
+                          help="Write the results as JSON into this file ('-' for stdout)")
+    opt_parser.add_option("--log-queries", dest="log_queries", action="store_true", default=False,
+                          help="Enable verbose output of the queries generated by SqlAlchemy")
+    opt_parser.add_option("--force", dest="force", action="store_true", default=False,
+                          help="Forces the execution, skip the confirmation question")
+    (opts, args) = opt_parser.parse_args()
+
+    log = setup_logging(opts.log_queries)
+
+    try:
+        log.warning("This will modify the database %s!" % opts.database)
+        if not opts.force and not _user_confirms():
+            log.critical("Aborted!")
+            sys.exit(1)
+        elif opts.force:
+            log.warning("--force specified, no confirmation required")
+
+        app = setup_app(opts.database, opts.fts3config, opts.cache_dir)
+        credentials = fts3auth.UserCredentials(_gridsite_environ(), {'public': {'*': 'all'}})
+        push_delegation(credentials)
+
+        if opts.skip_seed:
+            job_ids = load_job_ids(opts.jobs)
+        else:
+            job_ids = seed_database(opts.jobs, opts.files_per_job)
+        if not job_ids:
+            log.critical("There are no jobs in the database")
+            sys.exit(1)
+
+        query_counter = QueryCounter()
+        query_counter.attach(Session.get_bind())
+
+        cases = build_cases(app, job_ids, credentials.delegation_id)
+        if opts.cases:
+            selected = opts.cases.split(',')
+            cases = filter(lambda c: c[0] in selected, cases)
+
+        results = dict()
+        for name, func in cases:
+            results[name] = run_case(name, func, opts.iterations, opts.warmup, query_counter)
+
+        log.info("Peak RSS: %d KB" % _peak_rss_kb())
+
+        if opts.output:
+            report = dict(
+                timestamp=datetime.utcnow().isoformat(),
+                host=socket.getfqdn(),
+                python=platform.python_version(),
+                database=Session.get_bind().dialect.name,
+                seed=dict(jobs=len(job_ids), files_per_job=opts.files_per_job, skipped=opts.skip_seed),
+                iterations=opts.iterations,
+                warmup=opts.warmup,
+                peak_rss_kb=_peak_rss_kb(),
+                cases=results
+            )
+            if opts.output == '-':
+                json.dump(report, sys.stdout, indent=2)
+            else:
+                with open(opts.output, 'w') as output:
+                    json.dump(report, output, indent=2)
+                log.info("Results written into %s" % opts.output)
+    except SQLAlchemyError, e:
+        log.error("SQLAlchemy error: " + str(e))
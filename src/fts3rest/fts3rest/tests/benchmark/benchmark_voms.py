@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Benchmark of VomsClient.init, as called by /delegation/<id>/voms, with a stub voms-proxy-init
+that just copies the proxy, so the figures only reflect the work done by the REST server itself
+(temporary files, proxy inspection and the spawn of voms-proxy-init).
+
+Reports the calls per second, and the p50 and p99 latencies.
+"""
+
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from M2Crypto import ASN1, EVP, RSA, X509
+from optparse import OptionParser
+
+from fts3rest.lib.helpers.voms import VomsClient
+from util import setup_logging
+
+
+STUB_VOMS_PROXY_INIT = """#!/bin/sh
+while [ $# -gt 0 ]; do
+    case "$1" in
+        --cert) cert="$2"; shift;;
+        --out) out="$2"; shift;;
+    esac
+    shift
+done
+cat "$cert" > "$out"
+"""
+
+
+def _asn1_time(delta):
+    asn1_time = ASN1.ASN1_UTCTIME()
+    asn1_time.set_datetime(datetime.now(ASN1.UTC) + delta)
+    return asn1_time
+
+
+def _x509_name(components):
+    name = X509.X509_Name()
+    for field, value in components:
+        name.add_entry_by_txt(field, 0x1000, value, -1, -1, 0)
+    return name
+
+
+def generate_proxy(rfc):
+    """
+    Generate a self signed user certificate, and a proxy signed by it
+
+    Returns:
+        The proxy, its private key and the user certificate, PEM encoded
+    """
+    user_subject = [('DC', 'ch'), ('DC', 'cern'), ('CN', 'Benchmark User')]
+
+    user_key = EVP.PKey()
+    user_key.assign_rsa(RSA.gen_key(2048, 65537, lambda *args: None))
+    user_cert = X509.X509()
+    user_cert.set_version(2)
+    user_cert.set_serial_number(1)
+    user_cert.set_subject(_x509_name(user_subject))
+    user_cert.set_issuer(_x509_name(user_subject))
+    user_cert.set_pubkey(user_key)
+    user_cert.set_not_before(_asn1_time(timedelta(minutes=-5)))
+    user_cert.set_not_after(_asn1_time(timedelta(days=1)))
+    user_cert.sign(user_key, 'sha256')
+
+    proxy_key = EVP.PKey()
+    proxy_key.assign_rsa(RSA.gen_key(1024, 65537, lambda *args: None))
+    proxy = X509.X509()
+    proxy.set_version(2)
+    proxy.set_serial_number(2)
+    proxy.set_subject(_x509_name(user_subject + [('CN', '12345')]))
+    proxy.set_issuer(_x509_name(user_subject))
+    proxy.set_pubkey(proxy_key)
+    proxy.set_not_before(_asn1_time(timedelta(minutes=-5)))
+    proxy.set_not_after(_asn1_time(timedelta(hours=12)))
+    if rfc:
+        proxy.add_ext(X509.new_extension('proxyCertInfo', 'critical,language:Inherit all', critical=True))
+    proxy.sign(user_key, 'sha256')
+
+    return proxy.as_pem() + proxy_key.as_pem(cipher=None) + user_cert.as_pem()
+
+
+def install_stub(directory):
+    """
+    Write the stub voms-proxy-init into directory, and put it first in the PATH
+    """
+    stub_path = os.path.join(directory, 'voms-proxy-init')
+    with open(stub_path, 'w') as stub:
+        stub.write(STUB_VOMS_PROXY_INIT)
+    os.chmod(stub_path, stat.S_IRWXU)
+    os.environ['PATH'] = directory + os.pathsep + os.environ.get('PATH', '')
+
+
+def _percentile(sorted_values, percent):
+    index = int(round((percent / 100.0) * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def benchmark_voms(proxy_pem, iterations, warmup):
+    """
+    Run VomsClient.init iterations times, after warmup calls that are not measured
+    """
+    for i in xrange(warmup):
+        VomsClient(proxy_pem).init(['dteam'])
+
+    latencies = []
+    start = time.time()
+    for i in xrange(iterations):
+        call_start = time.time()
+        VomsClient(proxy_pem).init(['dteam'])
+        latencies.append((time.time() - call_start) * 1000)
+    elapsed = time.time() - start
+
+    latencies.sort()
+    return dict(
+        iterations=iterations,
+        calls_per_second=iterations / elapsed,
+        p50_ms=_percentile(latencies, 50),
+        p99_ms=_percentile(latencies, 99),
+        min_ms=latencies[0],
+        max_ms=latencies[-1]
+    )
+
+
+if __name__ == "__main__":
+    opt_parser = OptionParser()
+    opt_parser.add_option("-n", "--iterations", dest="iterations", type="int", default=500,
+                          help="Number of measured calls")
+    opt_parser.add_option("-w", "--warmup", dest="warmup", type="int", default=10,
+                          help="Number of calls run before measuring")
+    opt_parser.add_option("--legacy", dest="legacy", action="store_true", default=False,
+                          help="Use a legacy proxy instead of a RFC proxy")
+    opt_parser.add_option("-o", "--output", dest="output", default=None,
+                          help="Write the results as JSON into this file ('-' for stdout)")
+    (opts, args) = opt_parser.parse_args()
+
+    log = setup_logging(False)
+
+    stub_directory = tempfile.mkdtemp(prefix='fts3_benchmark_voms')
+    try:
+        install_stub(stub_directory)
+        proxy_pem = generate_proxy(rfc=not opts.legacy)
+        result = benchmark_voms(proxy_pem, opts.iterations, opts.warmup)
+    finally:
+        shutil.rmtree(stub_directory)
+
+    log.info("{0:8.1f} calls/second\tp50 {1:8.2f} ms\tp99 {2:8.2f} ms".format(
+        result['calls_per_second'], result['p50_ms'], result['p99_ms']
+    ))
+
+    if opts.output == '-':
+        json.dump(result, sys.stdout, indent=2)
+    elif opts.output:
+        with open(opts.output, 'w') as output:
+            json.dump(result, output, indent=2)
+        log.info("Results written into %s" % opts.output)
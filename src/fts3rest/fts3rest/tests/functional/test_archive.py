@@ -15,6 +15,8 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+from datetime import datetime
+
 from fts3rest.tests import TestController
 from fts3rest.lib.base import Session
 from fts3rest.lib.middleware.fts3auth import UserCredentials
@@ -117,3 +119,60 @@ class TestArchive(TestController):
 
         self.assertEqual(error['status'], '404 Not Found')
         self.assertEqual(error['message'], 'No such field')
+
+    def _insert_files(self, count):
+        job = ArchivedJob()
+        job.job_id = '444-555-666'
+        job.job_state = 'FINISHED'
+        job.user_dn = TestController.TEST_USER_DN
+        job.vo_name = 'testvo'
+        Session.merge(job)
+        for i in range(count):
+            archived = ArchivedFile()
+            archived.job_id = job.job_id
+            archived.file_id = 5000 + i
+            archived.file_state = 'FINISHED' if i % 2 else 'FAILED'
+            archived.source_se = 'srm://source'
+            archived.dest_se = 'srm://dest%d' % (i % 2)
+            archived.finish_time = datetime(2015, 1, 1 + i)
+            Session.merge(archived)
+        Session.commit()
+        return job.job_id
+
+    def test_get_files_projection(self):
+        """
+        Get only some fields of the archived files of a job
+        """
+        self.setup_gridsite_environment()
+        job_id = self._insert_files(4)
+
+        files = self.app.get(url="/archive/%s/files" % job_id, params={'fields': 'file_state'}, status=200).json
+        self.assertEqual(4, len(files))
+        self.assertEqual({'file_id': 5000, 'file_state': 'FAILED'}, files[0])
+
+        self.app.get(url="/archive/%s/files" % job_id, params={'fields': 'not_a_field'}, status=400)
+
+    def test_list_files(self):
+        """
+        List archived files with filters and pagination
+        """
+        self.setup_gridsite_environment()
+        self._insert_files(10)
+
+        page = self.app.get(url="/archive/files", params={'vo_name': 'testvo', 'limit': 4}, status=200).json
+        self.assertEqual([5000, 5001, 5002, 5003], [f['file_id'] for f in page['files']])
+        self.assertEqual(5003, page['next'])
+
+        page = self.app.get(url="/archive/files", params={'vo_name': 'testvo', 'limit': 4, 'after': 5007}, status=200).json
+        self.assertEqual([5008, 5009], [f['file_id'] for f in page['files']])
+        self.assertEqual(None, page['next'])
+
+        page = self.app.get(url="/archive/files", params={
+            'dest_se': 'srm://dest1', 'finished_since': '2015-01-03', 'finished_until': '2015-01-08T00:00:00',
+            'fields': 'dest_se,file_state'
+        }, status=200).json
+        self.assertEqual([5003, 5005], [f['file_id'] for f in page['files']])
+        self.assertEqual('FINISHED', page['files'][0]['file_state'])
+        self.assertNotIn('source_se', page['files'][0])
+
+        self.app.get(url="/archive/files", params={'finished_since': 'yesterday'}, status=400)
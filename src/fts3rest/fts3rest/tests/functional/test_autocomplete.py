@@ -14,6 +14,8 @@
 #   limitations under the License.
 
 from fts3rest.tests import TestController
+from fts3rest.lib.base import Session
+from fts3.model import LinkConfig
 
 class TestAutocomplete(TestController):
     """
@@ -77,3 +79,37 @@ class TestAutocomplete(TestController):
             status=200
         ).json
         self.assertEqual(0, len(autocomp))
+
+    def _set_links(self, count):
+        for i in range(count):
+            self.app.post_json('/config/links', params={
+                'symbolicname': 'link-%02d' % i,
+                'source': 'gsiftp://source%02d.cern.ch' % i,
+                'destination': 'gsiftp://dest.cern.ch',
+                'min_active': 2,
+                'max_active': 10
+            }, status=200)
+
+    def test_autocomplete_storage_index(self):
+        """
+        Storages are found by prefix, sorted and capped, and the index follows the link configuration
+        """
+        try:
+            self._set_links(30)
+            autocomp = self.app.get(url='/autocomplete/source', params={'term': 'gsiftp://source1'}, status=200).json
+            self.assertEqual(['gsiftp://source%02d.cern.ch' % i for i in range(10, 20)], autocomp)
+
+            autocomp = self.app.get(url='/autocomplete/storage', params={'term': 'gsiftp://'}, status=200).json
+            self.assertEqual(20, len(autocomp))
+            self.assertEqual('gsiftp://dest.cern.ch', autocomp[0])
+
+            # Too short
+            autocomp = self.app.get(url='/autocomplete/storage', params={'term': 'g'}, status=200).json
+            self.assertEqual(0, len(autocomp))
+
+            self.app.delete('/config/links/link-10', status=204)
+            autocomp = self.app.get(url='/autocomplete/source', params={'term': 'gsiftp://source1'}, status=200).json
+            self.assertNotIn('gsiftp://source10.cern.ch', autocomp)
+        finally:
+            Session.query(LinkConfig).delete()
+            Session.commit()
@@ -0,0 +1,162 @@
+#   Copyright notice:
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+
+from fts3rest.tests import TestController
+from fts3rest.lib.base import Session
+from fts3.model import ActivityShare, ConfigAudit, LinkConfig, OperationConfig, Se, ShareConfig
+
+
+class TestConfigBulk(TestController):
+
+    def setUp(self):
+        super(TestConfigBulk, self).setUp()
+        self.setup_gridsite_environment()
+        self._clean()
+
+    def tearDown(self):
+        self._clean()
+        super(TestConfigBulk, self).tearDown()
+
+    def _clean(self):
+        Session.query(ShareConfig).delete()
+        Session.query(LinkConfig).delete()
+        Session.query(OperationConfig).delete()
+        Session.query(Se).delete()
+        Session.query(ActivityShare).delete()
+        Session.query(ConfigAudit).delete()
+        Session.commit()
+
+    def _document(self):
+        return {
+            'links': [
+                {'symbolicname': 'link-a', 'source': 'gsiftp://a', 'destination': 'gsiftp://b',
+                 'min_active': 2, 'max_active': 20},
+                {'symbolicname': 'link-b', 'source': 'gsiftp://b', 'destination': 'gsiftp://a',
+                 'min_active': 2, 'max_active': 40},
+            ],
+            'se': [
+                {'storage': 'gsiftp://a', 'site': 'SITE-A', 'inbound_max_active': 50},
+            ],
+            'operations': [
+                {'vo_name': 'testvo', 'host': 'gsiftp://a', 'operation': 'staging', 'concurrent_ops': 10},
+            ],
+            'shares': [
+                {'source': 'gsiftp://a', 'destination': 'gsiftp://b', 'vo': 'testvo', 'share': 80},
+            ],
+            'activity_shares': [
+                {'vo': 'testvo', 'activity_share': {'express': 0.5, 'default': 0.1}, 'active': True},
+            ]
+        }
+
+    def test_import(self):
+        """
+        Import a full document
+        """
+        summary = self.app.post_json('/config/bulk', params=self._document(), status=200).json
+
+        self.assertEqual(2, summary['links']['inserted'])
+        self.assertEqual(1, summary['shares']['inserted'])
+
+        link = Session.query(LinkConfig).get(('gsiftp://b', 'gsiftp://a'))
+        self.assertEqual('link-b', link.symbolicname)
+        self.assertEqual(40, link.max_active)
+        se = Session.query(Se).get('gsiftp://a')
+        self.assertEqual('SITE-A', se.site)
+        self.assertEqual(50, se.inbound_max_active)
+        self.assertEqual(10, Session.query(OperationConfig).get(('testvo', 'gsiftp://a', 'staging')).concurrent_ops)
+        self.assertEqual(80, Session.query(ShareConfig).get(('gsiftp://a', 'gsiftp://b', 'testvo')).share)
+        self.assertTrue(Session.query(ActivityShare).get('testvo').active)
+
+        # Only one audit entry for everything
+        self.assertEqual(1, Session.query(ConfigAudit).count())
+
+    def test_reimport(self):
+        """
+        Importing again only applies the differences
+        """
+        self.app.post_json('/config/bulk', params=self._document(), status=200)
+
+        document = self._document()
+        document['links'][0]['max_active'] = 30
+        summary = self.app.post_json('/config/bulk', params=document, status=200).json
+        self.assertEqual(0, summary['links']['inserted'])
+        self.assertEqual(1, summary['links']['updated'])
+        self.assertEqual(1, summary['links']['unchanged'])
+        self.assertEqual(1, summary['se']['unchanged'])
+        self.assertEqual(30, Session.query(LinkConfig).get(('gsiftp://a', 'gsiftp://b')).max_active)
+
+        # Nothing changed, nothing audited
+        self.app.post_json('/config/bulk', params=document, status=200)
+        self.assertEqual(2, Session.query(ConfigAudit).count())
+
+    def test_replace(self):
+        """
+        With replace, entries not in the document are removed
+        """
+        self.app.post_json('/config/bulk', params=self._document(), status=200)
+
+        document = {'links': self._document()['links'][:1], 'shares': []}
+        summary = self.app.post_json('/config/bulk?replace=true', params=document, status=200).json
+        self.assertEqual(1, summary['links']['deleted'])
+        self.assertEqual(1, summary['shares']['deleted'])
+        self.assertEqual(1, Session.query(LinkConfig).count())
+        self.assertEqual(0, Session.query(ShareConfig).count())
+        # Sections not in the document are kept
+        self.assertEqual(1, Session.query(Se).count())
+
+    def test_dry_run(self):
+        """
+        With dry_run, nothing is modified
+        """
+        summary = self.app.post_json('/config/bulk?dry_run=true', params=self._document(), status=200).json
+        self.assertEqual(2, summary['links']['inserted'])
+        self.assertEqual(0, Session.query(LinkConfig).count())
+        self.assertEqual(0, Session.query(ConfigAudit).count())
+
+    def test_import_invalid(self):
+        """
+        Invalid documents are rejected as a whole
+        """
+        document = self._document()
+        document['shares'][0]['share'] = 'abc'
+        self.app.post_json('/config/bulk', params=document, status=400)
+        self.assertEqual(0, Session.query(LinkConfig).count())
+
+        self.app.post_json('/config/bulk', params={'whatever': []}, status=400)
+
+        document = self._document()
+        document['links'][0]['unknown'] = 5
+        self.app.post_json('/config/bulk', params=document, status=400)
+
+        document = self._document()
+        document['links'].append(document['links'][0])
+        self.app.post_json('/config/bulk', params=document, status=400)
+
+    def test_export(self):
+        """
+        The export can be imported back without changes
+        """
+        self.app.post_json('/config/bulk', params=self._document(), status=200)
+
+        exported = self.app.get_json('/config/export', status=200).json
+        self.assertEqual(
+            ['gsiftp://a', 'gsiftp://b'], [link['source'] for link in exported['links']]
+        )
+        self.assertEqual('SITE-A', exported['se'][0]['site'])
+        self.assertEqual({'express': 0.5, 'default': 0.1}, exported['activity_shares'][0]['activity_share'])
+
+        summary = self.app.post_json('/config/bulk?replace=true', params=exported, status=200).json
+        for section, counts in summary.iteritems():
+            self.assertEqual(0, counts['inserted'] + counts['updated'] + counts['deleted'], section)
@@ -16,7 +16,8 @@
 
 from fts3rest.tests import TestController
 from fts3rest.lib.base import Session
-from fts3.model import ConfigAudit, LinkConfig
+from fts3rest.lib.config_cache import CONFIG_VERSION_ID, bump_config_version
+from fts3.model import ConfigAudit, ConfigVersion, LinkConfig
 
 
 class TestConfigLinks(TestController):
@@ -159,4 +160,25 @@ class TestConfigLinks(TestController):
         audits = Session.query(ConfigAudit).all()
         self.assertEqual(2, len(audits))
 
-    
\ No newline at end of file
+    
+
+    def test_link_cached(self):
+        """
+        The link configuration is served from the cache until the configuration version changes
+        """
+        self.test_config_link_se()
+        self.assertEqual(150, self.app.get_json("/config/links/test-link").json['max_active'])
+
+        # Change done by someone else, not bumping the version
+        link = Session.query(LinkConfig).get(('test.cern.ch', 'test2.cern.ch'))
+        link.max_active = 50
+        Session.commit()
+        self.assertEqual(150, self.app.get_json("/config/links/test-link").json['max_active'])
+
+        bump_config_version(Session)
+        Session.commit()
+        self.assertEqual(50, self.app.get_json("/config/links/test-link").json['max_active'])
+
+        # The version is kept apart from the global configuration
+        self.assertNotIn('@config_version', self.app.get_json("/config/global").json)
+        self.assertIsNotNone(Session.query(ConfigVersion).get(CONFIG_VERSION_ID))
@@ -48,6 +48,89 @@ class TestDatamanagement(TestController):
         self.assertIn('d', response)
         self.assertEqual(123, response['b']['size'])
 
+    def test_get_list_stream(self):
+        """
+        List the content of a remote directory, in stream mode
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+        response = self.app.get(
+            url="/dm/list",
+            params={
+                'surl': 'mock://destination.es/file?list=a:1755:0,b:0755:123,c:000:0,d:0444:1234',
+                'stream': True
+            },
+            status=200
+        ).json
+        self.assertEqual(['a', 'b', 'c', 'd'], sorted([entry['name'] for entry in response['entries']]))
+        self.assertEqual(None, response['next'])
+        b = filter(lambda entry: entry['name'] == 'b', response['entries'])[0]
+        self.assertEqual(123, b['size'])
+
+    def test_get_list_stream_pages(self):
+        """
+        List the content of a remote directory, in stream mode, page by page
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+        names = []
+        offset = 0
+        while offset is not None:
+            response = self.app.get(
+                url="/dm/list",
+                params={
+                    'surl': 'mock://destination.es/file?list=a:1755:0,b:0755:123,c:000:0,d:0444:1234',
+                    'stream': True,
+                    'stat': False,
+                    'offset': offset,
+                    'limit': 3
+                },
+                status=200
+            ).json
+            self.assertLessEqual(len(response['entries']), 3)
+            for entry in response['entries']:
+                self.assertNotIn('size', entry)
+                names.append(entry['name'])
+            offset = response['next']
+        self.assertEqual(['a', 'b', 'c', 'd'], sorted(names))
+
+    def test_get_list_stream_pages_stat(self):
+        """
+        Page by page, with stat. The skipped entries are not stat'ed, the page ones are
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+        sizes = dict()
+        offset = 0
+        while offset is not None:
+            response = self.app.get(
+                url="/dm/list",
+                params={
+                    'surl': 'mock://destination.es/file?list=a:1755:0,b:0755:123,c:000:0,d:0444:1234',
+                    'stream': True,
+                    'offset': offset,
+                    'limit': 1
+                },
+                status=200
+            ).json
+            self.assertLessEqual(len(response['entries']), 1)
+            for entry in response['entries']:
+                sizes[entry['name']] = entry['size']
+            offset = response['next']
+        self.assertEqual(123, sizes['b'])
+        self.assertEqual(1234, sizes['d'])
+        self.assertEqual(4, len(sizes))
+
+    def test_get_list_stream_invalid_page(self):
+        """
+        offset and limit must be valid integers
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+        for params in ({'limit': 0}, {'offset': -1}, {'limit': 'abc'}):
+            params.update(surl='mock://destination.es/file?list=a:1755:0', stream=True)
+            self.app.get(url="/dm/list", params=params, status=400)
+
     def test_missing_surl(self):
         """
         Try list the content of a remote directory
@@ -151,3 +234,49 @@ class TestDatamanagement(TestController):
             },
             status=400
         )
+
+    def test_bulk(self):
+        """
+        Run several operations at once, one of them failing
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+        operations = [
+            {'op': 'stat', 'surl': 'mock://destination.es/file?size=10'},
+            {'op': 'stat', 'surl': 'mock://destination.es/file2?size=20'},
+            {'op': 'stat', 'surl': 'unsupported://destination.es/file'}
+        ]
+        statuses = self.app.post_json(url="/dm/bulk", params=operations, status=207).json
+
+        self.assertEqual(3, len(statuses))
+        self.assertEqual('200 Ok', statuses[0]['http_status'])
+        self.assertEqual(10, statuses[0]['stat']['size'])
+        self.assertEqual('200 Ok', statuses[1]['http_status'])
+        self.assertEqual(20, statuses[1]['stat']['size'])
+        self.assertEqual('unsupported://destination.es/file', statuses[2]['surl'])
+        self.assertFalse(statuses[2]['http_status'].startswith('2'))
+        self.assertIn('http_message', statuses[2])
+
+    def test_bulk_all_ok(self):
+        """
+        If all the operations succeed, the status is 200
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+        operations = [{'op': 'stat', 'surl': 'mock://destination.es/file%d?size=1' % i} for i in range(20)]
+        statuses = self.app.post_json(url="/dm/bulk", params=operations, status=200).json
+        self.assertEqual(20, len(statuses))
+        for operation, status in zip(operations, statuses):
+            self.assertEqual(operation['surl'], status['surl'])
+            self.assertEqual('200 Ok', status['http_status'])
+
+    def test_bulk_invalid(self):
+        """
+        Malformed operations must be rejected before running anything
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+        self.app.post_json(url="/dm/bulk", params={'op': 'stat'}, status=400)
+        self.app.post_json(url="/dm/bulk", params=[{'op': 'chmod', 'surl': 'mock://destination.es/file'}], status=400)
+        self.app.post_json(url="/dm/bulk", params=[{'op': 'rename', 'old': 'mock://destination.es/file'}], status=400)
+        self.app.post_json(url="/dm/bulk", params=[{'op': 'unlink', 'surl': 'file:///etc/passwd'}], status=400)
@@ -16,9 +16,10 @@
 #   limitations under the License.
 
 import json
+import pylons
 from datetime import datetime, timedelta
 
-from fts3.model import FileRetryLog, Job, File
+from fts3.model import DataManagement, FileRetryLog, Job, File
 from fts3rest.lib.base import Session
 from fts3rest.lib.middleware.fts3auth import UserCredentials, constants
 from fts3rest.tests import TestController
@@ -618,3 +619,346 @@ class TestJobListing(TestController):
         self.assertIn(job1, job_ids)
         self.assertIn(job2, job_ids)
         self.assertIn(job3, job_ids)
+
+    def test_wait_until_change_no_etag(self):
+        """
+        An empty etag never matches, so the job is returned straight away with its etag
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job_id = self._submit()
+        response = self.app.get(url="/jobs/%s?wait_until_change=" % job_id, status=200)
+
+        self.assertEqual(job_id, response.json['job_id'])
+        self.assertIn('etag', response.json)
+        self.assertEqual('"%s"' % response.json['etag'], response.headers['ETag'])
+
+    def test_wait_until_change_timeout(self):
+        """
+        If nothing changes, the same etag is returned once the timeout expires
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job_id = self._submit()
+        etag = self.app.get(url="/jobs/%s?wait_until_change=" % job_id, status=200).json['etag']
+
+        job = self.app.get(url="/jobs/%s?wait_until_change=%s&timeout=0" % (job_id, etag), status=200).json
+        self.assertEqual(etag, job['etag'])
+        self.assertEqual('SUBMITTED', job['job_state'])
+
+    def test_wait_until_change_changed(self):
+        """
+        If the state changed, the new state and etag are returned
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job_id = self._submit()
+        etag = self.app.get(url="/jobs/%s?wait_until_change=" % job_id, status=200).json['etag']
+
+        job = Session.query(Job).get(job_id)
+        job.job_state = 'ACTIVE'
+        Session.merge(job)
+        Session.commit()
+
+        job = self.app.get(url="/jobs/%s?wait_until_change=%s&timeout=5" % (job_id, etag), status=200).json
+        self.assertNotEqual(etag, job['etag'])
+        self.assertEqual('ACTIVE', job['job_state'])
+
+    def test_wait_until_change_multiple(self):
+        """
+        Long polling is only supported for one job
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job1 = self._submit()
+        job2 = self._submit()
+        self.app.get(url="/jobs/%s,%s?wait_until_change=" % (job1, job2), status=400)
+
+    def test_wait_until_change_too_many(self):
+        """
+        Requests are not held if there are already too many waiting
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job_id = self._submit()
+        pylons.config['fts3.LongPollMaxWaiters'] = 0
+        try:
+            self.app.get(url="/jobs/%s?wait_until_change=&timeout=0" % job_id, status=503)
+        finally:
+            del pylons.config['fts3.LongPollMaxWaiters']
+
+    def test_list_ndjson(self):
+        """
+        List active jobs as newline delimited json
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job_id = self._submit()
+
+        response = self.app.get(url="/jobs", headers={'Accept': 'application/x-ndjson'}, status=200)
+        self.assertEqual('application/x-ndjson', response.content_type)
+        job_list = map(json.loads, filter(len, response.body.split('\n')))
+        self.assertIn(job_id, map(lambda j: j['job_id'], job_list))
+
+    def test_get_files_ndjson(self):
+        """
+        Get the files within a job as newline delimited json
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+        job_id = self._submit()
+
+        response = self.app.get(
+            url="/jobs/%s/files" % job_id, headers={'Accept': 'application/x-ndjson'}, status=200
+        )
+        self.assertEqual('application/x-ndjson', response.content_type)
+        lines = response.body.split('\n')
+        self.assertEqual('', lines[-1])
+        self.assertEqual(1, len(lines[:-1]))
+        self.assertEqual("root://source.es/file", json.loads(lines[0])['source_surl'])
+
+        # JSON is preferred if both are equally acceptable
+        response = self.app.get(
+            url="/jobs/%s/files" % job_id, headers={'Accept': 'application/json, application/x-ndjson'}, status=200
+        )
+        self.assertEqual('application/json', response.content_type)
+        self.assertEqual(1, len(response.json))
+
+    def test_get_files_ndjson_missing(self):
+        """
+        Errors are still sent as json
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        error = self.app.get(
+            url="/jobs/1234x/files", headers={'Accept': 'application/x-ndjson'}, status=404
+        ).json
+        self.assertEqual(error['status'], '404 Not Found')
+
+    def test_get_multiple_with_files_columnar(self):
+        """
+        Query multiple jobs at once, with their files as columns and rows
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job1 = self._submit(file_metadata='a')
+        job2 = self._submit(file_metadata='5')
+
+        jobs = self.app.get(
+            url="/jobs/%s?files=job_id,file_metadata,file_state,notafield&files_format=columnar" % ','.join([job1, job2]),
+            status=200).json
+
+        self.assertEqual(2, len(jobs))
+        for job, metadata in zip(jobs, ['a', '5']):
+            self.assertEqual(['job_id', 'file_metadata', 'file_state'], job['files']['columns'])
+            self.assertEqual([[job['job_id'], metadata, 'SUBMITTED']], job['files']['rows'])
+            self.assertNotIn('dictionaries', job['files'])
+
+    def test_get_with_files_columnar_order(self):
+        """
+        The rows come in the same order as the files as objects, by file id
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job = {
+            'files': [{
+                'sources': ['root://source.es/file%d' % i],
+                'destinations': ['root://dest.ch/file%d%d' % (i, random.randint(0, 1000))],
+            } for i in range(5)],
+            'params': {'overwrite': True}
+        }
+        job_id = self.app.put(url="/jobs", params=json.dumps(job), status=200).json['job_id']
+
+        columnar = self.app.get(
+            url="/jobs/%s?files=file_id,source_surl&files_format=columnar" % job_id, status=200
+        ).json['files']
+        objects = self.app.get(url="/jobs/%s?files=file_id,source_surl" % job_id, status=200).json['files']
+
+        file_ids = [row[0] for row in columnar['rows']]
+        self.assertEqual(sorted(file_ids), file_ids)
+        self.assertEqual([[f['file_id'], f['source_surl']] for f in objects], columnar['rows'])
+
+    def test_get_with_files_dictionary(self):
+        """
+        Query a job with its files as columns and rows, with the low cardinality fields encoded
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job_id = self._submit()
+
+        job = self.app.get(
+            url="/jobs/%s?files=dest_surl,file_state&files_format=dictionary" % job_id,
+            status=200).json
+
+        self.assertEqual(['dest_surl', 'file_state'], job['files']['columns'])
+        self.assertEqual({'file_state': ['SUBMITTED']}, job['files']['dictionaries'])
+        self.assertEqual(1, len(job['files']['rows']))
+        self.assertEqual(0, job['files']['rows'][0][1])
+        self.assertTrue(job['files']['rows'][0][0].startswith('root://dest.ch/file'))
+
+    def test_get_with_files_bad_format(self):
+        """
+        Unknown files_format
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job_id = self._submit()
+        self.app.get(url="/jobs/%s?files=dest_surl&files_format=xml" % job_id, status=400)
+
+    def test_get_summary(self):
+        """
+        Get how many files of a job are in each state
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job_id = self._submit()
+
+        response = self.app.get(url="/jobs/%s/summary" % job_id, status=200)
+        summary = response.json
+
+        self.assertEqual(job_id, summary['job_id'])
+        self.assertEqual('SUBMITTED', summary['job_state'])
+        self.assertEqual({'SUBMITTED': 1}, summary['files'])
+        self.assertEqual({}, summary['dm'])
+        self.assertEqual(1, summary['total_files'])
+        self.assertEqual(1024, summary['bytes_total'])
+        self.assertEqual(0, summary['bytes_done'])
+        self.assertEqual('"%s"' % summary['etag'], response.headers['ETag'])
+
+    def test_get_summary_not_modified(self):
+        """
+        If the etag matches If-None-Match, 304 is returned, until the job changes
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job_id = self._submit()
+        etag = self.app.get(url="/jobs/%s/summary" % job_id, status=200).json['etag']
+
+        response = self.app.get(
+            url="/jobs/%s/summary" % job_id, headers={'If-None-Match': '"%s"' % etag}, status=304
+        )
+        self.assertEqual('"%s"' % etag, response.headers['ETag'])
+        # Weakened by the compression
+        self.app.get(url="/jobs/%s/summary" % job_id, headers={'If-None-Match': 'W/"%s"' % etag}, status=304)
+        self.app.get(url="/jobs/%s/summary" % job_id, headers={'If-None-Match': '"1234"'}, status=200)
+
+        job = Session.query(Job).get(job_id)
+        job.job_state = 'ACTIVE'
+        Session.merge(job)
+        Session.commit()
+
+        summary = self.app.get(
+            url="/jobs/%s/summary" % job_id, headers={'If-None-Match': '"%s"' % etag}, status=200
+        ).json
+        self.assertEqual('ACTIVE', summary['job_state'])
+        self.assertNotEqual(etag, summary['etag'])
+
+    def test_get_summary_modified_progress(self):
+        """
+        Changes of the throughput and the data management operations change the etag,
+        even if the state of the job and its files do not
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job_id = self._submit()
+        etag = self.app.get(url="/jobs/%s/summary" % job_id, status=200).json['etag']
+
+        transfer = Session.query(File).filter(File.job_id == job_id).first()
+        transfer.throughput = 10.0
+        Session.merge(transfer)
+        Session.commit()
+
+        summary = self.app.get(
+            url="/jobs/%s/summary" % job_id, headers={'If-None-Match': '"%s"' % etag}, status=200
+        ).json
+        self.assertEqual(10.0, summary['throughput'])
+        self.assertNotEqual(etag, summary['etag'])
+        etag = summary['etag']
+
+        Session.add(DataManagement(
+            job_id=job_id, file_state='DELETE', source_surl='root://source.es/file', vo_name='testvo'
+        ))
+        Session.commit()
+
+        summary = self.app.get(
+            url="/jobs/%s/summary" % job_id, headers={'If-None-Match': '"%s"' % etag}, status=200
+        ).json
+        self.assertEqual({'DELETE': 1}, summary['dm'])
+        self.assertNotEqual(etag, summary['etag'])
+        # The same etag is used by wait_until_change
+        job = self.app.get(url="/jobs/%s?wait_until_change=%s&timeout=0" % (job_id, summary['etag']), status=200).json
+        self.assertEqual(summary['etag'], job['etag'])
+
+    def test_get_summary_not_modified_missing(self):
+        """
+        If-None-Match does not skip the permission checks
+        """
+        self.setup_gridsite_environment()
+        self.app.get(url="/jobs/1234x/summary", headers={'If-None-Match': '*'}, status=404)
+
+    def test_get_summary_terminal(self):
+        """
+        Get the summary of a finished job, twice, so the second one comes from the cache
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job_id = self._terminal('FINISHED', timedelta(minutes=5))
+
+        for i in range(2):
+            summary = self.app.get(url="/jobs/%s/summary" % job_id, status=200).json
+            self.assertEqual('FINISHED', summary['job_state'])
+            self.assertEqual({'FINISHED': 1}, summary['files'])
+            self.assertEqual(1024, summary['bytes_done'])
+
+    def test_get_summary_missing(self):
+        """
+        Summary of a job that does not exist
+        """
+        self.setup_gridsite_environment()
+        self.app.get(url="/jobs/1234x/summary", status=404)
+
+    def test_get_summaries_one_missing(self):
+        """
+        Summaries of several jobs, one of them missing
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job1 = self._submit()
+        job2 = self._submit()
+
+        summaries = self.app.get(
+            url="/jobs/summary?ids=%s" % ','.join([job1, '12345-BADBAD-09876', job2]),
+            status=207
+        ).json
+
+        self.assertEqual(3, len(summaries))
+        self.assertEqual(job1, summaries[0]['job_id'])
+        self.assertEqual('200 Ok', summaries[0]['http_status'])
+        self.assertEqual({'SUBMITTED': 1}, summaries[0]['files'])
+        self.assertEqual('12345-BADBAD-09876', summaries[1]['job_id'])
+        self.assertEqual('404 Not Found', summaries[1]['http_status'])
+        self.assertEqual(job2, summaries[2]['job_id'])
+        self.assertEqual(1, summaries[2]['total_files'])
+
+    def test_get_summaries_no_ids(self):
+        """
+        Summaries without any job id
+        """
+        self.setup_gridsite_environment()
+        self.app.get(url="/jobs/summary", status=400)
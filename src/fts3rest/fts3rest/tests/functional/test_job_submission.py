@@ -1112,3 +1112,108 @@ class TestJobSubmission(TestController):
         self.assertGreater(min_value, -1)
         self.assertEqual(outsiders, 0)
         self.assertGreater(pvalue, 0.1)
+
+    def test_submit_many(self):
+        """
+        Submit several jobs in a single request
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        jobs = []
+        for i in range(5):
+            jobs.append({
+                'files': [{
+                    'sources': ['root://source.es/file%d' % i],
+                    'destinations': ['root://dest.ch/file%d%d' % (i, random.randint(0, 100))],
+                }],
+                'params': {'overwrite': True}
+            })
+
+        responses = self.app.post(
+            url="/jobs",
+            content_type='application/json',
+            params=json.dumps({'jobs': jobs}),
+            status=200
+        ).json
+
+        self.assertEqual(5, len(responses))
+        for i, response in enumerate(responses):
+            self.assertEqual('200 Ok', response['http_status'])
+            job = Session.query(Job).get(response['job_id'])
+            self.assertEqual('SUBMITTED', job.job_state)
+            self.assertEqual('root://source.es/file%d' % i, job.files[0].source_surl)
+
+    def test_submit_many_with_errors(self):
+        """
+        Submit several jobs in a single request, where some of them are wrong.
+        The valid ones must be submitted anyway.
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job = {
+            'files': [{
+                'sources': ['root://source.es/file'],
+                'destinations': ['root://dest.ch/file%d' % random.randint(0, 100)],
+            }],
+            'params': {'id_generator': 'deterministic', 'sid': 'bulk-%d' % random.randint(0, 10000)}
+        }
+        jobs = [job, {'files': [{'sources': ['/etc/passwd'], 'destinations': ['root://dest.ch/file']}]}, job]
+
+        responses = self.app.post(
+            url="/jobs",
+            content_type='application/json',
+            params=json.dumps({'jobs': jobs}),
+            status=207
+        ).json
+
+        self.assertEqual(3, len(responses))
+        self.assertEqual('200 Ok', responses[0]['http_status'])
+        self.assertIsNotNone(Session.query(Job).get(responses[0]['job_id']))
+        self.assertEqual('400 Bad Request', responses[1]['http_status'])
+        self.assertIsNone(responses[1]['job_id'])
+        self.assertEqual('409 Conflict', responses[2]['http_status'])
+
+    def test_submit_many_reserved_fields(self):
+        """
+        Entries with fields that clash with the JobBuilder arguments are rejected one by one
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        job = {
+            'files': [{
+                'sources': ['root://source.es/file'],
+                'destinations': ['root://dest.ch/file%d' % random.randint(0, 100)],
+            }],
+            'params': {'overwrite': True}
+        }
+        jobs = [job, dict(job, user='someone'), dict(job, banning=True)]
+
+        responses = self.app.post(
+            url="/jobs",
+            content_type='application/json',
+            params=json.dumps({'jobs': jobs}),
+            status=207
+        ).json
+
+        self.assertEqual(3, len(responses))
+        self.assertEqual('200 Ok', responses[0]['http_status'])
+        self.assertEqual('400 Bad Request', responses[1]['http_status'])
+        self.assertIsNone(responses[1]['job_id'])
+        self.assertEqual('400 Bad Request', responses[2]['http_status'])
+
+    def test_submit_many_empty(self):
+        """
+        An empty list of jobs is not valid
+        """
+        self.setup_gridsite_environment()
+        self.push_delegation()
+
+        self.app.post(
+            url="/jobs",
+            content_type='application/json',
+            params=json.dumps({'jobs': []}),
+            status=400
+        )
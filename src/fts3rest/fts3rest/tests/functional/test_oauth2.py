@@ -21,6 +21,7 @@ import urlparse
 from datetime import datetime, timedelta
 from fts3rest.tests import TestController
 from fts3rest.lib.base import Session
+from fts3rest.lib.token_cache import token_cache
 from fts3.model import OAuth2Application, OAuth2Code, OAuth2Token, AuthorizationByDn
 from Cookie import SimpleCookie as Cookie
 
@@ -307,6 +308,91 @@ class TestOAuth2(TestController):
             status=403
         )
 
+    def test_token_cached(self):
+        """
+        The second request with the same token must be served from the cache
+        """
+        client_id, access_token, refresh_token, expires = self.test_get_token()
+        del self.app.extra_environ['GRST_CRED_AURI_0']
+
+        stats = token_cache.get_stats()
+        for i in range(2):
+            whoami = self.app.get(
+                url="/whoami",
+                headers={'Authorization': str('Bearer %s' % access_token)},
+                status=200
+            ).json
+            self.assertEqual('oauth2', whoami['method'])
+            self.assertEqual('/DC=ch/DC=cern/CN=Test User', whoami['user_dn'])
+
+        self.assertEqual(stats['misses'] + 1, token_cache.get_stats()['misses'])
+        self.assertEqual(stats['hits'] + 1, token_cache.get_stats()['hits'])
+
+    def test_revoke_cached(self):
+        """
+        Revoking must invalidate the cached tokens straight away
+        """
+        client_id, access_token, refresh_token, expires = self.test_get_token()
+        cred = self.app.extra_environ.pop('GRST_CRED_AURI_0')
+        self.app.get(
+            url="/whoami",
+            headers={'Authorization': str('Bearer %s' % access_token)},
+            status=200
+        )
+        self.assertEqual(1, token_cache.get_stats()['entries'])
+
+        self.app.extra_environ['GRST_CRED_AURI_0'] = cred
+        self.app.get(
+            url="/oauth2/revoke/%s" % client_id,
+            status=303
+        )
+        self.assertEqual(0, token_cache.get_stats()['entries'])
+
+        del self.app.extra_environ['GRST_CRED_AURI_0']
+        self.app.get(
+            url="/jobs",
+            headers={'Authorization': str('Bearer %s' % access_token)},
+            status=403
+        )
+
+    def test_refresh_invalidates_cached(self):
+        """
+        Once refreshed, the previous access token must not be accepted, even if cached
+        """
+        client_id, access_token, refresh_token, expires = self.test_get_token()
+        cred = self.app.extra_environ.pop('GRST_CRED_AURI_0')
+        self.app.get(
+            url="/whoami",
+            headers={'Authorization': str('Bearer %s' % access_token)},
+            status=200
+        )
+
+        self.app.extra_environ['GRST_CRED_AURI_0'] = cred
+        auth = self.app.post(
+            url="/oauth2/token",
+            params={
+                'grant_type': 'refresh_token',
+                'client_id': client_id,
+                'client_secret': self._get_client_secret(client_id),
+                'refresh_token': refresh_token,
+                'scope': 'transfer'
+            },
+            status=200
+        ).json
+        del self.app.extra_environ['GRST_CRED_AURI_0']
+
+        self.app.get(
+            url="/jobs",
+            headers={'Authorization': str('Bearer %s' % access_token)},
+            status=403
+        )
+        whoami = self.app.get(
+            url="/whoami",
+            headers={'Authorization': str('Bearer %s' % str(auth['access_token']))},
+            status=200
+        ).json
+        self.assertEqual('oauth2', whoami['method'])
+
     def test_oauth2_with_bearer(self):
         """
         Using bearer tokens in the OAuth2 controller must be denied
@@ -350,6 +436,8 @@ class TestOAuth2(TestController):
         token.expires = datetime.utcnow() - timedelta(hours=1)
         Session.merge(token)
         Session.commit()
+        # Changed behind the back of the token cache
+        token_cache.clear()
 
         self.app.get(
             url="/whoami",
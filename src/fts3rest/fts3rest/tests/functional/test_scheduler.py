@@ -21,6 +21,7 @@ import logging
 
 from fts3rest.tests import TestController
 from fts3rest.lib.base import Session
+from fts3rest.lib.config_cache import config_cache
 from fts3rest.lib.scheduler.Cache import ThreadLocalCache
 from fts3.model import Job, File, OptimizerEvolution, ActivityShare
 import random
@@ -43,6 +44,7 @@ class TestScheduler(TestController):
         Session.query(OptimizerEvolution).delete()
         Session.query(ActivityShare).delete()
         Session.commit()
+        config_cache.clear()
 
     @staticmethod
     def fill_file_queue(self):
@@ -150,6 +152,8 @@ class TestScheduler(TestController):
         )
         Session.add(activity)
         Session.commit()
+        # Bypasses the API, so the configuration version is not changed
+        config_cache.clear()
 
     def submit_job(self, strategy):
         job = {
@@ -0,0 +1,71 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from fts3.model import File
+from fts3rest.lib.base import Session
+from fts3rest.tests import TestController
+from insert_job import insert_job
+
+
+class TestServerStatus(TestController):
+    """
+    Tests for the server status
+    """
+
+    def tearDown(self):
+        if 'SSL_SERVER_S_DN' in self.app.extra_environ:
+            del self.app.extra_environ['SSL_SERVER_S_DN']
+        super(TestServerStatus, self).tearDown()
+
+    def _set_transfer_host(self, job_id, host):
+        Session.query(File).filter(File.job_id == job_id).update({'transfer_host': host})
+        Session.commit()
+
+    def test_hosts_activity(self):
+        """
+        The activity is served from a snapshot, unless root asks for a fresh one
+        """
+        self.setup_gridsite_environment()
+        self._set_transfer_host(insert_job('testvo', 'gsiftp://a', 'gsiftp://b', 'ACTIVE'), 'fts01')
+        self.app.get(url="/status/hosts?fresh=true", status=403)
+
+        # Become root
+        self.app.extra_environ['SSL_SERVER_S_DN'] = self.TEST_USER_DN
+        answer = self.app.get(url="/status/hosts?fresh=true", status=200)
+        self.assertIn('X-Generated-At', answer.headers)
+        activity = answer.json
+        self.assertEqual(1, activity['fts01']['active'])
+
+        # Not visible until the snapshot is refreshed
+        self._set_transfer_host(insert_job('testvo', 'gsiftp://a', 'gsiftp://b', 'ACTIVE'), 'fts02')
+        activity = self.app.get(url="/status/hosts", status=200).json
+        self.assertNotIn('fts02', activity)
+
+        activity = self.app.get(url="/status/hosts?fresh=true", status=200).json
+        self.assertEqual(1, activity['fts02']['active'])
+
+    def test_db_pool(self):
+        """
+        Get the usage of the database pool
+        """
+        self.setup_gridsite_environment()
+        self.app.get(url="/whoami", status=200)
+
+        stats = self.app.get(url="/status/dbpool", status=200).json
+
+        self.assertIn('pid', stats)
+        self.assertIn('pool_class', stats)
+        self.assertGreater(stats['connects'], 0)
+        self.assertEqual(0, stats['pings_failed'])
@@ -0,0 +1,95 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import logging
+import threading
+import unittest
+
+from fts3rest.lib.async_logging import AsyncHandler, DROPPED_COUNTER
+
+
+class BlockingHandler(logging.Handler):
+    """
+    Keeps the records, waiting for the event before each one
+    """
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.unblock = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.unblock.wait()
+        self.records.append(record)
+
+
+class MockCounters(object):
+    def __init__(self):
+        self.values = dict()
+
+    def increment(self, name, amount=1, **labels):
+        self.values[name] = self.values.get(name, 0) + amount
+
+
+class TestAsyncLogging(unittest.TestCase):
+    """
+    Logging through a queue
+    """
+
+    def setUp(self):
+        self.target = BlockingHandler()
+        self.counters = MockCounters()
+        self.handler = AsyncHandler([self.target], queue_size=2, counters=self.counters)
+        self.logger = logging.Logger('test_async_logging')
+        self.logger.addHandler(self.handler)
+
+    def test_written(self):
+        """
+        Records are rendered when logged, and written by the background thread
+        """
+        self.target.unblock.set()
+        args = ['value']
+        self.logger.info('Message %s', args)
+        args.append('modified')
+        self.handler.flush()
+        self.assertEqual(1, len(self.target.records))
+        self.assertEqual("Message ['value']", self.target.records[0].getMessage())
+
+    def test_exception(self):
+        self.target.unblock.set()
+        try:
+            raise ValueError('expected')
+        except ValueError:
+            self.logger.exception('Failed')
+        self.handler.flush()
+        self.assertIn('ValueError: expected', logging.Formatter().format(self.target.records[0]))
+
+    def test_dropped(self):
+        """
+        When the queue is full, the records are dropped without blocking, and reported later
+        """
+        # At most one being written and two in the queue, the rest dropped
+        for i in range(10):
+            self.logger.info('Message %d', i)
+        self.assertGreaterEqual(self.handler.dropped, 7)
+        self.assertEqual(self.handler.dropped, self.counters.values[DROPPED_COUNTER])
+
+        self.target.unblock.set()
+        self.handler.flush()
+        messages = [r.getMessage() for r in self.target.records]
+        self.assertIn('Message 0', messages)
+        written = filter(lambda m: m.startswith('Message'), messages)
+        self.assertEqual(10, len(written) + self.handler.dropped)
+        self.assertIn('%d log entries dropped because the logging queue was full' % self.handler.dropped, messages)
@@ -0,0 +1,111 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import logging
+import time
+import unittest
+
+from fts3.cli import utils
+from fts3.rest.client import TryAgain
+
+
+class StubInquirer(object):
+    """
+    Serves the job states one after the other, refusing to hold the requests while busy
+    """
+
+    def __init__(self, states, busy=0, long_poll=True):
+        self.states = list(states)
+        self.busy = busy
+        self.long_poll = long_poll
+        self.polled = 0
+        self.held = 0
+
+    def _job(self):
+        state = self.states[0]
+        if len(self.states) > 1:
+            self.states.pop(0)
+        return {'job_id': '1234', 'job_state': state}
+
+    def get_job_status(self, job_id):
+        self.polled += 1
+        return self._job()
+
+    def wait_for_job_change(self, job_id, etag=None):
+        if self.busy:
+            self.busy -= 1
+            raise TryAgain('503')
+        self.held += 1
+        job = self._job()
+        if self.long_poll:
+            job['etag'] = job['job_state']
+        return job
+
+
+class TestWaitForJob(unittest.TestCase):
+    """
+    Blocking CLI commands waiting for the job to finish
+    """
+
+    def setUp(self):
+        self.waits = []
+        self.sleep = time.sleep
+        time.sleep = self.waits.append
+        self.logger = logging.getLogger('test_cli_wait')
+
+    def tearDown(self):
+        time.sleep = self.sleep
+
+    def test_long_poll(self):
+        inquirer = StubInquirer(['SUBMITTED', 'ACTIVE', 'FINISHED'])
+        job = utils.wait_for_job(inquirer, '1234', ['SUBMITTED', 'ACTIVE'], 10, self.logger)
+        self.assertEqual('FINISHED', job['job_state'])
+        self.assertEqual(0, inquirer.polled)
+        self.assertEqual([], self.waits)
+
+    def test_no_long_poll(self):
+        inquirer = StubInquirer(['SUBMITTED', 'ACTIVE', 'FINISHED'], long_poll=False)
+        job = utils.wait_for_job(inquirer, '1234', ['SUBMITTED', 'ACTIVE'], 10, self.logger)
+        self.assertEqual('FINISHED', job['job_state'])
+        self.assertEqual(2, inquirer.polled)
+        self.assertEqual([10, 10], self.waits)
+
+    def test_busy(self):
+        """
+        If the server is holding too many requests, the job is polled and the
+        next request is held again
+        """
+        inquirer = StubInquirer(['SUBMITTED', 'ACTIVE', 'FINISHED'])
+        original = inquirer.wait_for_job_change
+        held = []
+
+        def wait_for_job_change(job_id, etag=None):
+            if etag and not held:
+                held.append(etag)
+                raise TryAgain('503')
+            return original(job_id, etag)
+        inquirer.wait_for_job_change = wait_for_job_change
+
+        job = utils.wait_for_job(inquirer, '1234', ['SUBMITTED', 'ACTIVE'], 10, self.logger)
+        self.assertEqual('FINISHED', job['job_state'])
+        self.assertEqual(1, inquirer.polled)
+        self.assertEqual(2, inquirer.held)
+        self.assertEqual([10], self.waits)
+
+    def test_busy_first(self):
+        inquirer = StubInquirer(['ACTIVE', 'FINISHED'], busy=1)
+        job = utils.wait_for_job(inquirer, '1234', ['SUBMITTED', 'ACTIVE'], 10, self.logger)
+        self.assertEqual('FINISHED', job['job_state'])
+        self.assertEqual([10, 10], self.waits)
@@ -0,0 +1,140 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+import zlib
+
+from fts3rest.lib.middleware.compression import CompressionMiddleware, parse_accept_encoding
+
+
+class TestCompression(unittest.TestCase):
+    """
+    Negotiated compression of the responses
+    """
+
+    def setUp(self):
+        self.status = None
+        self.headers = None
+
+    def _start_response(self, status, headers, exc_info=None):
+        self.status = status
+        self.headers = dict(headers)
+
+    def _app(self, body, content_type='application/json', streamed=False, lazy=False):
+        def app(environ, start_response):
+            if lazy:
+                def _lazy():
+                    start_response('200 Ok', [('Content-Type', content_type)])
+                    for chunk in body:
+                        yield chunk
+                return _lazy()
+            start_response('200 Ok', [('Content-Type', content_type), ('ETag', '"1234"')])
+            if streamed:
+                return iter(body)
+            return body
+        return CompressionMiddleware(app, {
+            'fts3.CompressionEncodings': 'gzip', 'fts3.CompressionMinSize': '100', 'fts3.CompressionFlushSize': '10'
+        })
+
+    def _call(self, app, accept_encoding='gzip'):
+        environ = {'REQUEST_METHOD': 'GET'}
+        if accept_encoding:
+            environ['HTTP_ACCEPT_ENCODING'] = accept_encoding
+        chunks = list(app(environ, self._start_response))
+        return chunks
+
+    def test_parse_accept_encoding(self):
+        """
+        Qualities default to 1
+        """
+        self.assertEqual(
+            {'gzip': 1.0, 'br': 0.5, 'identity': 0.0},
+            parse_accept_encoding('gzip, br;q=0.5, identity;q=0')
+        )
+
+    def test_not_accepted(self):
+        """
+        Without Accept-Encoding, the response goes as it is
+        """
+        body = ['x' * 200]
+        self.assertEqual(body, self._call(self._app(body), accept_encoding=None))
+        self.assertNotIn('Content-Encoding', self.headers)
+        self.assertEqual(body, self._call(self._app(body), accept_encoding='gzip;q=0'))
+        self.assertNotIn('Content-Encoding', self.headers)
+
+    def test_compressed(self):
+        """
+        Known size bigger than the threshold
+        """
+        body = ['x' * 200]
+        chunks = self._call(self._app(body))
+        self.assertEqual('gzip', self.headers['Content-Encoding'])
+        self.assertEqual('Accept-Encoding', self.headers['Vary'])
+        self.assertEqual('W/"1234"', self.headers['ETag'])
+        self.assertEqual(body[0], zlib.decompress(''.join(chunks), 16 + zlib.MAX_WBITS))
+
+    def test_small(self):
+        """
+        Known size smaller than the threshold
+        """
+        body = ['x' * 50]
+        self.assertEqual(body, self._call(self._app(body)))
+        self.assertNotIn('Content-Encoding', self.headers)
+        self.assertEqual('Accept-Encoding', self.headers['Vary'])
+
+    def test_not_compressible(self):
+        """
+        Only text and json are compressed
+        """
+        body = ['x' * 200]
+        self.assertEqual(body, self._call(self._app(body, content_type='application/octet-stream')))
+        self.assertNotIn('Content-Encoding', self.headers)
+
+    def test_streamed(self):
+        """
+        Streamed responses are compressed as they go, with a flush every flush size
+        """
+        body = ['[', '"abcdefghijkl"', ',', '"mnopqrstuvwx"', ']']
+        chunks = self._call(self._app(body, streamed=True))
+        self.assertEqual('gzip', self.headers['Content-Encoding'])
+        self.assertGreater(len(chunks), 2)
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # Flushed chunks can be decoded without waiting for the end
+        self.assertEqual('["abcdefghijkl"', decompressor.decompress(''.join(chunks[:2])))
+        self.assertEqual(''.join(body), '["abcdefghijkl"' + decompressor.decompress(''.join(chunks[2:])))
+
+    def test_lazy(self):
+        """
+        Applications that call start_response when iterated
+        """
+        body = ['{"a": 1}', '']
+        chunks = self._call(self._app(body, lazy=True))
+        self.assertEqual('gzip', self.headers['Content-Encoding'])
+        self.assertEqual(''.join(body), zlib.decompress(''.join(chunks), 16 + zlib.MAX_WBITS))
+
+    def test_write(self):
+        """
+        The write callable must be returned, and what is written is compressed with the body
+        """
+        def app(environ, start_response):
+            write = start_response('200 Ok', [('Content-Type', 'application/json')])
+            write('x' * 100)
+            return ['y' * 100]
+
+        middleware = CompressionMiddleware(app, {'fts3.CompressionEncodings': 'gzip', 'fts3.CompressionMinSize': '100'})
+        chunks = self._call(middleware)
+        self.assertEqual('gzip', self.headers['Content-Encoding'])
+        self.assertEqual('x' * 100 + 'y' * 100, zlib.decompress(''.join(chunks), 16 + zlib.MAX_WBITS))
@@ -0,0 +1,103 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from fts3.model import ConfigVersion
+from fts3rest.lib.config_cache import CONFIG_VERSION_ID, ConfigCache, bump_config_version, config_cache
+
+
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+class TestConfigCache(unittest.TestCase):
+    """
+    The configuration is reloaded when the version changes
+    """
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        # pysqlite does not handle savepoints by itself
+        event.listen(self.engine, 'connect', _disable_pysqlite_transactions)
+        event.listen(self.engine, 'begin', lambda connection: connection.execute('BEGIN'))
+        ConfigVersion.__table__.create(self.engine)
+        config_cache.setup(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.loads = 0
+
+    def tearDown(self):
+        self.session.close()
+        config_cache.enabled = True
+
+    def _loader(self, session):
+        self.loads += 1
+        return self.loads
+
+    def test_bump(self):
+        """
+        The first bump creates the version, the next ones change it
+        """
+        bump_config_version(self.session)
+        self.session.commit()
+        first = self.session.query(ConfigVersion).get(CONFIG_VERSION_ID).version
+
+        bump_config_version(self.session)
+        self.session.commit()
+        self.session.expire_all()
+        self.assertEqual(1, self.session.query(ConfigVersion).count())
+        self.assertNotEqual(first, self.session.query(ConfigVersion).get(CONFIG_VERSION_ID).version)
+
+    def test_reload(self):
+        cache = ConfigCache()
+        self.assertEqual(1, cache.get(self.session, 'key', self._loader))
+        self.assertEqual(1, cache.get(self.session, 'key', self._loader))
+        bump_config_version(self.session)
+        self.session.commit()
+        self.assertEqual(2, cache.get(self.session, 'key', self._loader))
+
+    def test_ttl(self):
+        """
+        Changes that do not bump the version are seen once the cache expires
+        """
+        cache = ConfigCache(ttl=60)
+        self.assertEqual(1, cache.get(self.session, 'key', self._loader))
+        self.assertEqual(1, cache.get(self.session, 'key', self._loader))
+        cache.expires -= 60
+        self.assertEqual(2, cache.get(self.session, 'key', self._loader))
+
+    def test_missing_table(self):
+        """
+        Without t_config_version, nothing is cached
+        """
+        cache = ConfigCache()
+        cache.setup(create_engine('sqlite://'))
+        self.assertFalse(cache.enabled)
+        cache.setup(self.engine)
+        self.assertTrue(cache.enabled)
+
+    def test_disabled(self):
+        """
+        If the version can not be stored, nothing is cached, and nothing is written
+        """
+        cache = ConfigCache()
+        cache.enabled = config_cache.enabled = False
+        self.assertEqual(1, cache.get(self.session, 'key', self._loader))
+        self.assertEqual(2, cache.get(self.session, 'key', self._loader))
+        bump_config_version(self.session)
+        self.session.commit()
+        self.assertEqual(0, self.session.query(ConfigVersion).count())
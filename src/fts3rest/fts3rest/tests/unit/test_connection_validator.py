@@ -0,0 +1,58 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import time
+import unittest
+
+from fts3rest.lib.helpers.connection_validator import ConnectionValidator
+
+
+class MockRecord(object):
+    def __init__(self):
+        self.info = dict()
+
+
+class TestConnectionValidator(unittest.TestCase):
+    """
+    Check when connections are pinged on checkout
+    """
+
+    def test_always(self):
+        validator = ConnectionValidator(policy='always')
+        record = MockRecord()
+        ConnectionValidator.mark_used(None, record)
+        self.assertTrue(validator._needs_ping(record))
+
+    def test_never(self):
+        validator = ConnectionValidator(policy='never')
+        self.assertFalse(validator._needs_ping(MockRecord()))
+
+    def test_idle(self):
+        """
+        Only connections idle for longer than idle_time must be pinged
+        """
+        validator = ConnectionValidator(policy='idle', idle_time=10)
+        record = MockRecord()
+        # Never used
+        self.assertTrue(validator._needs_ping(record))
+        # Just used
+        ConnectionValidator.mark_used(None, record)
+        self.assertFalse(validator._needs_ping(record))
+        # Idle for long
+        record.info['fts3.last_used'] = time.time() - 20
+        self.assertTrue(validator._needs_ping(record))
+
+    def test_bad_policy(self):
+        self.assertRaises(ValueError, ConnectionValidator, policy='sometimes')
@@ -102,3 +102,34 @@ class TestUserCredentials(unittest.TestCase):
         self.assertEqual(fts3auth.ALL,     creds.get_granted_level_for(fts3auth.CONFIG))
         self.assertEqual(fts3auth.VO,      creds.get_granted_level_for(fts3auth.TRANSFER))
         self.assertEqual(fts3auth.PRIVATE, creds.get_granted_level_for(fts3auth.DELEGATION))
+
+
+    def test_compiled_roles(self):
+        """
+        Credentials built with the same compiled permissions and roles
+        must share the same, read only, granted levels.
+        """
+        env = {}
+        env['GRST_CRED_AURI_0'] = 'dn:' + TestUserCredentials.DN
+        env['GRST_CRED_AURI_1'] = 'fqan:' + TestUserCredentials.FQANS[3]
+
+        role_permissions = fts3auth.RolePermissions(TestUserCredentials.ROLES)
+        creds1 = fts3auth.UserCredentials(env, role_permissions)
+        creds2 = fts3auth.UserCredentials(env, role_permissions)
+
+        self.assertEqual(fts3auth.ALL, creds1.get_granted_level_for(fts3auth.CONFIG))
+        self.assertEqual(fts3auth.VO,  creds1.get_granted_level_for(fts3auth.TRANSFER))
+        self.assertIs(creds1.level, creds2.level)
+        self.assertRaises(TypeError, creds1.level.__setitem__, fts3auth.CONFIG, fts3auth.NONE)
+
+        # The configuration must not be modified
+        self.assertNotIn(fts3auth.CONFIG, TestUserCredentials.ROLES['public'])
+
+    def test_role_from_fqan(self):
+        """
+        Roles are extracted from the FQANs, ignoring NULL
+        """
+        self.assertEqual('admin', fts3auth.role_from_fqan(TestUserCredentials.FQANS[3]))
+        self.assertEqual(None, fts3auth.role_from_fqan(TestUserCredentials.FQANS[0]))
+        self.assertEqual(None, fts3auth.role_from_fqan('/testvo/group'))
+        self.assertEqual('testvo/group', fts3auth.vo_from_fqan(TestUserCredentials.FQANS[1]))
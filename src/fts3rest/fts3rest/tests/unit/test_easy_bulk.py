@@ -0,0 +1,187 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+import time
+import unittest
+
+from fts3.rest.client import ClientError, MultiStatus, NotFound, TryAgain
+from fts3.rest.client.easy import bulk
+
+
+class StubContext(object):
+    """
+    Answers the job queries and submissions as the server would, without any server
+    """
+
+    def __init__(self, jobs, busy=0):
+        self.jobs = jobs
+        self.busy = busy
+        self.requests = []
+        self.submitted = []
+
+    def clone(self):
+        return self
+
+    def _maybe_busy(self):
+        if self.busy:
+            self.busy -= 1
+            raise TryAgain('503')
+
+    def get(self, path, args=None):
+        self.requests.append(path)
+        self._maybe_busy()
+        job_ids = path.split('/')[2].split('?')[0].split(',')
+        responses = []
+        for job_id in job_ids:
+            if job_id in self.jobs:
+                responses.append(dict(self.jobs[job_id], job_id=job_id, http_status='200 Ok'))
+            else:
+                responses.append(dict(job_id=job_id, http_status='404 Not Found', http_message='No job %s' % job_id))
+        if len(job_ids) == 1:
+            if job_ids[0] not in self.jobs:
+                raise NotFound(job_ids[0])
+            return json.dumps(responses[0])
+        if any(map(lambda r: r['http_status'] != '200 Ok', responses)):
+            raise MultiStatus('Some failed', responses)
+        return json.dumps(responses)
+
+    def post_json(self, path, body):
+        self._maybe_busy()
+        job = json.loads(body)
+        if job['params'].get('fail', False):
+            raise ClientError('Bad request')
+        self.submitted.append(job)
+        return json.dumps({'job_id': 'job%d' % len(self.submitted)})
+
+
+class TestEasyBulk(unittest.TestCase):
+    """
+    Concurrent submissions and queries of many jobs
+    """
+
+    def setUp(self):
+        self.waits = []
+        self.sleep = time.sleep
+        self.delegate = bulk.delegate
+        time.sleep = self.waits.append
+        bulk.delegate = lambda *args: None
+
+    def tearDown(self):
+        time.sleep = self.sleep
+        bulk.delegate = self.delegate
+
+    def test_statuses(self):
+        context = StubContext(dict(('job%d' % i, {'job_state': 'ACTIVE'}) for i in range(10)))
+        statuses, errors = bulk.get_many_jobs_statuses(context, ['job%d' % i for i in range(10)], chunk_size=3)
+        self.assertEqual(10, len(statuses))
+        self.assertEqual({}, errors)
+        self.assertEqual(4, len(context.requests))
+
+    def test_statuses_multistatus(self):
+        """
+        A chunk with missing jobs is not queried again job by job
+        """
+        context = StubContext({'job0': {'job_state': 'ACTIVE'}, 'job2': {'job_state': 'FINISHED'}})
+        statuses, errors = bulk.get_many_jobs_statuses(context, ['job0', 'job1', 'job2'], chunk_size=3)
+        self.assertEqual(['job0', 'job2'], sorted(statuses.keys()))
+        self.assertEqual(['job1'], errors.keys())
+        self.assertIsInstance(errors['job1'], NotFound)
+        self.assertEqual(1, len(context.requests))
+
+    def test_statuses_undecoded(self):
+        """
+        If the multi-status can not be decoded, the jobs are queried one by one
+        """
+        context = StubContext({'job0': {'job_state': 'ACTIVE'}})
+        original_get = context.get
+
+        def get(path, args=None):
+            if ',' in path:
+                context.requests.append(path)
+                raise ClientError('Could not decode')
+            return original_get(path, args)
+        context.get = get
+
+        statuses, errors = bulk.get_many_jobs_statuses(context, ['job0', 'job1'], chunk_size=2)
+        self.assertEqual(['job0'], statuses.keys())
+        self.assertIsInstance(errors['job1'], NotFound)
+        self.assertEqual(3, len(context.requests))
+
+    def test_statuses_retry(self):
+        """
+        The server being busy is retried, doubling the wait each time
+        """
+        context = StubContext({'job0': {'job_state': 'ACTIVE'}, 'job1': {'job_state': 'ACTIVE'}}, busy=2)
+        statuses, errors = bulk.get_many_jobs_statuses(
+            context, ['job0', 'job1'], concurrency=1, retries=3, backoff=1
+        )
+        self.assertEqual(2, len(statuses))
+        self.assertEqual([1, 2], self.waits)
+
+    def test_statuses_retries_exhausted(self):
+        context = StubContext({'job0': {'job_state': 'ACTIVE'}, 'job1': {'job_state': 'ACTIVE'}}, busy=10)
+        statuses, errors = bulk.get_many_jobs_statuses(
+            context, ['job0', 'job1'], concurrency=1, retries=2, backoff=1
+        )
+        self.assertEqual({}, statuses)
+        self.assertIsInstance(errors['job0'], TryAgain)
+        self.assertIsInstance(errors['job1'], TryAgain)
+        self.assertEqual([1, 2], self.waits)
+
+    def test_submit_many(self):
+        """
+        Failed submissions are reported in their position, the others are submitted anyway
+        """
+        jobs = [
+            {'files': [{'sources': ['a'], 'destinations': ['b']}]},
+            {'files': [{'sources': ['a'], 'destinations': ['b']}], 'params': {'fail': True}},
+            {'files': [{'sources': ['c'], 'destinations': ['d']}]},
+        ]
+        context = StubContext({}, busy=1)
+        job_ids, errors = bulk.submit_many(context, jobs, concurrency=1, backoff=1)
+        self.assertEqual(3, len(job_ids))
+        self.assertIsNotNone(job_ids[0])
+        self.assertIsNone(job_ids[1])
+        self.assertIsNotNone(job_ids[2])
+        self.assertEqual([1], errors.keys())
+        self.assertIsInstance(errors[1], ClientError)
+        self.assertEqual(2, len(context.submitted))
+        self.assertEqual([1], self.waits)
+
+    def test_poll_until_terminal(self):
+        """
+        Terminal and missing jobs are not polled again
+        """
+        context = StubContext({'job0': {'job_state': 'ACTIVE'}, 'job1': {'job_state': 'FINISHED'}})
+
+        def sleep(seconds):
+            self.waits.append(seconds)
+            context.jobs['job0']['job_state'] = 'FAILED'
+        time.sleep = sleep
+
+        statuses, errors = bulk.poll_until_terminal(context, ['job0', 'job1', 'job2'], interval=5)
+        self.assertEqual('FAILED', statuses['job0']['job_state'])
+        self.assertEqual('FINISHED', statuses['job1']['job_state'])
+        self.assertIsInstance(errors['job2'], NotFound)
+        self.assertEqual([5], self.waits)
+        # Only job0 is polled the second time
+        self.assertEqual('/jobs/job0', context.requests[-1])
+
+    def test_poll_timeout(self):
+        context = StubContext({'job0': {'job_state': 'ACTIVE'}})
+        statuses, errors = bulk.poll_until_terminal(context, ['job0'], interval=5, timeout=1)
+        self.assertEqual('ACTIVE', statuses['job0']['job_state'])
+        self.assertEqual([], self.waits)
@@ -0,0 +1,82 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import time
+import unittest
+from datetime import datetime
+
+from fts3rest.lib.hosts_activity import HostsActivitySnapshot
+
+
+class CountingSnapshot(HostsActivitySnapshot):
+    """
+    Counts the refreshes instead of querying the database
+    """
+
+    def __init__(self, refresh_interval):
+        super(CountingSnapshot, self).__init__(refresh_interval)
+        self.refreshes = 0
+
+    def refresh(self):
+        with self.lock:
+            self.refreshes += 1
+            self.hosts = {'fts01': dict(active=self.refreshes)}
+            self.generated_at = datetime.utcnow()
+            return self.generated_at, self.hosts
+
+
+class TestHostsActivity(unittest.TestCase):
+    """
+    The snapshot of the activity must be refreshed on the background
+    """
+
+    def _wait_refreshes(self, snapshot, count, timeout=5):
+        deadline = time.time() + timeout
+        while snapshot.refreshes < count and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_refreshed(self):
+        snapshot = CountingSnapshot(0.01)
+        self.assertEqual(1, snapshot.get()[1]['fts01']['active'])
+        self._wait_refreshes(snapshot, 3)
+        self.assertGreaterEqual(snapshot.get()[1]['fts01']['active'], 3)
+
+    def test_fresh_first(self):
+        """
+        Asking for a fresh snapshot first must start the refresh anyway
+        """
+        snapshot = CountingSnapshot(0.01)
+        self.assertEqual(1, snapshot.get(fresh=True)[1]['fts01']['active'])
+        self.assertTrue(snapshot.started)
+        self._wait_refreshes(snapshot, 3)
+        self.assertGreaterEqual(snapshot.get()[1]['fts01']['active'], 3)
+
+    def test_fresh(self):
+        """
+        A fresh snapshot is always recomputed
+        """
+        snapshot = CountingSnapshot(3600)
+        snapshot.get()
+        self.assertEqual(1, snapshot.get()[1]['fts01']['active'])
+        self.assertEqual(2, snapshot.get(fresh=True)[1]['fts01']['active'])
+
+    def test_disabled(self):
+        """
+        With no refresh interval, nothing is cached, and there is no thread
+        """
+        snapshot = CountingSnapshot(0)
+        snapshot.get()
+        self.assertEqual(2, snapshot.get()[1]['fts01']['active'])
+        self.assertFalse(snapshot.started)
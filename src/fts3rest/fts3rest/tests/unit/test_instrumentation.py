@@ -0,0 +1,108 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+from sqlalchemy import create_engine
+
+from fts3rest.lib.middleware.instrumentation import InstrumentationMiddleware, QueryInstrumentation, RouteHistograms
+from fts3rest.lib.middleware.instrumentation import current_stats, record_serialization
+
+
+class TestInstrumentation(unittest.TestCase):
+    """
+    Per request query counting and timing
+    """
+
+    def setUp(self):
+        self.engine = create_engine('sqlite://')
+        QueryInstrumentation.register(self.engine)
+        self.histograms = RouteHistograms()
+        self.headers = None
+
+    def _start_response(self, status, headers, exc_info=None):
+        self.status = status
+        self.headers = dict(headers)
+
+    def _app(self, queries, streamed=False):
+        def app(environ, start_response):
+            environ['wsgiorg.routing_args'] = ((), {'controller': 'jobs', 'action': 'index'})
+            for i in range(queries):
+                self.engine.execute('SELECT 1')
+            start_response('200 OK', [('Content-Type', 'application/json')])
+            record_serialization(0.001)
+            if streamed:
+                return iter(['[', '1', ']'])
+            return ['[1]']
+        return InstrumentationMiddleware(app, {}, self.histograms)
+
+    def test_disabled(self):
+        """
+        Outside an instrumented request, queries are not accounted
+        """
+        self.engine.execute('SELECT 1')
+        record_serialization(1)
+        self.assertEqual(None, current_stats())
+
+    def test_count(self):
+        environ = {}
+        body = self._app(3)(environ, self._start_response)
+        self.assertEqual(['[1]'], body)
+
+        stats = environ['fts3.RequestStats']
+        self.assertEqual(3, stats.queries)
+        self.assertEqual(3, stats.response_bytes)
+        self.assertTrue(stats.serialization_time > 0)
+        self.assertIn('Server-Timing', self.headers)
+        self.assertIn('3 queries', self.headers['Server-Timing'])
+        self.assertIn('queries=3', stats.summary())
+        self.assertEqual(None, current_stats())
+
+        snapshot = self.histograms.snapshot()
+        self.assertEqual(1, snapshot['routes']['jobs.index']['requests'])
+        self.assertEqual(('2', 0), snapshot['routes']['jobs.index']['queries']['buckets'][1])
+        self.assertEqual(('5', 1), snapshot['routes']['jobs.index']['queries']['buckets'][2])
+
+    def test_streamed(self):
+        """
+        For streamed responses, statistics are recorded once the response has been sent
+        """
+        environ = {}
+        response = self._app(2, streamed=True)(environ, self._start_response)
+        self.assertIn('Server-Timing', self.headers)
+        self.assertEqual(0, len(self.histograms.snapshot()['routes']))
+
+        self.assertEqual('[1]', ''.join(response))
+        response.close()
+
+        self.assertEqual(3, environ['fts3.RequestStats'].response_bytes)
+        snapshot = self.histograms.snapshot()
+        self.assertEqual(1, snapshot['routes']['jobs.index']['requests'])
+        self.assertEqual(3, snapshot['routes']['jobs.index']['response_bytes'])
+        self.assertEqual(None, current_stats())
+
+    def test_write(self):
+        """
+        The write callable must be returned, and what is written goes before the body
+        """
+        def app(environ, start_response):
+            write = start_response('200 OK', [('Content-Type', 'application/json')])
+            write('[1')
+            return iter([']'])
+
+        environ = {}
+        response = InstrumentationMiddleware(app, {}, self.histograms)(environ, self._start_response)
+        self.assertEqual('[1]', ''.join(response))
+        response.close()
+        self.assertEqual(3, environ['fts3.RequestStats'].response_bytes)
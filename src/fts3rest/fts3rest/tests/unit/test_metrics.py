@@ -0,0 +1,95 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from fts3rest.lib.metrics import ProcessCounters, MetricsExporter, collect, render
+from fts3rest.lib.middleware.instrumentation import RequestStats, RouteHistograms
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Merge and exposition of the metrics of several processes
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.counters = ProcessCounters()
+        self.histograms = RouteHistograms()
+        self.exporter = MetricsExporter(self.directory, self.counters, self.histograms, None)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write_process(self, pid, counters, gauges=None):
+        json.dump(
+            dict(pid=pid, updated=time.time(), counters=counters, gauges=gauges or []),
+            open(os.path.join(self.directory, '%d.proc.json' % pid), 'w')
+        )
+
+    def test_merge(self):
+        """
+        Counters from all the processes are summed
+        """
+        self.counters.increment('fts3_rest_submitted_jobs_total', vo='testvo')
+        self.counters.increment('fts3_rest_submitted_files_total', 5, vo='testvo')
+        self.exporter.flush()
+        # Another live process (our parent)
+        self._write_process(os.getppid(), [('fts3_rest_submitted_files_total', {'vo': 'testvo'}, 3)])
+
+        counters, gauges = collect(self.directory)
+        self.assertEqual(1, counters[('fts3_rest_submitted_jobs_total', (('vo', 'testvo'),))])
+        self.assertEqual(8, counters[('fts3_rest_submitted_files_total', (('vo', 'testvo'),))])
+
+    def test_dead_process(self):
+        """
+        Counters of dead processes are kept, and their files removed
+        """
+        dead_pid = 2 ** 22 + 1
+        self._write_process(dead_pid, [('fts3_rest_submitted_jobs_total', {'vo': 'testvo'}, 2)],
+                            [('fts3_rest_db_pool_size', {'pid': str(dead_pid)}, 5)])
+
+        counters, gauges = collect(self.directory)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, '%d.proc.json' % dead_pid)))
+        self.assertEqual(2, counters[('fts3_rest_submitted_jobs_total', (('vo', 'testvo'),))])
+        self.assertEqual(0, len(gauges))
+
+        # Still there on the next scrape
+        counters, gauges = collect(self.directory)
+        self.assertEqual(2, counters[('fts3_rest_submitted_jobs_total', (('vo', 'testvo'),))])
+
+    def test_render(self):
+        stats = RequestStats()
+        stats.duration = 0.02
+        stats.queries = 3
+        self.histograms.record('jobs.index', 200, stats)
+        self.exporter.flush()
+
+        text = render(*collect(self.directory))
+        self.assertIn('# TYPE fts3_rest_requests_total counter', text)
+        self.assertIn('fts3_rest_requests_total{route="jobs.index"} 1.0', text)
+        self.assertIn('# TYPE fts3_rest_request_duration_seconds histogram', text)
+        self.assertIn('fts3_rest_request_duration_seconds_bucket{le="0.01",route="jobs.index"} 0.0', text)
+        self.assertIn('fts3_rest_request_duration_seconds_bucket{le="0.025",route="jobs.index"} 1.0', text)
+        self.assertIn('fts3_rest_request_duration_seconds_bucket{le="+Inf",route="jobs.index"} 1.0', text)
+        self.assertIn('fts3_rest_request_duration_seconds_count{route="jobs.index"} 1.0', text)
+        self.assertIn('fts3_rest_request_queries_bucket{le="5.0",route="jobs.index"} 1.0', text)
+        # Buckets must be sorted
+        self.assertTrue(text.index('le="0.01"') < text.index('le="0.025"') < text.index('le="+Inf"'))
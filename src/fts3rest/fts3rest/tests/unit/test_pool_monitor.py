@@ -0,0 +1,68 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from fts3rest.lib.helpers.pool_monitor import PoolMonitor
+
+
+class TestPoolMonitor(unittest.TestCase):
+    """
+    Statistics gathered from the pool events
+    """
+
+    def setUp(self):
+        self.monitor = PoolMonitor()
+        self.engine = create_engine('sqlite://', poolclass=QueuePool, pool_size=2)
+        self.monitor.register(self.engine)
+
+    def test_checkout(self):
+        con = self.engine.connect()
+        stats = self.monitor.snapshot(self.engine.pool)
+        self.assertEqual(1, stats['checkouts'])
+        self.assertEqual(1, stats['checked_out'])
+        self.assertEqual(1, stats['connects'])
+        self.assertIsNone(stats['hold_avg'])
+
+        con.close()
+        stats = self.monitor.snapshot(self.engine.pool)
+        self.assertEqual(0, stats['checked_out'])
+        self.assertIsNotNone(stats['hold_avg'])
+        self.assertEqual(stats['hold_avg'], stats['hold_max'])
+
+    def test_reuse(self):
+        for i in range(3):
+            self.engine.connect().close()
+        stats = self.monitor.snapshot(self.engine.pool)
+        self.assertEqual(3, stats['checkouts'])
+        self.assertEqual(1, stats['connects'])
+
+    def test_invalidate(self):
+        con = self.engine.connect()
+        con.invalidate()
+        con.close()
+        stats = self.monitor.snapshot(self.engine.pool)
+        self.assertEqual(1, stats['invalidations'])
+
+    def test_several_engines(self):
+        other = create_engine('sqlite://', poolclass=QueuePool)
+        self.monitor.register(other)
+        self.engine.connect().close()
+        other.connect().close()
+        stats = self.monitor.snapshot(self.engine.pool)
+        self.assertEqual(2, stats['checkouts'])
+        self.assertEqual(2, stats['connects'])
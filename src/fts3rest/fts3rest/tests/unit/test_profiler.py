@@ -0,0 +1,154 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from fts3rest.lib.profiler import ProfilerBusy, RequestProfiler, StackSampler, format_profile, prune_profiles
+
+
+def _busy_function(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class MockCredentials(object):
+    def __init__(self, is_root):
+        self.is_root = is_root
+
+
+class TestProfiler(unittest.TestCase):
+    """
+    Sampling and per request profiling
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_sample(self):
+        """
+        A busy thread must show up in the samples
+        """
+        stop = threading.Event()
+        busy = threading.Thread(target=_busy_function, args=(stop,))
+        busy.start()
+        try:
+            result = StackSampler(interval=0.001).sample(0.2)
+        finally:
+            stop.set()
+            busy.join()
+
+        self.assertGreater(result.samples, 0)
+        self.assertIn('_busy_function', result.collapsed())
+        self.assertIn('_busy_function', result.top())
+        # The sampling thread does not sample itself
+        self.assertNotIn('test_sample', result.collapsed())
+
+    def test_busy(self):
+        """
+        Only one sampling at a time
+        """
+        sampler = StackSampler()
+        thread = threading.Thread(target=sampler.sample, args=(0.5,))
+        thread.start()
+        time.sleep(0.1)
+        try:
+            self.assertRaises(ProfilerBusy, sampler.sample, 0.1)
+        finally:
+            thread.join()
+
+    def _app(self, environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return iter(['a', 'b'])
+
+    def _run(self, environ):
+        profiler = RequestProfiler(self._app, {'fts3.ProfileDirectory': self.directory})
+        self.headers = None
+
+        def start_response(status, headers, exc_info=None):
+            self.headers = dict(headers)
+        body = ''.join(profiler(environ, start_response))
+        self.assertEqual('ab', body)
+
+    def test_request_profile(self):
+        self._run({'HTTP_X_FTS3_PROFILE': '1', 'fts3.User.Credentials': MockCredentials(True)})
+        name = self.headers['X-FTS3-Profile']
+        self.assertTrue(os.path.exists(os.path.join(self.directory, name)))
+        self.assertIn('_app', format_profile(os.path.join(self.directory, name)))
+
+    def test_request_profile_not_root(self):
+        self._run({'HTTP_X_FTS3_PROFILE': '1', 'fts3.User.Credentials': MockCredentials(False)})
+        self.assertNotIn('X-FTS3-Profile', self.headers)
+        self.assertEqual([], os.listdir(self.directory))
+
+    def test_request_profile_write(self):
+        """
+        What the application passes to write() is sent before the body
+        """
+        def app(environ, start_response):
+            write = start_response('200 OK', [('Content-Type', 'text/plain')])
+            write('a')
+            return ['b']
+        profiler = RequestProfiler(app, {'fts3.ProfileDirectory': self.directory})
+        environ = {'HTTP_X_FTS3_PROFILE': '1', 'fts3.User.Credentials': MockCredentials(True)}
+        body = ''.join(profiler(environ, lambda status, headers, exc_info=None: None))
+        self.assertEqual('ab', body)
+
+    def _touch_profile(self, name, age):
+        path = os.path.join(self.directory, name)
+        open(path, 'w').close()
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_prune_count(self):
+        """
+        Only the newest profiles are kept
+        """
+        for i in range(5):
+            self._touch_profile('%d.prof' % i, i * 10)
+        self._touch_profile('notaprofile', 100)
+        self.assertEqual(2, prune_profiles(self.directory, 3, 0))
+        self.assertEqual(['0.prof', '1.prof', '2.prof', 'notaprofile'], sorted(os.listdir(self.directory)))
+
+    def test_prune_age(self):
+        """
+        Old profiles are removed
+        """
+        self._touch_profile('0.prof', 0)
+        self._touch_profile('1.prof', 3600)
+        self.assertEqual(1, prune_profiles(self.directory, 0, 60))
+        self.assertEqual(['0.prof'], os.listdir(self.directory))
+
+    def test_request_profile_pruned(self):
+        """
+        Profiling a request removes the profiles beyond the limit
+        """
+        self._touch_profile('0.prof', 3600)
+        profiler = RequestProfiler(self._app, {'fts3.ProfileDirectory': self.directory, 'fts3.ProfileMaxCount': '1'})
+        environ = {'HTTP_X_FTS3_PROFILE': '1', 'fts3.User.Credentials': MockCredentials(True)}
+        headers = dict()
+
+        def start_response(status, response_headers, exc_info=None):
+            headers.update(response_headers)
+        ''.join(profiler(environ, start_response))
+        self.assertEqual([headers['X-FTS3-Profile']], os.listdir(self.directory))
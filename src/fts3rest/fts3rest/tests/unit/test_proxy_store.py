@@ -0,0 +1,98 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from fts3rest.lib.proxy_store import ProxyStore
+
+
+class TestProxyStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = ProxyStore(directory=self.directory, max_idle=2, idle_timeout=300)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_reused(self):
+        """
+        The same proxy must be written only once, readable only by the owner
+        """
+        first = self.store.acquire('1234', 'PROXY')
+        self.store.release(first)
+        second = self.store.acquire('1234', 'PROXY')
+        self.assertEqual(first.name, second.name)
+        self.assertEqual('PROXY', open(second.name).read())
+        self.assertEqual(0600, stat.S_IMODE(os.stat(second.name).st_mode))
+        self.store.release(second)
+        self.assertTrue(os.path.exists(second.name))
+
+    def test_superseded(self):
+        """
+        A new proxy for the same delegation replaces the old file once it is released
+        """
+        old = self.store.acquire('1234', 'OLD PROXY')
+        new = self.store.acquire('1234', 'NEW PROXY')
+        self.assertNotEqual(old.name, new.name)
+        self.assertTrue(os.path.exists(old.name))
+        self.store.release(old)
+        self.assertFalse(os.path.exists(old.name))
+        self.store.release(new)
+        self.assertTrue(os.path.exists(new.name))
+
+    def test_expired(self):
+        expired = self.store.acquire('1234', 'PROXY', datetime.utcnow() - timedelta(minutes=1))
+        self.store.release(expired)
+        other = self.store.acquire('5678', 'OTHER PROXY')
+        self.assertFalse(os.path.exists(expired.name))
+        self.store.release(other)
+
+    def test_keep_termination_time(self):
+        """
+        Acquiring without a termination time does not forget the one already known
+        """
+        termination_time = datetime.utcnow() + timedelta(hours=1)
+        first = self.store.acquire('1234', 'PROXY', termination_time)
+        second = self.store.acquire('1234', 'PROXY')
+        self.assertEqual(termination_time, second.termination_time)
+        self.store.release(first)
+        self.store.release(second)
+
+    def test_max_idle(self):
+        entries = [self.store.acquire(str(i), 'PROXY %d' % i) for i in range(4)]
+        for entry in entries:
+            self.store.release(entry)
+        remaining = filter(lambda e: os.path.exists(e.name), entries)
+        self.assertEqual(2, len(remaining))
+
+    def test_no_delegation_id(self):
+        entry = self.store.acquire(None, 'PROXY')
+        self.store.release(entry)
+        self.assertFalse(os.path.exists(entry.name))
+
+    def test_clear(self):
+        used = self.store.acquire('1234', 'PROXY')
+        idle = self.store.acquire('5678', 'OTHER PROXY')
+        self.store.release(idle)
+        self.store.clear()
+        self.assertTrue(os.path.exists(used.name))
+        self.assertFalse(os.path.exists(idle.name))
+        self.store.release(used)
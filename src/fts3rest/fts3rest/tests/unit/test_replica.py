@@ -0,0 +1,107 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+
+from fts3.model import Host
+from fts3rest.lib.replica import ReplicaRouter, _stream_from_replica
+
+
+class TestReplicaRouter(unittest.TestCase):
+    """
+    The replica must be used only when it is not too far behind the primary
+    """
+
+    def setUp(self):
+        self.primary = create_engine('sqlite://')
+        self.replica = create_engine('sqlite://')
+        for engine in (self.primary, self.replica):
+            Host.__table__.create(engine)
+        self.router = ReplicaRouter(self.primary, self.replica, check_interval=0)
+
+    def _beat(self, engine, beat):
+        engine.execute(Host.__table__.insert(), hostname='fts.cern.ch', service_name='fts_server', beat=beat)
+
+    def test_in_sync(self):
+        now = datetime.utcnow()
+        self._beat(self.primary, now)
+        self._beat(self.replica, now)
+        self.assertEqual(0, self.router.get_lag())
+        self.assertEqual(self.replica, self.router.engine_for(10))
+
+    def test_lagging(self):
+        now = datetime.utcnow()
+        self._beat(self.primary, now)
+        self._beat(self.replica, now - timedelta(seconds=60))
+        self.assertEqual(60, self.router.get_lag())
+        self.assertEqual(None, self.router.engine_for(10))
+        self.assertEqual(self.replica, self.router.engine_for(120))
+
+    def test_replica_empty(self):
+        """
+        If there is nothing in the replica, it can not be trusted
+        """
+        self._beat(self.primary, datetime.utcnow())
+        self.assertEqual(None, self.router.engine_for(3600))
+
+    def test_mark_failed(self):
+        """
+        Once failed, the replica is not used until the next check
+        """
+        self.router.check_interval = 3600
+        self.assertEqual(self.replica, self.router.engine_for(10))
+        self.router.mark_failed()
+        self.assertEqual(None, self.router.engine_for(10))
+
+    def _streamed(self, body):
+        class FakeSession(object):
+            replica_bind = self.replica
+        session = FakeSession()
+        return session, _stream_from_replica(self.router, session, body)
+
+    def test_stream_done(self):
+        """
+        Once a streamed response is sent, the session does not use the replica anymore
+        """
+        session, stream = self._streamed(iter(['a', 'b']))
+        self.assertEqual(['a', 'b'], list(stream))
+        self.assertEqual(None, session.replica_bind)
+
+    def test_stream_closed(self):
+        """
+        Same if the response is closed half way, i.e. because the client went away
+        """
+        session, stream = self._streamed(iter(['a', 'b']))
+        self.assertEqual('a', stream.next())
+        stream.close()
+        self.assertEqual(None, session.replica_bind)
+
+    def test_stream_failed(self):
+        """
+        If the replica fails while streaming, it is not used until the next check
+        """
+        def _failing():
+            yield 'a'
+            raise DBAPIError('SELECT', None, Exception('lost connection'))
+
+        self.router.check_interval = 3600
+        session, stream = self._streamed(_failing())
+        self.assertEqual('a', stream.next())
+        self.assertRaises(DBAPIError, stream.next)
+        self.assertEqual(None, session.replica_bind)
+        self.assertEqual(None, self.router.engine_for(10))
@@ -0,0 +1,91 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+from datetime import datetime, timedelta
+
+from fts3rest.lib.token_cache import CachedToken, TokenCache
+
+
+def _token(client_id='app', dlg_id='1234', expires_in=3600):
+    return CachedToken(
+        client_id=client_id, scope='transfer', dlg_id=dlg_id, credentials=object(),
+        expires=datetime.utcnow() + timedelta(seconds=expires_in)
+    )
+
+
+class TestTokenCache(unittest.TestCase):
+
+    def test_hit(self):
+        cache = TokenCache(size=10, ttl=60)
+        token = _token()
+        self.assertIsNone(cache.get('abcd'))
+        cache.put('abcd', token, cache.get_generation())
+        self.assertIs(token, cache.get('abcd'))
+        stats = cache.get_stats()
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['misses'])
+
+    def test_not_past_expiration(self):
+        """
+        The entry must not outlive the token, even if the ttl is longer
+        """
+        cache = TokenCache(size=10, ttl=60)
+        cache.put('abcd', _token(expires_in=-1), cache.get_generation())
+        self.assertIsNone(cache.get('abcd'))
+
+    def test_ttl(self):
+        cache = TokenCache(size=10, ttl=0)
+        cache.put('abcd', _token(), cache.get_generation())
+        self.assertIsNone(cache.get('abcd'))
+
+    def test_evict_least_recently_used(self):
+        cache = TokenCache(size=2, ttl=60)
+        for access_token in ('a', 'b'):
+            cache.put(access_token, _token(), cache.get_generation())
+        cache.get('a')
+        cache.put('c', _token(), cache.get_generation())
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual(1, cache.get_stats()['evictions'])
+
+    def test_invalidate(self):
+        cache = TokenCache(size=10, ttl=60)
+        cache.put('a', _token(dlg_id='1'), cache.get_generation())
+        cache.put('b', _token(dlg_id='2'), cache.get_generation())
+        cache.put('c', _token(client_id='other'), cache.get_generation())
+        cache.invalidate('app', '1')
+        self.assertIsNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('b'))
+        cache.invalidate('app')
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+        self.assertEqual(2, cache.get_stats()['invalidations'])
+
+    def test_put_after_invalidation(self):
+        """
+        A token validated before an invalidation must not be cached, it may have been removed
+        """
+        cache = TokenCache(size=10, ttl=60)
+        generation = cache.get_generation()
+        cache.invalidate('app')
+        cache.put('abcd', _token(), generation)
+        self.assertIsNone(cache.get('abcd'))
+
+    def test_disabled(self):
+        cache = TokenCache(size=0)
+        cache.put('abcd', _token(), cache.get_generation())
+        self.assertIsNone(cache.get('abcd'))
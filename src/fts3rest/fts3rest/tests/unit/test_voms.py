@@ -0,0 +1,84 @@
+#   Copyright notice:
+#   Copyright CERN, 2015.
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import unittest
+from datetime import datetime, timedelta
+from M2Crypto import ASN1, EVP, RSA, X509
+
+from fts3rest.lib.helpers import voms
+
+# Attribute certificate sequence, valid from 2020-01-01 00:00:00 until 2030-12-31 12:00:00
+VOMS_ACS = (
+    '305a30583044020101300b06092a864886f70d010105300b06092a864886f70d01010502010c3022180f323032303031'
+    '3031303030303030305a180f32303330313233313132303030305a300b06092a864886f70d01010503030000ff'
+).decode('hex')
+
+
+def _generate_cert(not_after, rfc=False):
+    pkey = EVP.PKey()
+    pkey.assign_rsa(RSA.gen_key(512, 65537, lambda *args: None))
+    cert = X509.X509()
+    cert.set_version(2)
+    cert.set_pubkey(pkey)
+    asn1_not_before = ASN1.ASN1_UTCTIME()
+    asn1_not_before.set_datetime(datetime.now(ASN1.UTC) - timedelta(hours=1))
+    asn1_not_after = ASN1.ASN1_UTCTIME()
+    asn1_not_after.set_datetime(not_after.replace(tzinfo=ASN1.UTC))
+    cert.set_not_before(asn1_not_before)
+    cert.set_not_after(asn1_not_after)
+    if rfc:
+        cert.add_ext(X509.new_extension('proxyCertInfo', 'critical,language:Inherit all', critical=True))
+    cert.sign(pkey, 'sha256')
+    return cert.as_pem() + pkey.as_pem(cipher=None)
+
+
+class TestVoms(unittest.TestCase):
+
+    def test_proxy_type(self):
+        expires = datetime.utcnow() + timedelta(hours=1)
+        rfc = voms._load_proxy_chain(_generate_cert(expires, rfc=True))
+        legacy = voms._load_proxy_chain(_generate_cert(expires))
+        self.assertEqual('RFC', voms._get_proxy_type(rfc))
+        self.assertEqual('legacy', voms._get_proxy_type(legacy))
+
+    def test_termination_time(self):
+        """
+        The termination time is the earliest expiration of the chain, skipping the private key
+        """
+        first = datetime.utcnow().replace(microsecond=0) + timedelta(hours=1)
+        second = first + timedelta(hours=1)
+        x509_list = voms._load_proxy_chain(_generate_cert(second) + _generate_cert(first))
+        self.assertEqual(2, len(x509_list))
+        self.assertEqual(first, voms._get_proxy_termination_time(x509_list))
+
+    def test_validity(self):
+        valid = voms._load_proxy_chain(_generate_cert(datetime.utcnow() + timedelta(hours=1)))
+        expired = voms._load_proxy_chain(_generate_cert(datetime.utcnow() - timedelta(minutes=1)))
+        self.assertTrue(voms._check_proxy_validity(valid))
+        self.assertFalse(voms._check_proxy_validity(expired))
+        self.assertFalse(voms._check_proxy_validity(valid + expired))
+        self.assertFalse(voms._check_proxy_validity([]))
+
+    def test_attribute_certificate_expiration(self):
+        self.assertEqual(
+            [datetime(2030, 12, 31, 12, 0, 0)],
+            list(voms._find_validity_periods(VOMS_ACS))
+        )
+
+    def test_malformed(self):
+        self.assertRaises(
+            voms.VomsException, voms._load_proxy_chain,
+            '-----BEGIN CERTIFICATE-----\nabcd\n-----END CERTIFICATE-----\n'
+        )
@@ -0,0 +1,9 @@
+--
+-- Version of the link, storage and share configuration, changed by fts-rest
+-- every time it modifies the configuration, so all the servers reload their caches
+--
+CREATE TABLE t_config_version (
+  id      INTEGER NOT NULL,
+  version INTEGER NOT NULL,
+  CONSTRAINT config_version_pk PRIMARY KEY (id)
+);